@@ -0,0 +1,48 @@
+"""
+Compare the threadpool and the async database modes under high concurrency.
+
+    python -m benchmarks.async_mode --drones 10000 --duration 10
+"""
+
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+
+from .http_load import HttpRequest, run_load
+from .server import prepare_database, run_server
+
+MODES = {"threadpool": "false", "async": "true"}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[64, 256, 1024])
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "drones.db"
+        drones = prepare_database(database, args.drones)
+        requests: list[HttpRequest] = [
+            ("GET", f"/drones/{drone.id}", None) for drone in drones[:1000]
+        ]
+        requests.append(("GET", "/drones?limit=20", None))
+        print("mode        concurrency  req/s     p50 ms   p99 ms   errors")
+        for mode, database_async in MODES.items():
+            with run_server(database, {"DATABASE_ASYNC": database_async}) as port:
+                for concurrency in args.concurrency:
+                    result = asyncio.run(
+                        run_load(
+                            "127.0.0.1", port, requests, concurrency, args.duration
+                        )
+                    )
+                    print(
+                        f"{mode:<11} {concurrency:>11}  {result.throughput:>8.1f}"
+                        f"  {result.percentile(50) * 1000:>7.2f}"
+                        f"  {result.percentile(99) * 1000:>7.2f}  {result.errors:>7}"
+                    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measure the batch dispatch of medications onto the fleet: the first fit
+decreasing packing alone and the whole service call, planning only and
+committing the plan.
+
+    python -m benchmarks.dispatch --medications 100000 --drones 10000
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import Session, create_engine
+
+from drones.dispatch import first_fit_decreasing
+from drones.repositories.drone_repository import DroneRepository
+from drones.repositories.medication_repository import MedicationRepository
+from drones.schemas import MedicationPostSchema
+from drones.services.drone_service import DroneService
+from drones.settings import get_settings
+
+from .server import prepare_database
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--medications", type=int, default=100000)
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--max-weight", type=int, default=100)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    medications = [
+        MedicationPostSchema(
+            name=f"medication-{index}",
+            weight=rng.randint(1, args.max_weight),
+            code=f"CODE_{index}",
+            image="https://example.com/medication.png",
+        )
+        for index in range(args.medications)
+    ]
+    weights = [medication.weight for medication in medications]
+    print("step                      total ms  assigned  unassigned")
+    start = time.perf_counter()
+    bins = first_fit_decreasing([500] * args.drones, weights)
+    elapsed = time.perf_counter() - start
+    unassigned = bins.count(None)
+    print(
+        f"{'packing':<24} {elapsed * 1000:>9.1f}"
+        f"  {len(bins) - unassigned:>8}  {unassigned:>10}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "drones.db"
+        prepare_database(database, args.drones)
+        engine = create_engine(f"sqlite:///{database}")
+        for name, commit in (("plan", False), ("plan + commit", True)):
+            with Session(engine) as session:
+                service = DroneService(
+                    DroneRepository(session),
+                    MedicationRepository(session),
+                    get_settings().min_battery_capacity_for_loading,
+                )
+                start = time.perf_counter()
+                plan = service.dispatch_medications(medications, commit)
+                elapsed = time.perf_counter() - start
+            unassigned = len(plan.unassigned)
+            print(
+                f"{name:<24} {elapsed * 1000:>9.1f}"
+                f"  {len(medications) - unassigned:>8}  {unassigned:>10}"
+            )
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
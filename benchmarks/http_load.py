@@ -0,0 +1,114 @@
+import asyncio
+import json
+from dataclasses import dataclass, field
+from itertools import count
+from time import perf_counter
+from typing import Any, Callable
+
+# A request to send: (method, path, json body or None).
+HttpRequest = tuple[str, str, Any]
+
+
+@dataclass
+class LoadResult:
+    latencies: list[float] = field(default_factory=list)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def throughput(self) -> float:
+        return len(self.latencies) / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, value: float) -> float:
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        index = min(len(latencies) - 1, int(len(latencies) * value / 100))
+        return latencies[index]
+
+
+async def _read_response(reader: asyncio.StreamReader) -> int:
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ")[1])
+    length = 0
+    chunked = False
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+        elif name.lower() == "transfer-encoding":
+            chunked = "chunked" in value.lower()
+    if length:
+        await reader.readexactly(length)
+    elif chunked:
+        size = -1
+        while size:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+    return status
+
+
+async def _worker(
+    host: str,
+    port: int,
+    next_request: Callable[[], HttpRequest],
+    deadline: float,
+    result: LoadResult,
+) -> None:
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while perf_counter() < deadline:
+            method, path, body = next_request()
+            payload = b"" if body is None else json.dumps(body).encode()
+            request = (
+                f"{method} {path} HTTP/1.1\r\n"
+                f"Host: {host}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n"
+            ).encode() + payload
+            start = perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status = await _read_response(reader)
+            if status < 400:
+                result.latencies.append(perf_counter() - start)
+            else:
+                result.errors += 1
+    except (ConnectionError, asyncio.IncompleteReadError):
+        result.errors += 1
+    finally:
+        writer.close()
+
+
+async def run_load(
+    host: str,
+    port: int,
+    requests: list[HttpRequest],
+    concurrency: int,
+    duration: float,
+) -> LoadResult:
+    """
+    Send `requests` round-robin over `concurrency` keep-alive connections for
+    `duration` seconds and collect the latency of every successful response.
+    """
+    counter = count()
+
+    def next_request() -> HttpRequest:
+        return requests[next(counter) % len(requests)]
+
+    result = LoadResult()
+    start = perf_counter()
+    deadline = start + duration
+    await asyncio.gather(
+        *[
+            _worker(host, port, next_request, deadline, result)
+            for _ in range(concurrency)
+        ]
+    )
+    result.elapsed = perf_counter() - start
+    return result
@@ -0,0 +1,76 @@
+"""
+Compare the per row cost of building the `GET /drones` response body with the
+ORM, double validation and stdlib json path against the Core rows and orjson
+path.
+
+    python -m benchmarks.serialization --drones 10000 --repeat 5
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from pydantic import parse_obj_as
+from sqlmodel import Session, create_engine
+
+from drones.repositories.drone_repository import DroneRepository
+from drones.schemas import DroneGetSchema
+
+from .server import prepare_database
+
+
+def _orm_json(repository: DroneRepository, drones: int) -> bytes:
+    field = create_response_field("Response", list[DroneGetSchema])
+    items = parse_obj_as(list[DroneGetSchema], repository.get_drones(limit=drones))
+    content = asyncio.run(serialize_response(field=field, response_content=items))
+    return JSONResponse(content).body
+
+
+def _core_orjson(repository: DroneRepository, drones: int) -> bytes:
+    return ORJSONResponse(repository.get_drone_rows(limit=drones)).body
+
+
+PATHS: dict[str, Callable[[DroneRepository, int], bytes]] = {
+    "orm + validation + json": _orm_json,
+    "core rows + orjson": _core_orjson,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "drones.db"
+        prepare_database(database, args.drones)
+        engine = create_engine(f"sqlite:///{database}")
+        print("path                         total ms   us/row")
+        with Session(engine) as session:
+            repository = DroneRepository(session)
+            bodies = set()
+            for name, path in PATHS.items():
+                best = float("inf")
+                for _ in range(args.repeat):
+                    session.expunge_all()
+                    start = time.perf_counter()
+                    body = path(repository, args.drones)
+                    best = min(best, time.perf_counter() - start)
+                bodies.add(len(body))
+                print(
+                    f"{name:<27} {best * 1000:>9.1f}"
+                    f"  {best / args.drones * 1_000_000:>7.2f}"
+                )
+        engine.dispose()
+        if len(bodies) != 1:
+            print("warning: the paths produced bodies of different sizes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from sqlmodel import Session, create_engine
+
+from drones.data.database import Drone, DroneModelType, DroneState
+from drones.repositories.drone_repository import DroneRepository
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def prepare_database(path: Path, drones: int) -> list[Drone]:
+    """
+    Create a fresh database at `path` with `drones` drones able to load.
+    """
+    path.unlink(missing_ok=True)
+    database_url = f"sqlite:///{path}"
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT,
+        env={**os.environ, "DATABASE_URL": database_url},
+        check=True,
+        capture_output=True,
+    )
+    engine = create_engine(database_url)
+    entities = [
+        Drone(
+            serial_number=str(index),
+            model=DroneModelType(index % len(DroneModelType)),
+            weight_limit=500,
+            battery_capacity=100,
+            state=DroneState.IDLE,
+        )
+        for index in range(drones)
+    ]
+    with Session(engine) as session:
+        DroneRepository(session).add_drones(entities)
+    engine.dispose()
+    return entities
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def run_server(
+    database: Path,
+    env: dict[str, str] | None = None,
+    workers: int = 1,
+) -> Iterator[int]:
+    """
+    Run the API with uvicorn against `database` and yield the port it listens
+    on. `env` overrides settings through environment variables.
+    """
+    port = _free_port()
+    server_env = {
+        **os.environ,
+        "PYTHONPATH": str(ROOT),
+        "DATABASE_URL": f"sqlite:///{database}",
+        "DATABASE_ASYNC_URL": f"sqlite+aiosqlite:///{database}",
+        "SEED": "false",
+        "TIME_INTERVAL_BATTERY": "3600",
+        "LOGGER_DRONES_BATTERIES_CAPACITY_FILE_PATH": str(database) + ".log",
+        **(env or {}),
+    }
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "drones.main:app",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        cwd=database.parent,
+        env=server_env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline or process.poll() is not None:
+                    raise RuntimeError("The server did not start")
+                time.sleep(0.1)
+        yield port
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
@@ -0,0 +1,96 @@
+"""
+Compare the read and write throughput of the SQLite engine profiles under a
+mixed load of concurrent readers and writers.
+
+    python -m benchmarks.sqlite_profiles --drones 10000 --duration 10
+"""
+
+import argparse
+import asyncio
+import tempfile
+from pathlib import Path
+
+from .http_load import HttpRequest, LoadResult, run_load
+from .server import prepare_database, run_server
+
+PROFILES = {
+    "basic": {"DATABASE_PROFILE": "basic"},
+    "production": {"DATABASE_PROFILE": "production"},
+    "production + read pool": {
+        "DATABASE_PROFILE": "production",
+        "DATABASE_READ_POOL": "true",
+    },
+}
+
+
+async def _mixed_load(
+    port: int,
+    reads: list[HttpRequest],
+    writes: list[HttpRequest],
+    readers: int,
+    writers: int,
+    duration: float,
+) -> tuple[LoadResult, LoadResult]:
+    read_result, write_result = await asyncio.gather(
+        run_load("127.0.0.1", port, reads, readers, duration),
+        run_load("127.0.0.1", port, writes, writers, duration),
+    )
+    return read_result, write_result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--readers", type=int, default=64)
+    parser.add_argument("--writers", type=int, default=16)
+    args = parser.parse_args()
+    writes: list[HttpRequest] = [
+        (
+            "POST",
+            "/drones",
+            {
+                "serial_number": f"bench-{index}",
+                "model": index % 4,
+                "weight_limit": 500,
+                "battery_capacity": 100,
+                "state": 0,
+            },
+        )
+        for index in range(1000)
+    ]
+    print(
+        "profile                  reads/s  read p99 ms  writes/s"
+        "  write p99 ms  errors"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for profile, env in PROFILES.items():
+            database = Path(directory) / "drones.db"
+            for suffix in ("-wal", "-shm"):
+                Path(f"{database}{suffix}").unlink(missing_ok=True)
+            drones = prepare_database(database, args.drones)
+            reads: list[HttpRequest] = [
+                ("GET", f"/drones/{drone.id}", None) for drone in drones[:1000]
+            ]
+            with run_server(database, env) as port:
+                read_result, write_result = asyncio.run(
+                    _mixed_load(
+                        port,
+                        reads,
+                        writes,
+                        args.readers,
+                        args.writers,
+                        args.duration,
+                    )
+                )
+            print(
+                f"{profile:<23} {read_result.throughput:>8.1f}"
+                f"  {read_result.percentile(99) * 1000:>11.2f}"
+                f"  {write_result.throughput:>8.1f}"
+                f"  {write_result.percentile(99) * 1000:>12.2f}"
+                f"  {read_result.errors + write_result.errors:>6}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,546 @@
+"""
+Measure the latency percentiles and throughput of every route of the drones
+and medications routers and every method of `DroneService` against generated
+fleets, write the results as JSON and compare them against a stored baseline.
+
+    python -m benchmarks.suite --fleets 1k 100k --save-baseline
+    python -m benchmarks.suite --fleets 1k 100k
+
+The fleets are generated with mimesis from a fixed seed, imported once and
+kept in `--cache-dir`. Every run works on a copy of them. The comparison
+flags the measures whose p50 or p99 grew more than `--threshold` and exits
+with an error if there is any.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+from math import asin, degrees
+from pathlib import Path
+from random import Random
+from typing import Any, Callable, NamedTuple
+from uuid import UUID
+
+import orjson
+from mimesis import Internet, Numeric, Person
+from sqlmodel import Session, create_engine
+
+from drones.data.database import DroneModelType, DroneState
+from drones.deps import build_drone_service
+from drones.routes.drones_router import router as drones_router
+from drones.routes.medications_router import router as medications_router
+from drones.schemas import (
+    DroneFiltersSchema,
+    DronePostSchema,
+    DroneTelemetrySchema,
+    MedicationFiltersSchema,
+    MedicationPostSchema,
+)
+from drones.services.drone_service import DroneService
+from drones.settings import get_settings
+from drones.telemetry import get_telemetry_buffer
+
+from .http_load import HttpRequest, LoadResult, run_load
+from .server import ROOT, run_server
+
+FLEETS = {"1k": 1_000, "100k": 100_000, "1m": 1_000_000}
+# Note: Bump it when the generated fleets change, to not reuse the cached ones.
+FLEET_VERSION = 2
+# Note: The points the nearest drones are searched around, a city, the open
+# sea, a pole and the antimeridian.
+NEAREST_POINTS = ((40.4168, -3.7038), (-30.0, -140.0), (89.9, 0.0), (0.0, 180.0))
+SAMPLE_SIZE = 10_000
+PERCENTILES = (50, 90, 99)
+
+
+class Fleet(NamedTuple):
+    database: Path
+    drone_ids: list[str]
+    free_drone_ids: list[str]
+    medications: list[tuple[str, str]]
+
+
+class ServiceCase(NamedTuple):
+    call: Callable[[int], Any]
+    setup: Callable[[int], Any] | None = None
+
+
+def _uuid(rng: Random) -> UUID:
+    # Note: Keep the first digit non zero like `new_uuid` does.
+    return UUID(int=rng.getrandbits(128) | 1 << 124, version=4)
+
+
+def _medication(numeric: Numeric, person: Person, internet: Internet, weight: int):
+    return {
+        "name": re.sub("[^A-Za-z0-9_-]", "", person.first_name()) or "medication",
+        "weight": weight,
+        "code": f"C{numeric.integer_number(start=0, end=10**6)}",
+        "image": internet.url(),
+    }
+
+
+def generate_fleet(path: Path, size: int, seed: int = 0) -> dict[str, Any]:
+    """
+    Write a fleet of `size` drones with up to three medications each as an
+    import file and return a sample of the ids of its drones and medications.
+    """
+    rng = Random(seed)
+    numeric, person, internet = (
+        Numeric(seed=seed),
+        Person(seed=seed),
+        Internet(seed=seed),
+    )
+    sample: dict[str, Any] = {"drones": [], "free_drones": [], "medications": []}
+    with open(path, "wb") as file:
+        for index in range(size):
+            weight_limit = numeric.integer_number(start=100, end=500)
+            drone = {
+                "id": str(_uuid(rng)),
+                "serial_number": str(index),
+                "model": rng.choice(list(DroneModelType)),
+                "weight_limit": weight_limit,
+                "battery_capacity": numeric.integer_number(start=0, end=100),
+                "state": rng.choice(list(DroneState)),
+                # Note: Spread evenly over the surface of the Earth.
+                "latitude": round(degrees(asin(rng.uniform(-1, 1))), 6),
+                "longitude": round(rng.uniform(-180, 180), 6),
+                "medications": [
+                    {
+                        "id": str(_uuid(rng)),
+                        **_medication(
+                            numeric,
+                            person,
+                            internet,
+                            numeric.integer_number(start=1, end=weight_limit // 4),
+                        ),
+                    }
+                    for _ in range(index % 4)
+                ],
+            }
+            file.write(orjson.dumps(drone, option=orjson.OPT_APPEND_NEWLINE))
+            if len(sample["drones"]) < SAMPLE_SIZE:
+                sample["drones"].append(drone["id"])
+            if not drone["medications"] and len(sample["free_drones"]) < SAMPLE_SIZE:
+                sample["free_drones"].append(drone["id"])
+            for medication in drone["medications"]:
+                if len(sample["medications"]) < SAMPLE_SIZE:
+                    sample["medications"].append((drone["id"], medication["id"]))
+    return sample
+
+
+def prepare_fleet(cache_dir: Path, name: str, workers: int) -> Fleet:
+    """
+    Return the cached fleet `name`, generating and importing it first if it
+    is not in `cache_dir` yet.
+    """
+    database = cache_dir / f"fleet-{name}-v{FLEET_VERSION}.db"
+    metadata = cache_dir / f"fleet-{name}-v{FLEET_VERSION}.json"
+    generate = not database.exists() or not metadata.exists()
+    if generate:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        database.unlink(missing_ok=True)
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{database}"}
+    # Note: The cached fleets are migrated too, they may predate a migration.
+    subprocess.run(
+        [sys.executable, "-m", "alembic", "upgrade", "head"],
+        cwd=ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+    )
+    if generate:
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "fleet.ndjson"
+            print(f"generating fleet {name}", file=sys.stderr)
+            sample = generate_fleet(path, FLEETS[name])
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "drones.importer",
+                    str(path),
+                    "--workers",
+                    str(workers),
+                ],
+                cwd=ROOT,
+                env=env,
+                check=True,
+            )
+        metadata.write_text(json.dumps(sample))
+    # Note: Fold the WAL into the database file, the runs copy only it.
+    with closing(sqlite3.connect(database)) as connection:
+        connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    sample = json.loads(metadata.read_text())
+    return Fleet(
+        database,
+        sample["drones"],
+        sample["free_drones"],
+        [tuple(item) for item in sample["medications"]],
+    )
+
+
+def route_requests(fleet: Fleet) -> dict[str, list[HttpRequest]]:
+    """
+    Return the requests to send for every route. The writes go last, in an
+    order where every one of them finds the rows it needs.
+    """
+    numeric, person, internet = Numeric(seed=1), Person(seed=1), Internet(seed=1)
+    drones = fleet.drone_ids[:1000]
+    medication = _medication(numeric, person, internet, 1)
+    new_drone = {
+        "serial_number": "bench",
+        "model": 0,
+        "weight_limit": 500,
+        "battery_capacity": 100,
+        "state": 0,
+    }
+    return {
+        "GET /drones": [
+            ("GET", "/drones?limit=100", None),
+            ("GET", "/drones?limit=100&include=medications", None),
+        ],
+        "GET /drones/available": [("GET", "/drones/available?weight=10", None)],
+        "GET /drones/nearest": [
+            ("GET", f"/drones/nearest?lat={lat}&lon={lon}&weight=10", None)
+            for lat, lon in NEAREST_POINTS
+        ],
+        "POST /drones/dispatch": [
+            ("POST", "/drones/dispatch", [{**medication, "weight": 20}] * 100)
+        ],
+        "GET /drones/export": [("GET", "/drones/export", None)],
+        "GET /drones/details-cache": [("GET", "/drones/details-cache", None)],
+        "GET /drones/stats": [("GET", "/drones/stats", None)],
+        "POST /drones/telemetry": [
+            (
+                "POST",
+                "/drones/telemetry",
+                [
+                    {"drone_id": drone_id, "battery_capacity": 50, "state": 0}
+                    for drone_id in drones[:100]
+                ],
+            )
+        ],
+        "GET /drones/telemetry": [("GET", "/drones/telemetry", None)],
+        "GET /drones/{drone_id}": [
+            ("GET", f"/drones/{drone_id}", None) for drone_id in drones
+        ],
+        "GET /drones/{drone_id}/medications": [
+            ("GET", f"/drones/{drone_id}/medications", None) for drone_id in drones
+        ],
+        "GET /medications": [
+            ("GET", f"/medications?code={medication['code']}", None),
+            ("GET", "/medications?name_prefix=Ma&limit=100", None),
+            ("GET", "/medications?name_prefix=Ma&drone_state=0&limit=100", None),
+        ],
+        "GET /drones/{drone_id}/battery-history": [
+            ("GET", f"/drones/{drone_id}/battery-history", None) for drone_id in drones
+        ],
+        "PUT /drones/{drone_id}/telemetry": [
+            (
+                "PUT",
+                f"/drones/{drone_id}/telemetry",
+                {"battery_capacity": 50, "state": 0},
+            )
+            for drone_id in drones
+        ],
+        "POST /drones": [("POST", "/drones", new_drone)],
+        "POST /drones/bulk": [("POST", "/drones/bulk", [new_drone] * 100)],
+        "POST /drones/{drone_id}/medications": [
+            ("POST", f"/drones/{drone_id}/medications", medication)
+            for drone_id in fleet.free_drone_ids
+        ],
+        "POST /drones/{drone_id}/medications/batch": [
+            ("POST", f"/drones/{drone_id}/medications/batch", [medication] * 5)
+            for drone_id in fleet.free_drone_ids
+        ],
+        "DELETE /drones/{drone_id}/medications/{medication_id}": [
+            ("DELETE", f"/drones/{drone_id}/medications/{medication_id}", None)
+            for drone_id, medication_id in fleet.medications
+        ],
+        "DELETE /drones/{drone_id}": [
+            ("DELETE", f"/drones/{drone_id}", None) for drone_id, _ in fleet.medications
+        ],
+    }
+
+
+def service_cases(
+    service: DroneService,
+    fleet: Fleet,
+) -> dict[str, ServiceCase]:
+    drones = [UUID(drone_id) for drone_id in fleet.drone_ids]
+    free_drones = [UUID(drone_id) for drone_id in fleet.free_drone_ids]
+    medications = [
+        (UUID(drone_id), UUID(medication_id))
+        for drone_id, medication_id in fleet.medications
+    ]
+    numeric, person, internet = Numeric(seed=2), Person(seed=2), Internet(seed=2)
+    medication = MedicationPostSchema(**_medication(numeric, person, internet, 1))
+    new_drone = DronePostSchema(
+        serial_number="bench",
+        model=DroneModelType.Lightweight,
+        weight_limit=500,
+        battery_capacity=100,
+        state=DroneState.IDLE,
+    )
+    telemetry = DroneTelemetrySchema(battery_capacity=50, state=DroneState.IDLE)
+    buffer = get_telemetry_buffer()
+    added: list[UUID] = []
+
+    def pick(ids: list[UUID], index: int) -> UUID:
+        return ids[index % len(ids)]
+
+    return {
+        "get_drones": ServiceCase(lambda _: service.get_drones()),
+        "get_drones_page": ServiceCase(
+            lambda _: service.get_drones_page(DroneFiltersSchema(), 100)
+        ),
+        "iter_drone_rows": ServiceCase(
+            lambda _: sum(len(rows) for rows in service.iter_drone_rows())
+        ),
+        "get_available_drones": ServiceCase(
+            lambda _: service.get_available_drones(10, 10)
+        ),
+        "get_nearest_drones": ServiceCase(
+            lambda i: service.get_nearest_drones(
+                *NEAREST_POINTS[i % len(NEAREST_POINTS)], 5, 10
+            )
+        ),
+        "get_stats": ServiceCase(lambda _: service.get_stats()),
+        "reconcile_stats": ServiceCase(lambda _: service.reconcile_stats()),
+        "get_drone": ServiceCase(lambda i: service.get_drone(pick(drones, i))),
+        "search_medications": ServiceCase(
+            lambda _: service.search_medications(
+                MedicationFiltersSchema(name_prefix="Ma"), 100
+            )
+        ),
+        "get_drone_version": ServiceCase(
+            lambda i: service.get_drone_version(pick(drones, i))
+        ),
+        "get_fleet_version": ServiceCase(lambda _: service.get_fleet_version()),
+        "dispatch_medications": ServiceCase(
+            lambda _: service.dispatch_medications([medication] * 100)
+        ),
+        "flush_telemetry": ServiceCase(
+            lambda _: service.flush_telemetry(),
+            lambda _: buffer.put_many(
+                [(drone_id, telemetry) for drone_id in drones[:1000]]
+            ),
+        ),
+        "add_drone": ServiceCase(
+            lambda _: added.append(service.add_drone(new_drone).id)
+        ),
+        "add_drones": ServiceCase(lambda _: service.add_drones([new_drone] * 100)),
+        "add_medication": ServiceCase(
+            lambda i: service.add_medication(pick(free_drones, i), medication)
+        ),
+        "add_medications": ServiceCase(
+            lambda i: service.add_medications(pick(free_drones, i), [medication] * 5)
+        ),
+        "remove_medication": ServiceCase(
+            lambda i: service.remove_medication(*medications[i])
+        ),
+        "remove_drone": ServiceCase(lambda _: service.remove_drone(added.pop())),
+    }
+
+
+def measure_routes(
+    fleet: Fleet,
+    database: Path,
+    concurrency: int,
+    duration: float,
+) -> dict[str, dict[str, float]]:
+    cases = route_requests(fleet)
+    routes = {
+        f"{method} {prefix}{route.path}"
+        for prefix, router in (
+            ("/drones", drones_router),
+            ("/medications", medications_router),
+        )
+        for route in router.routes
+        for method in getattr(route, "methods", ())
+    }
+    for missing in sorted(routes - set(cases)):
+        print(f"warning: no benchmark for {missing}", file=sys.stderr)
+    results = {}
+    with run_server(database) as port:
+        for name, requests in cases.items():
+            result = asyncio.run(
+                run_load("127.0.0.1", port, requests, concurrency, duration)
+            )
+            results[name] = _load_summary(result)
+    return results
+
+
+def measure_service(
+    fleet: Fleet,
+    database: Path,
+    duration: float,
+    max_calls: int,
+) -> dict[str, dict[str, float]]:
+    methods = {
+        name
+        for name in dir(DroneService)
+        if not name.startswith("_") and callable(getattr(DroneService, name))
+    }
+    engine = create_engine(f"sqlite:///{database}")
+    results = {}
+    with Session(engine) as session:
+        service = build_drone_service(session, get_settings())
+        cases = service_cases(service, fleet)
+        for missing in sorted(methods - set(cases)):
+            print(f"warning: no benchmark for DroneService.{missing}", file=sys.stderr)
+        for name, case in cases.items():
+            result = LoadResult()
+            errors = 0
+            deadline = time.perf_counter() + duration
+            index = 0
+            while index < max_calls and (index == 0 or time.perf_counter() < deadline):
+                if case.setup is not None:
+                    case.setup(index)
+                start = time.perf_counter()
+                try:
+                    case.call(index)
+                except Exception:
+                    session.rollback()
+                    errors += 1
+                else:
+                    elapsed = time.perf_counter() - start
+                    result.latencies.append(elapsed)
+                    result.elapsed += elapsed
+                index += 1
+                session.expunge_all()
+            result.errors = errors
+            results[name] = _load_summary(result)
+    engine.dispose()
+    return results
+
+
+def _load_summary(result: LoadResult) -> dict[str, float]:
+    summary = {f"p{value}_ms": result.percentile(value) * 1000 for value in PERCENTILES}
+    summary["throughput"] = result.throughput
+    summary["requests"] = result.requests
+    summary["errors"] = result.errors
+    return summary
+
+
+def compare(
+    results: dict[str, Any],
+    baseline: dict[str, Any],
+    threshold: float,
+) -> list[str]:
+    """
+    Return the measures whose p50 or p99 grew more than `threshold` over the
+    baseline.
+    """
+    regressions = []
+    for fleet, kinds in results["fleets"].items():
+        for kind, measures in kinds.items():
+            for name, summary in measures.items():
+                before = baseline.get("fleets", {}).get(fleet, {}).get(kind, {})
+                before = before.get(name)
+                if before is None:
+                    continue
+                for key in ("p50_ms", "p99_ms"):
+                    if before[key] and summary[key] > before[key] * (1 + threshold):
+                        regressions.append(
+                            f"{fleet} {kind} {name} {key}: {before[key]:.2f}"
+                            f" -> {summary[key]:.2f}"
+                        )
+    return regressions
+
+
+def print_results(results: dict[str, Any]) -> None:
+    for fleet, kinds in results["fleets"].items():
+        for kind, measures in kinds.items():
+            print(f"\n{fleet} {kind}")
+            print(
+                f"{'':<56}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"
+                f"{'ops/s':>10}{'errors':>8}"
+            )
+            for name, summary in measures.items():
+                print(
+                    f"{name:<56}{summary['p50_ms']:>10.2f}{summary['p90_ms']:>10.2f}"
+                    f"{summary['p99_ms']:>10.2f}{summary['throughput']:>10.1f}"
+                    f"{summary['errors']:>8}"
+                )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--fleets", nargs="+", choices=list(FLEETS), default=["1k"])
+    parser.add_argument("--cache-dir", type=Path, default=ROOT / ".benchmarks")
+    parser.add_argument("--output", type=Path)
+    parser.add_argument("--baseline", type=Path)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--duration", type=float, default=3)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-calls", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--skip-routes", action="store_true")
+    parser.add_argument("--skip-service", action="store_true")
+    args = parser.parse_args()
+    output = args.output or args.cache_dir / "results.json"
+    baseline_path = args.baseline or args.cache_dir / "baseline.json"
+    results: dict[str, Any] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "fleets": {},
+    }
+    for name in args.fleets:
+        fleet = prepare_fleet(args.cache_dir, name, args.workers)
+        measures: dict[str, Any] = {}
+        with tempfile.TemporaryDirectory() as directory:
+            if not args.skip_routes:
+                database = Path(directory) / "routes.db"
+                shutil.copy(fleet.database, database)
+                measures["routes"] = measure_routes(
+                    fleet, database, args.concurrency, args.duration
+                )
+            if not args.skip_service:
+                database = Path(directory) / "service.db"
+                shutil.copy(fleet.database, database)
+                measures["service"] = measure_service(
+                    fleet, database, args.duration, args.max_calls
+                )
+        results["fleets"][name] = measures
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+    print_results(results)
+    print(f"\nresults written to {output}")
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy(output, baseline_path)
+        print(f"baseline saved to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}, run with --save-baseline")
+        return
+    regressions = compare(
+        results, json.loads(baseline_path.read_text()), args.threshold
+    )
+    for regression in regressions:
+        print(f"regression: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
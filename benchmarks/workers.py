@@ -0,0 +1,59 @@
+"""
+Measure how the throughput of the API scales with the number of uvicorn
+workers, all of them sharing the same database.
+
+    python -m benchmarks.workers --drones 10000 --workers 1 2 4 --duration 10
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+from pathlib import Path
+
+from .http_load import HttpRequest, run_load
+from .server import prepare_database, run_server
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--drones", type=int, default=10000)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, os.cpu_count() or 1}),
+    )
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        database = Path(directory) / "drones.db"
+        drones = prepare_database(database, args.drones)
+        requests: list[HttpRequest] = [
+            ("GET", f"/drones/{drone.id}", None) for drone in drones[:1000]
+        ]
+        requests.append(("GET", "/drones?limit=20", None))
+        print(f"{os.cpu_count()} cpus")
+        print("workers  req/s     speedup  p50 ms   p99 ms   errors")
+        baseline = None
+        for workers in args.workers:
+            with run_server(database, workers=workers) as port:
+                # Note: Wait until every worker answers before measuring.
+                asyncio.run(run_load("127.0.0.1", port, requests, workers * 4, 1))
+                result = asyncio.run(
+                    run_load(
+                        "127.0.0.1", port, requests, args.concurrency, args.duration
+                    )
+                )
+            baseline = baseline or result.throughput
+            print(
+                f"{workers:>7}  {result.throughput:>8.1f}"
+                f"  {result.throughput / baseline:>7.2f}x"
+                f"  {result.percentile(50) * 1000:>7.2f}"
+                f"  {result.percentile(99) * 1000:>7.2f}  {result.errors:>7}"
+            )
+
+
+if __name__ == "__main__":
+    main()
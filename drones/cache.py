@@ -0,0 +1,164 @@
+import math
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Callable, Generic, Hashable, Iterable, TypeVar
+from uuid import UUID
+
+from fastapi import Depends
+
+from .metrics import Counter, Gauge, Metric
+from .schemas import (
+    CacheStatsSchema,
+    DroneGetDetailsSchema,
+    MedicationBaseSchema,
+    MedicationProductSchema,
+)
+from .settings import Settings, get_settings
+
+KeyT = TypeVar("KeyT", bound=Hashable)
+ValueT = TypeVar("ValueT")
+
+
+class LRUCache(Generic[KeyT, ValueT]):
+    """
+    Thread safe cache that keeps at most `max_size` entries, evicting the least
+    recently used one, and expires every entry `ttl` seconds after it is set.
+    A `max_size` of zero disables the cache.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        ttl: float,
+        clock: Callable[[], float] = monotonic,
+    ) -> None:
+        self.__max_size = max_size
+        self.__ttl = ttl
+        self.__clock = clock
+        self.__entries: OrderedDict[KeyT, tuple[float, ValueT]] = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, key: KeyT) -> ValueT | None:
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is None or entry[0] <= self.__clock():
+                if entry is not None:
+                    del self.__entries[key]
+                self.__misses += 1
+                return None
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return entry[1]
+
+    def set(self, key: KeyT, value: ValueT) -> None:
+        if self.__max_size <= 0:
+            return
+        with self.__lock:
+            self.__entries[key] = (self.__clock() + self.__ttl, value)
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+
+    def invalidate(self, key: KeyT) -> None:
+        with self.__lock:
+            self.__entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> CacheStatsSchema:
+        with self.__lock:
+            return CacheStatsSchema(
+                size=len(self.__entries),
+                max_size=self.__max_size,
+                hits=self.__hits,
+                misses=self.__misses,
+            )
+
+
+# Note: The details are cached along with the version of the drone they were
+# read at, so they can be checked against a version read from the database.
+DroneDetailsCache = LRUCache[UUID, tuple[int, DroneGetDetailsSchema]]
+
+__drone_details_cache: DroneDetailsCache | None = None
+
+
+def get_drone_details_cache(
+    settings: Settings = Depends(get_settings),
+) -> DroneDetailsCache:
+    global __drone_details_cache
+    if __drone_details_cache is None:
+        __drone_details_cache = LRUCache(
+            settings.drone_details_cache_size,
+            settings.drone_details_cache_ttl,
+        )
+    return __drone_details_cache
+
+
+# Note: The products of the catalog are identified by their code, name and
+# image, the description of the medications loaded with them.
+ProductKey = tuple[str, str, str]
+
+
+def product_key(
+    medication: MedicationBaseSchema | MedicationProductSchema,
+) -> ProductKey:
+    return medication.code, medication.name, str(medication.image)
+
+
+class MedicationCatalog:
+    """
+    In process cache of the products of the medication catalog, by id and by
+    their key. The products are never changed once added, so the entries do
+    not expire and are valid in every process.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.__products = LRUCache[int, MedicationProductSchema](max_size, math.inf)
+        self.__ids = LRUCache[ProductKey, int](max_size, math.inf)
+
+    def get(self, product_id: int) -> MedicationProductSchema | None:
+        return self.__products.get(product_id)
+
+    def get_id(self, key: ProductKey) -> int | None:
+        return self.__ids.get(key)
+
+    def add(self, products: Iterable[MedicationProductSchema]) -> None:
+        for product in products:
+            self.__products.set(product.id, product)
+            self.__ids.set(product_key(product), product.id)
+
+    def stats(self) -> CacheStatsSchema:
+        return self.__products.stats()
+
+
+__medication_catalog: MedicationCatalog | None = None
+
+
+def get_medication_catalog(
+    settings: Settings = Depends(get_settings),
+) -> MedicationCatalog:
+    global __medication_catalog
+    if __medication_catalog is None:
+        __medication_catalog = MedicationCatalog(settings.medication_catalog_cache_size)
+    return __medication_catalog
+
+
+def drone_details_cache_metrics() -> list[Metric]:
+    """
+    Collect the stats of the drone details cache for the metrics registry.
+    """
+    stats = get_drone_details_cache(get_settings()).stats()
+    hits = Counter("drones_details_cache_hits_total", "Hits of the details cache.")
+    hits.inc(amount=stats.hits)
+    misses = Counter(
+        "drones_details_cache_misses_total", "Misses of the details cache."
+    )
+    misses.inc(amount=stats.misses)
+    size = Gauge("drones_details_cache_size", "Entries in the details cache.")
+    size.set(stats.size)
+    return [hits, misses, size]
@@ -1,39 +1,212 @@
+import os
 from enum import IntEnum, auto
-from typing import Iterable
+from typing import Any, AsyncIterator, Iterable
 from uuid import UUID, uuid4
 
 import sqlalchemy as sqla
 from fastapi import Depends
 from pydantic import AnyHttpUrl
-from sqlmodel import Field, Session, SQLModel, create_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlmodel import Field, Relationship, Session, SQLModel, create_engine
 from sqlmodel.sql.expression import Select, SelectOfScalar
 
-from ..settings import Settings, get_settings
+from ..metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
+from ..query_budget import track_statements
+from ..settings import DatabaseProfile, QueryBudgetMode, Settings, get_settings
 
 SelectOfScalar.inherit_cache = True  # type: ignore
 Select.inherit_cache = True  # type: ignore
 
 
+FLEET_ID = 1
+
 __engine: sqla.engine.Engine | None = None
+__read_engine: sqla.engine.Engine | None = None
+__async_engine: AsyncEngine | None = None
+__async_read_engine: AsyncEngine | None = None
+
+
+def get_sqlite_pragmas(settings: Settings, query_only: bool = False) -> dict[str, Any]:
+    """
+    Return the pragmas to set on every new connection of an engine.
+    """
+    pragmas: dict[str, Any] = {}
+    if settings.database_profile == DatabaseProfile.PRODUCTION:
+        pragmas["journal_mode"] = settings.database_journal_mode
+        pragmas["synchronous"] = settings.database_synchronous
+        pragmas["busy_timeout"] = settings.database_busy_timeout
+        pragmas["cache_size"] = settings.database_cache_size
+        pragmas["mmap_size"] = settings.database_mmap_size
+    if query_only:
+        pragmas["query_only"] = "ON"
+    return pragmas
+
+
+def set_sqlite_pragmas(engine: sqla.engine.Engine, pragmas: dict[str, Any]) -> None:
+    if not pragmas or engine.dialect.name != "sqlite":
+        return
+
+    @sqla.event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def build_engine(
+    settings: Settings,
+    pool_size: int,
+    query_only: bool = False,
+    name: str = "primary",
+) -> sqla.engine.Engine:
+    connect_args = {"check_same_thread": False}
+    pool_args: dict[str, Any] = {}
+    if settings.database_profile == DatabaseProfile.PRODUCTION:
+        pool_args = {
+            "poolclass": TimedQueuePool,
+            "pool_logging_name": name,
+            "pool_size": pool_size,
+            "max_overflow": settings.database_max_overflow,
+            "pool_timeout": settings.database_pool_timeout,
+        }
+    engine = create_engine(
+        settings.database_url,
+        echo=settings.database_debug,
+        connect_args=connect_args,
+        **pool_args,
+    )
+    set_sqlite_pragmas(engine, get_sqlite_pragmas(settings, query_only))
+    if settings.metrics:
+        instrument_engine(engine, name)
+    if settings.query_budget != QueryBudgetMode.OFF:
+        track_statements(engine)
+    return engine
+
+
+def build_async_engine(
+    settings: Settings,
+    pool_size: int,
+    query_only: bool = False,
+    name: str = "async",
+) -> AsyncEngine:
+    connect_args = {"check_same_thread": False}
+    # Note: Keep the aiosqlite connections open, each one of them owns a
+    # thread that would be started again on every checkout otherwise.
+    engine = create_async_engine(
+        settings.database_async_url,
+        echo=settings.database_debug,
+        connect_args=connect_args,
+        poolclass=TimedAsyncAdaptedQueuePool,
+        pool_size=pool_size,
+        pool_logging_name=name,
+    )
+    set_sqlite_pragmas(engine.sync_engine, get_sqlite_pragmas(settings, query_only))
+    if settings.metrics:
+        instrument_engine(engine.sync_engine, name)
+    if settings.query_budget != QueryBudgetMode.OFF:
+        track_statements(engine.sync_engine)
+    return engine
 
 
 def get_engine(settings: Settings = Depends(get_settings)) -> sqla.engine.Engine:
     global __engine
     if __engine is None:
-        connect_args = {"check_same_thread": False}
-        __engine = create_engine(
-            settings.database_url,
-            echo=settings.database_debug,
-            connect_args=connect_args,
-        )
+        __engine = build_engine(settings, settings.database_pool_size)
     return __engine
 
 
+def get_read_engine(settings: Settings = Depends(get_settings)) -> sqla.engine.Engine:
+    """
+    Return the engine of the read only pool, or the main engine when the read
+    only pool is disabled.
+    """
+    global __read_engine
+    if not settings.database_read_pool:
+        return get_engine(settings)
+    if __read_engine is None:
+        __read_engine = build_engine(
+            settings, settings.database_read_pool_size, query_only=True, name="read"
+        )
+    return __read_engine
+
+
 def get_session(engine: sqla.engine.Engine = Depends(get_engine)) -> Iterable[Session]:
     with Session(engine) as session:
         yield session
 
 
+def get_read_session(
+    engine: sqla.engine.Engine = Depends(get_read_engine),
+) -> Iterable[Session]:
+    with Session(engine) as session:
+        yield session
+
+
+def get_async_engine(settings: Settings = Depends(get_settings)) -> AsyncEngine:
+    global __async_engine
+    if __async_engine is None:
+        __async_engine = build_async_engine(settings, settings.database_async_pool_size)
+    return __async_engine
+
+
+def get_async_read_engine(settings: Settings = Depends(get_settings)) -> AsyncEngine:
+    global __async_read_engine
+    if not settings.database_read_pool:
+        return get_async_engine(settings)
+    if __async_read_engine is None:
+        __async_read_engine = build_async_engine(
+            settings,
+            settings.database_read_pool_size,
+            query_only=True,
+            name="async_read",
+        )
+    return __async_read_engine
+
+
+def reset_engines_after_fork() -> None:
+    """
+    Forget the engines inherited from the parent process, they are built
+    again on first use. The pooled connections are left open for the parent,
+    a SQLite connection must not be used from two processes.
+    """
+    global __engine, __read_engine, __async_engine, __async_read_engine
+    for engine in (__engine, __read_engine):
+        if engine is not None:
+            engine.dispose(close=False)
+    # Note: The connections of the async engines belong to threads that do
+    # not exist in the child, they are dropped along with the engines.
+    __engine = __read_engine = __async_engine = __async_read_engine = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_engines_after_fork)
+
+
+async def dispose_async_engine() -> None:
+    global __async_engine, __async_read_engine
+    if __async_read_engine is not None:
+        await __async_read_engine.dispose()
+        __async_read_engine = None
+    if __async_engine is not None:
+        await __async_engine.dispose()
+        __async_engine = None
+
+
+async def get_async_session() -> AsyncIterator[AsyncSession]:
+    # Note: The settings and the engine are not requested with `Depends` because
+    # sync dependencies are run in the threadpool that the async mode avoids.
+    engine = get_async_engine(get_settings())
+    async with AsyncSession(engine, sync_session_class=Session) as session:
+        yield session
+
+
+async def get_async_read_session() -> AsyncIterator[AsyncSession]:
+    engine = get_async_read_engine(get_settings())
+    async with AsyncSession(engine, sync_session_class=Session) as session:
+        yield session
+
+
 def new_uuid() -> UUID:
     # Note: Work around UUIDs with leading zeros: https://github.com/tiangolo/sqlmodel/issues/25
     # by making sure uuid str does not start with a leading 0
@@ -75,6 +248,114 @@ class Drone(SQLModel, table=True):
     weight_limit: int = Field(gt=0, le=500, nullable=False)
     battery_capacity: float = Field(ge=0, le=100, nullable=False)
     state: DroneState = Field(nullable=False)
+    loaded_weight: int = Field(
+        default=0,
+        ge=0,
+        nullable=False,
+        sa_column_kwargs={"server_default": sqla.text("0")},
+    )
+    version: int = Field(
+        default=1,
+        nullable=False,
+        sa_column_kwargs={"server_default": sqla.text("1")},
+    )
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
+    position_id: int | None = Field(default=None)
+    medications: list["Medication"] = Relationship(back_populates="drone")
+
+
+# Note: The states are rendered as literals because SQLite only uses a partial
+# index when the query repeats its condition with the same values.
+DRONE_AVAILABLE_CONDITION = sqla.text(
+    f"state IN ({DroneState.IDLE:d}, {DroneState.LOADING:d})"
+)
+DRONE_REMAINING_WEIGHT = (
+    Drone.__table__.c.weight_limit - Drone.__table__.c.loaded_weight
+)
+
+sqla.Index(
+    "ix_drones_available",
+    DRONE_REMAINING_WEIGHT,
+    Drone.__table__.c.battery_capacity.desc(),
+    sqlite_where=DRONE_AVAILABLE_CONDITION,
+)
+
+
+# Note: The positions of the drones are indexed in a R*Tree table, kept in sync
+# by triggers on the drones. The id of the position of a drone, picked by the
+# R*Tree, is kept in its `position_id`, never in its rowid, which a VACUUM may
+# renumber. As the FTS5 table of the products, it is created by the migrations.
+DRONE_POSITIONS = sqla.table(
+    "drone_positions",
+    sqla.column("id", sqla.Integer),
+    sqla.column("min_latitude", sqla.Float),
+    sqla.column("max_latitude", sqla.Float),
+    sqla.column("min_longitude", sqla.Float),
+    sqla.column("max_longitude", sqla.Float),
+)
+
+sqla.Index("ix_drones_position_id", Drone.__table__.c.position_id, unique=True)
+
+
+class Fleet(SQLModel, table=True):
+    __tablename__: str = "fleet"
+    id: int = Field(default=FLEET_ID, primary_key=True, nullable=False)
+    version: int = Field(default=1, nullable=False)
+
+
+class DroneStats(SQLModel, table=True):
+    """
+    The number of drones, and the sum of their battery capacity and loaded
+    weight, of every state, model and battery level, the integer part of the
+    battery capacity. It is kept up to date by triggers on the drones, so the
+    statistics of the fleet never need to read them.
+    """
+
+    __tablename__: str = "drone_stats"
+    state: DroneState = Field(primary_key=True, nullable=False)
+    model: DroneModelType = Field(primary_key=True, nullable=False)
+    battery_level: int = Field(primary_key=True, nullable=False)
+    drones: int = Field(default=0, nullable=False)
+    battery_capacity: float = Field(default=0, nullable=False)
+    loaded_weight: int = Field(default=0, nullable=False)
+
+
+# Note: The same truncation the triggers of `drone_stats` apply.
+DRONE_BATTERY_LEVEL = sqla.cast(Drone.__table__.c.battery_capacity, sqla.Integer)
+
+
+class ImportProgress(SQLModel, table=True):
+    __tablename__: str = "import_progress"
+    source: str = Field(primary_key=True, nullable=False)
+    records: int = Field(default=0, nullable=False)
+
+
+class MedicationProduct(SQLModel, table=True):
+    """
+    A product of the catalog of medications, shared by all the medications
+    loaded with the same code, name and image. The unique constraint on them,
+    led by the code, also serves the lookups by code.
+    """
+
+    __tablename__: str = "medication_products"
+    __table_args__ = (
+        sqla.UniqueConstraint("code", "name", "image", name="uq_medication_products"),
+    )
+    id: int | None = Field(default=None, primary_key=True, nullable=False)
+    code: str = Field(regex="^[A-Z0-9_]*$", nullable=False)
+    name: str = Field(regex="^[A-Za-z0-9_-]*$", nullable=False)
+    image: AnyHttpUrl = Field(nullable=False)
+
+
+# Note: The names of the products are indexed for prefix search in a FTS5 table
+# kept in sync by triggers. SQLAlchemy can't declare virtual tables, so it is
+# created by the migrations and only described here to be queried.
+MEDICATION_PRODUCTS_FTS = sqla.table(
+    "medication_products_fts",
+    sqla.column("rowid", sqla.Integer),
+    sqla.column("name", sqla.String),
+)
 
 
 class Medication(SQLModel, table=True):
@@ -88,8 +369,41 @@ class Medication(SQLModel, table=True):
             "server_default": sqla.text("uuid_generate_v4()"),
         },
     )
-    name: str = Field(regex="^[A-Za-z0-9_-]*$", nullable=False)
+    product_id: int = Field(foreign_key="medication_products.id", nullable=False)
     weight: int = Field(gt=0, nullable=False)
-    code: str = Field(regex="^[A-Z0-9_]*$", index=True, nullable=False)
-    image: AnyHttpUrl = Field(nullable=False)
     drone_id: UUID = Field(foreign_key="drones.id", index=True, nullable=False)
+    drone: Drone | None = Relationship(back_populates="medications")
+
+
+# Note: The medications of a product are searched after the id of the last one
+# of the previous page, so the index also holds their ids.
+sqla.Index(
+    "ix_medications_product_id_id",
+    Medication.__table__.c.product_id,
+    Medication.__table__.c.id,
+)
+
+
+class BatterySample(SQLModel, table=True):
+    __tablename__: str = "battery_samples"
+    __table_args__ = {"sqlite_with_rowid": False}
+    drone_id: UUID = Field(primary_key=True, nullable=False)
+    timestamp: int = Field(primary_key=True, index=True, nullable=False)
+    battery_capacity: float = Field(ge=0, le=100, nullable=False)
+
+
+class BatteryRollup(SQLModel, table=True):
+    __tablename__: str = "battery_rollups"
+    __table_args__ = (
+        sqla.Index(
+            "ix_battery_rollups_resolution_timestamp", "resolution", "timestamp"
+        ),
+        {"sqlite_with_rowid": False},
+    )
+    drone_id: UUID = Field(primary_key=True, nullable=False)
+    resolution: int = Field(primary_key=True, nullable=False)
+    timestamp: int = Field(primary_key=True, nullable=False)
+    min_battery_capacity: float = Field(ge=0, le=100, nullable=False)
+    max_battery_capacity: float = Field(ge=0, le=100, nullable=False)
+    avg_battery_capacity: float = Field(ge=0, le=100, nullable=False)
+    samples: int = Field(gt=0, nullable=False)
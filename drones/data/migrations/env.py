@@ -2,8 +2,9 @@ from logging.config import fileConfig
 
 from alembic import context
 from drones.data.database import *  # noqa: F401, F403
+from drones.data.database import DRONE_POSITIONS, MEDICATION_PRODUCTS_FTS
 from drones.settings import get_settings
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import Column, engine_from_config, pool
 from sqlmodel import SQLModel
 
 # this is the Alembic Config object, which provides
@@ -22,6 +23,19 @@ target_metadata = SQLModel.metadata
 
 config.set_main_option("sqlalchemy.url", get_settings().database_url)
 
+
+def include_object(object, name, type_, reflected, compare_to):
+    # SQLAlchemy can't reflect expression-based indexes, so autogenerate would
+    # add them again on every revision.
+    if type_ == "index" and not reflected and compare_to is None:
+        return all(isinstance(expression, Column) for expression in object.expressions)
+    # The FTS5 and R*Tree tables, and their shadow tables, are created by the
+    # migrations, SQLAlchemy can't declare virtual tables.
+    if type_ == "table" and reflected and compare_to is None:
+        return not name.startswith((MEDICATION_PRODUCTS_FTS.name, DRONE_POSITIONS.name))
+    return True
+
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -66,7 +80,11 @@ def run_migrations_online():
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+        )
 
         with context.begin_transaction():
             context.run_migrations()
@@ -0,0 +1,90 @@
+"""drone stats
+
+Revision ID: 1e7c4b9a3d58
+Revises: 6f3a9d2b7e14
+Create Date: 2026-10-19 18:40:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "1e7c4b9a3d58"
+down_revision = "6f3a9d2b7e14"
+branch_labels = None
+depends_on = None
+
+
+def count_drone(row: str, sign: str) -> str:
+    return f"""
+        INSERT INTO drone_stats (
+            state, model, battery_level, drones, battery_capacity, loaded_weight
+        )
+        VALUES (
+            {row}.state,
+            {row}.model,
+            CAST({row}.battery_capacity AS INTEGER),
+            {sign}1,
+            {sign}{row}.battery_capacity,
+            {sign}{row}.loaded_weight
+        )
+        ON CONFLICT (state, model, battery_level) DO UPDATE SET
+            drones = drones + excluded.drones,
+            battery_capacity = battery_capacity + excluded.battery_capacity,
+            loaded_weight = loaded_weight + excluded.loaded_weight;
+    """
+
+
+def upgrade():
+    op.create_table(
+        "drone_stats",
+        sa.Column("state", sa.Integer(), nullable=False),
+        sa.Column("model", sa.Integer(), nullable=False),
+        sa.Column("battery_level", sa.Integer(), nullable=False),
+        sa.Column("drones", sa.Integer(), nullable=False),
+        sa.Column("battery_capacity", sa.Float(), nullable=False),
+        sa.Column("loaded_weight", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("state", "model", "battery_level"),
+    )
+    op.execute(f"""
+        CREATE TRIGGER drone_stats_insert
+        AFTER INSERT ON drones
+        BEGIN
+            {count_drone("new", "+")}
+        END
+        """)
+    op.execute(f"""
+        CREATE TRIGGER drone_stats_update
+        AFTER UPDATE OF state, model, battery_capacity, loaded_weight ON drones
+        BEGIN
+            {count_drone("old", "-")}
+            {count_drone("new", "+")}
+        END
+        """)
+    op.execute(f"""
+        CREATE TRIGGER drone_stats_delete
+        AFTER DELETE ON drones
+        BEGIN
+            {count_drone("old", "-")}
+        END
+        """)
+    op.execute("""
+        INSERT INTO drone_stats
+        SELECT
+            state,
+            model,
+            CAST(battery_capacity AS INTEGER),
+            COUNT(*),
+            SUM(battery_capacity),
+            SUM(loaded_weight)
+        FROM drones
+        GROUP BY 1, 2, 3
+        """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER drone_stats_delete")
+    op.execute("DROP TRIGGER drone_stats_update")
+    op.execute("DROP TRIGGER drone_stats_insert")
+    op.drop_table("drone_stats")
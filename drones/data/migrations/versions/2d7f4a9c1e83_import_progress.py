@@ -0,0 +1,30 @@
+"""import progress
+
+Revision ID: 2d7f4a9c1e83
+Revises: 5e0b9d4c2a61
+Create Date: 2026-10-18 23:10:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "2d7f4a9c1e83"
+down_revision = "5e0b9d4c2a61"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "import_progress",
+        sa.Column("source", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("records", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("source"),
+    )
+
+
+def downgrade():
+    op.drop_table("import_progress")
@@ -0,0 +1,41 @@
+"""drones loaded weight
+
+Revision ID: 3f1c2a7d9b40
+Revises: bd5ee664f89f
+Create Date: 2026-10-18 17:30:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "3f1c2a7d9b40"
+down_revision = "bd5ee664f89f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "drones",
+        sa.Column(
+            "loaded_weight",
+            sa.Integer(),
+            server_default=sa.text("0"),
+            nullable=False,
+        ),
+    )
+    op.execute("""
+        UPDATE drones
+        SET loaded_weight = (
+            SELECT COALESCE(SUM(medications.weight), 0)
+            FROM medications
+            WHERE medications.drone_id = drones.id
+        )
+        """)
+
+
+def downgrade():
+    with op.batch_alter_table("drones") as batch_op:
+        batch_op.drop_column("loaded_weight")
@@ -0,0 +1,74 @@
+"""medication products search
+
+Revision ID: 4b8d1f6e2c95
+Revises: 9c2e5b7a4f16
+Create Date: 2026-10-19 12:40:00.000000
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "4b8d1f6e2c95"
+down_revision = "9c2e5b7a4f16"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.drop_index("ix_medications_product_id", table_name="medications")
+    op.create_index(
+        "ix_medications_product_id_id",
+        "medications",
+        ["product_id", "id"],
+        unique=False,
+    )
+    op.execute("""
+        CREATE VIRTUAL TABLE medication_products_fts USING fts5(
+            name,
+            content='medication_products',
+            content_rowid='id',
+            prefix='2 3'
+        )
+        """)
+    op.execute("""
+        CREATE TRIGGER medication_products_fts_insert
+        AFTER INSERT ON medication_products
+        BEGIN
+            INSERT INTO medication_products_fts (rowid, name)
+            VALUES (new.id, new.name);
+        END
+        """)
+    op.execute("""
+        CREATE TRIGGER medication_products_fts_delete
+        AFTER DELETE ON medication_products
+        BEGIN
+            INSERT INTO medication_products_fts (medication_products_fts, rowid, name)
+            VALUES ('delete', old.id, old.name);
+        END
+        """)
+    op.execute("""
+        CREATE TRIGGER medication_products_fts_update
+        AFTER UPDATE ON medication_products
+        BEGIN
+            INSERT INTO medication_products_fts (medication_products_fts, rowid, name)
+            VALUES ('delete', old.id, old.name);
+            INSERT INTO medication_products_fts (rowid, name)
+            VALUES (new.id, new.name);
+        END
+        """)
+    op.execute(
+        "INSERT INTO medication_products_fts (medication_products_fts) "
+        "VALUES ('rebuild')"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER medication_products_fts_update")
+    op.execute("DROP TRIGGER medication_products_fts_delete")
+    op.execute("DROP TRIGGER medication_products_fts_insert")
+    op.execute("DROP TABLE medication_products_fts")
+    op.drop_index("ix_medications_product_id_id", table_name="medications")
+    op.create_index(
+        "ix_medications_product_id", "medications", ["product_id"], unique=False
+    )
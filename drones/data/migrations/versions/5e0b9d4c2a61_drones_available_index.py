@@ -0,0 +1,30 @@
+"""drones available index
+
+Revision ID: 5e0b9d4c2a61
+Revises: c7b3e9a15d42
+Create Date: 2026-10-18 21:40:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "5e0b9d4c2a61"
+down_revision = "c7b3e9a15d42"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_drones_available",
+        "drones",
+        [sa.text("weight_limit - loaded_weight"), sa.text("battery_capacity DESC")],
+        unique=False,
+        sqlite_where=sa.text("state IN (0, 1)"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_drones_available", table_name="drones")
@@ -0,0 +1,109 @@
+"""drone positions
+
+Revision ID: 6f3a9d2b7e14
+Revises: 4b8d1f6e2c95
+Create Date: 2026-10-19 15:05:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "6f3a9d2b7e14"
+down_revision = "4b8d1f6e2c95"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("drones", sa.Column("latitude", sa.Float(), nullable=True))
+    op.add_column("drones", sa.Column("longitude", sa.Float(), nullable=True))
+    op.add_column("drones", sa.Column("position_id", sa.Integer(), nullable=True))
+    op.create_index("ix_drones_position_id", "drones", ["position_id"], unique=True)
+    op.execute("""
+        CREATE VIRTUAL TABLE drone_positions USING rtree(
+            id,
+            min_latitude,
+            max_latitude,
+            min_longitude,
+            max_longitude
+        )
+        """)
+    # Note: The R*Tree picks the id of a new position, the drone keeps it in
+    # `position_id` while it has a position.
+    op.execute("""
+        CREATE TRIGGER drone_positions_insert
+        AFTER INSERT ON drones
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+        BEGIN
+            INSERT INTO drone_positions
+            VALUES (
+                NULL, new.latitude, new.latitude, new.longitude, new.longitude
+            );
+            UPDATE drones SET position_id = last_insert_rowid() WHERE id = new.id;
+        END
+        """)
+    op.execute("""
+        CREATE TRIGGER drone_positions_update
+        AFTER UPDATE OF latitude, longitude ON drones
+        WHEN new.position_id IS NOT NULL
+            AND new.latitude IS NOT NULL
+            AND new.longitude IS NOT NULL
+        BEGIN
+            UPDATE drone_positions
+            SET
+                min_latitude = new.latitude,
+                max_latitude = new.latitude,
+                min_longitude = new.longitude,
+                max_longitude = new.longitude
+            WHERE id = new.position_id;
+        END
+        """)
+    op.execute("""
+        CREATE TRIGGER drone_positions_add
+        AFTER UPDATE OF latitude, longitude ON drones
+        WHEN new.position_id IS NULL
+            AND new.latitude IS NOT NULL
+            AND new.longitude IS NOT NULL
+        BEGIN
+            INSERT INTO drone_positions
+            VALUES (
+                NULL, new.latitude, new.latitude, new.longitude, new.longitude
+            );
+            UPDATE drones SET position_id = last_insert_rowid() WHERE id = new.id;
+        END
+        """)
+    op.execute("""
+        CREATE TRIGGER drone_positions_remove
+        AFTER UPDATE OF latitude, longitude ON drones
+        WHEN new.position_id IS NOT NULL
+            AND (new.latitude IS NULL OR new.longitude IS NULL)
+        BEGIN
+            DELETE FROM drone_positions WHERE id = new.position_id;
+            UPDATE drones SET position_id = NULL WHERE id = new.id;
+        END
+        """)
+    op.execute("""
+        CREATE TRIGGER drone_positions_delete
+        AFTER DELETE ON drones
+        WHEN old.position_id IS NOT NULL
+        BEGIN
+            DELETE FROM drone_positions WHERE id = old.position_id;
+        END
+        """)
+
+
+def downgrade():
+    op.execute("DROP TRIGGER drone_positions_delete")
+    op.execute("DROP TRIGGER drone_positions_remove")
+    op.execute("DROP TRIGGER drone_positions_add")
+    op.execute("DROP TRIGGER drone_positions_update")
+    op.execute("DROP TRIGGER drone_positions_insert")
+    op.execute("DROP TABLE drone_positions")
+    op.drop_index("ix_drones_position_id", table_name="drones")
+    # Note: A batch operation would rebuild the table without the expression
+    # based index `ix_drones_available`, SQLite drops the columns in place.
+    op.drop_column("drones", "position_id")
+    op.drop_column("drones", "longitude")
+    op.drop_column("drones", "latitude")
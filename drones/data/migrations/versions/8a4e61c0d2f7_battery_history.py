@@ -0,0 +1,62 @@
+"""battery history
+
+Revision ID: 8a4e61c0d2f7
+Revises: 3f1c2a7d9b40
+Create Date: 2026-10-18 18:10:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "8a4e61c0d2f7"
+down_revision = "3f1c2a7d9b40"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "battery_samples",
+        sa.Column("drone_id", sqlmodel.sql.sqltypes.GUID(), nullable=False),
+        sa.Column("timestamp", sa.Integer(), nullable=False),
+        sa.Column("battery_capacity", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("drone_id", "timestamp"),
+        sqlite_with_rowid=False,
+    )
+    op.create_index(
+        op.f("ix_battery_samples_timestamp"),
+        "battery_samples",
+        ["timestamp"],
+        unique=False,
+    )
+    op.create_table(
+        "battery_rollups",
+        sa.Column("drone_id", sqlmodel.sql.sqltypes.GUID(), nullable=False),
+        sa.Column("resolution", sa.Integer(), nullable=False),
+        sa.Column("timestamp", sa.Integer(), nullable=False),
+        sa.Column("min_battery_capacity", sa.Float(), nullable=False),
+        sa.Column("max_battery_capacity", sa.Float(), nullable=False),
+        sa.Column("avg_battery_capacity", sa.Float(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("drone_id", "resolution", "timestamp"),
+        sqlite_with_rowid=False,
+    )
+    op.create_index(
+        op.f("ix_battery_rollups_resolution_timestamp"),
+        "battery_rollups",
+        ["resolution", "timestamp"],
+        unique=False,
+    )
+
+
+def downgrade():
+    op.drop_index(
+        op.f("ix_battery_rollups_resolution_timestamp"),
+        table_name="battery_rollups",
+    )
+    op.drop_table("battery_rollups")
+    op.drop_index(op.f("ix_battery_samples_timestamp"), table_name="battery_samples")
+    op.drop_table("battery_samples")
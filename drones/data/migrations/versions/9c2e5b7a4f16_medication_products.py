@@ -0,0 +1,95 @@
+"""medication products
+
+Revision ID: 9c2e5b7a4f16
+Revises: 2d7f4a9c1e83
+Create Date: 2026-10-19 10:20:00.000000
+
+"""
+
+import sqlalchemy as sa
+import sqlmodel
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "9c2e5b7a4f16"
+down_revision = "2d7f4a9c1e83"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "medication_products",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("code", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.Column("image", sqlmodel.sql.sqltypes.AutoString(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("code", "name", "image", name="uq_medication_products"),
+    )
+    op.execute("""
+        INSERT INTO medication_products (code, name, image)
+        SELECT code, name, image
+        FROM medications
+        GROUP BY code, name, image
+        ORDER BY MIN(rowid)
+        """)
+    op.add_column("medications", sa.Column("product_id", sa.Integer(), nullable=True))
+    op.execute("""
+        UPDATE medications
+        SET product_id = (
+            SELECT medication_products.id
+            FROM medication_products
+            WHERE medication_products.code = medications.code
+            AND medication_products.name = medications.name
+            AND medication_products.image = medications.image
+        )
+        """)
+    with op.batch_alter_table("medications") as batch_op:
+        batch_op.alter_column("product_id", existing_type=sa.Integer(), nullable=False)
+        batch_op.create_foreign_key(
+            "fk_medications_product_id",
+            "medication_products",
+            ["product_id"],
+            ["id"],
+        )
+        batch_op.create_index(
+            batch_op.f("ix_medications_product_id"), ["product_id"], unique=False
+        )
+        batch_op.drop_index("ix_medications_code")
+        batch_op.drop_column("name")
+        batch_op.drop_column("code")
+        batch_op.drop_column("image")
+
+
+def downgrade():
+    with op.batch_alter_table("medications") as batch_op:
+        batch_op.add_column(
+            sa.Column("name", sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("code", sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+        )
+        batch_op.add_column(
+            sa.Column("image", sqlmodel.sql.sqltypes.AutoString(), nullable=True)
+        )
+    op.execute("""
+        UPDATE medications
+        SET (name, code, image) = (
+            SELECT name, code, image
+            FROM medication_products
+            WHERE medication_products.id = medications.product_id
+        )
+        """)
+    with op.batch_alter_table("medications") as batch_op:
+        for column in ("name", "code", "image"):
+            batch_op.alter_column(
+                column,
+                existing_type=sqlmodel.sql.sqltypes.AutoString(),
+                nullable=False,
+            )
+        batch_op.create_index("ix_medications_code", ["code"], unique=False)
+        batch_op.drop_index("ix_medications_product_id")
+        batch_op.drop_constraint("fk_medications_product_id", type_="foreignkey")
+        batch_op.drop_column("product_id")
+    op.drop_table("medication_products")
@@ -0,0 +1,41 @@
+"""drone versions
+
+Revision ID: c7b3e9a15d42
+Revises: 8a4e61c0d2f7
+Create Date: 2026-10-18 20:05:00.000000
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "c7b3e9a15d42"
+down_revision = "8a4e61c0d2f7"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column(
+        "drones",
+        sa.Column(
+            "version",
+            sa.Integer(),
+            server_default=sa.text("1"),
+            nullable=False,
+        ),
+    )
+    fleet = op.create_table(
+        "fleet",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.bulk_insert(fleet, [{"id": 1, "version": 1}])
+
+
+def downgrade():
+    op.drop_table("fleet")
+    with op.batch_alter_table("drones") as batch_op:
+        batch_op.drop_column("version")
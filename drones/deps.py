@@ -1,11 +1,44 @@
-from fastapi import Depends
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, TypeVar
+
+from fastapi import Depends, HTTPException, Request, status
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlmodel import Session
 
-from .data.database import get_engine, get_session
+from .cache import (
+    DroneDetailsCache,
+    MedicationCatalog,
+    get_drone_details_cache,
+    get_medication_catalog,
+)
+from .data.database import (
+    get_async_read_session,
+    get_async_session,
+    get_engine,
+    get_read_session,
+    get_session,
+)
+from .repositories.battery_history_repository import BatteryHistoryRepository
 from .repositories.drone_repository import DroneRepository
+from .repositories.import_repository import ImportRepository
 from .repositories.medication_repository import MedicationRepository
+from .schemas import DronePostSchema
+from .services.async_battery_history_service import AsyncBatteryHistoryService
+from .services.async_drone_service import AsyncDroneService
+from .services.async_service import AsyncService
+from .services.battery_history_service import BatteryHistoryService
 from .services.drone_service import DroneService
+from .services.import_service import ImportService
 from .settings import Settings, get_settings
+from .telemetry import TelemetryBuffer, get_telemetry_buffer
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+CSV_MEDIA_TYPE = "text/csv"
+
+AsyncServiceT = TypeVar("AsyncServiceT", bound=AsyncService)
 
 
 def get_drone_repository(session: Session = Depends(get_session)) -> DroneRepository:
@@ -18,18 +51,215 @@ def get_medication_repository(
     return MedicationRepository(session)
 
 
+def get_battery_history_repository(
+    session: Session = Depends(get_session),
+) -> BatteryHistoryRepository:
+    return BatteryHistoryRepository(session)
+
+
+def get_read_drone_repository(
+    session: Session = Depends(get_read_session),
+) -> DroneRepository:
+    return DroneRepository(session)
+
+
+def get_read_medication_repository(
+    session: Session = Depends(get_read_session),
+) -> MedicationRepository:
+    return MedicationRepository(session)
+
+
+def get_read_battery_history_repository(
+    session: Session = Depends(get_read_session),
+) -> BatteryHistoryRepository:
+    return BatteryHistoryRepository(session)
+
+
 def get_drone_service(
     drone_repository: DroneRepository = Depends(get_drone_repository),
     medication_repository: MedicationRepository = Depends(get_medication_repository),
+    details_cache: DroneDetailsCache = Depends(get_drone_details_cache),
+    telemetry_buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
+    catalog: MedicationCatalog = Depends(get_medication_catalog),
     settings: Settings = Depends(get_settings),
 ) -> DroneService:
     return DroneService(
         drone_repository,
         medication_repository,
         settings.min_battery_capacity_for_loading,
+        details_cache,
+        telemetry_buffer,
+        catalog,
+    )
+
+
+def get_battery_history_service(
+    battery_history_repository: BatteryHistoryRepository = Depends(
+        get_battery_history_repository
+    ),
+    drone_repository: DroneRepository = Depends(get_drone_repository),
+    settings: Settings = Depends(get_settings),
+) -> BatteryHistoryService:
+    return BatteryHistoryService(
+        battery_history_repository,
+        drone_repository,
+        settings.time_interval_battery,
+        settings.battery_history_raw_retention,
+        settings.battery_history_minute_retention,
+        settings.battery_history_hour_retention,
+        settings.battery_history_max_points,
+    )
+
+
+def get_read_drone_service(
+    drone_repository: DroneRepository = Depends(get_read_drone_repository),
+    medication_repository: MedicationRepository = Depends(
+        get_read_medication_repository
+    ),
+    details_cache: DroneDetailsCache = Depends(get_drone_details_cache),
+    telemetry_buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
+    catalog: MedicationCatalog = Depends(get_medication_catalog),
+    settings: Settings = Depends(get_settings),
+) -> DroneService:
+    return get_drone_service(
+        drone_repository,
+        medication_repository,
+        details_cache,
+        telemetry_buffer,
+        catalog,
+        settings,
+    )
+
+
+def get_read_battery_history_service(
+    battery_history_repository: BatteryHistoryRepository = Depends(
+        get_read_battery_history_repository
+    ),
+    drone_repository: DroneRepository = Depends(get_read_drone_repository),
+    settings: Settings = Depends(get_settings),
+) -> BatteryHistoryService:
+    return get_battery_history_service(
+        battery_history_repository, drone_repository, settings
+    )
+
+
+def build_drone_service(session: Session, settings: Settings) -> DroneService:
+    return DroneService(
+        DroneRepository(session),
+        MedicationRepository(session),
+        settings.min_battery_capacity_for_loading,
+        get_drone_details_cache(settings),
+        get_telemetry_buffer(),
+        get_medication_catalog(settings),
+    )
+
+
+def build_battery_history_service(
+    session: Session,
+    settings: Settings,
+) -> BatteryHistoryService:
+    return BatteryHistoryService(
+        BatteryHistoryRepository(session),
+        DroneRepository(session),
+        settings.time_interval_battery,
+        settings.battery_history_raw_retention,
+        settings.battery_history_minute_retention,
+        settings.battery_history_hour_retention,
+        settings.battery_history_max_points,
     )
 
 
+def get_async_service_dependency(
+    async_service_class: type[AsyncServiceT],
+    get_service: Callable[..., Any],
+    build_service: Callable[[Session, Settings], Any],
+    get_session: Callable[..., AsyncIterator[AsyncSession]] = get_async_session,
+) -> Callable[..., Awaitable[AsyncServiceT]]:
+    """
+    Return the dependency that provides `async_service_class` for the database
+    mode of the settings: the service from `get_service` run in the threadpool,
+    or the service from `build_service` run with the `AsyncSession` from
+    `get_session`.
+    """
+    if get_settings().database_async:
+
+        async def get_async_session_service(
+            session: AsyncSession = Depends(get_session),
+        ) -> AsyncServiceT:
+            settings = get_settings()
+            return async_service_class.from_async_session(
+                session,
+                lambda sync_session: build_service(sync_session, settings),
+            )
+
+        return get_async_session_service
+
+    async def get_threadpool_service(
+        service: Any = Depends(get_service),
+    ) -> AsyncServiceT:
+        return async_service_class.from_threadpool(service)
+
+    return get_threadpool_service
+
+
+get_async_drone_service = get_async_service_dependency(
+    AsyncDroneService,
+    get_drone_service,
+    build_drone_service,
+)
+get_async_battery_history_service = get_async_service_dependency(
+    AsyncBatteryHistoryService,
+    get_battery_history_service,
+    build_battery_history_service,
+)
+get_async_read_drone_service = get_async_service_dependency(
+    AsyncDroneService,
+    get_read_drone_service,
+    build_drone_service,
+    get_async_read_session,
+)
+get_async_read_battery_history_service = get_async_service_dependency(
+    AsyncBatteryHistoryService,
+    get_read_battery_history_service,
+    build_battery_history_service,
+    get_async_read_session,
+)
+
+
+async def get_drones_post_bulk(request: Request) -> list[DronePostSchema]:
+    """
+    Read a bulk of drones from a JSON array or a NDJSON body and validate
+    all of them, reporting the errors of every invalid item at once.
+    """
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+            items: Any = [json.loads(line) for line in body.splitlines() if line]
+        else:
+            items = json.loads(body)
+    except json.JSONDecodeError as exc:
+        raise RequestValidationError([ErrorWrapper(exc, ("body", exc.pos))])
+    if not isinstance(items, list):
+        raise RequestValidationError(
+            [ErrorWrapper(TypeError("value is not a valid list"), ("body",))]
+        )
+    if len(items) > get_settings().drones_bulk_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Too many drones in a single bulk",
+        )
+    drones = []
+    errors = []
+    for index, item in enumerate(items):
+        try:
+            drones.append(DronePostSchema.parse_obj(item))
+        except ValidationError as exc:
+            errors.append(ErrorWrapper(exc, ("body", index)))
+    if errors:
+        raise RequestValidationError(errors)
+    return drones
+
+
 class DroneServiceWithoutDepends(DroneService):
     def __init__(self) -> None:
         settings = get_settings()
@@ -42,6 +272,9 @@ class DroneServiceWithoutDepends(DroneService):
             drone_repository,
             medication_repository,
             settings.min_battery_capacity_for_loading,
+            get_drone_details_cache(settings),
+            get_telemetry_buffer(),
+            get_medication_catalog(settings),
         )
 
     def __enter__(self):
@@ -49,3 +282,40 @@ class DroneServiceWithoutDepends(DroneService):
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.__session.close()
+
+
+class BatteryHistoryServiceWithoutDepends(BatteryHistoryService):
+    def __init__(self) -> None:
+        settings = get_settings()
+        engine = get_engine(settings)
+        self.__session = Session(engine)
+        BatteryHistoryService.__init__(
+            self,
+            BatteryHistoryRepository(self.__session),
+            DroneRepository(self.__session),
+            settings.time_interval_battery,
+            settings.battery_history_raw_retention,
+            settings.battery_history_minute_retention,
+            settings.battery_history_hour_retention,
+            settings.battery_history_max_points,
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__session.close()
+
+
+class ImportServiceWithoutDepends(ImportService):
+    def __init__(self) -> None:
+        settings = get_settings()
+        engine = get_engine(settings)
+        self.__session = Session(engine)
+        ImportService.__init__(self, ImportRepository(self.__session))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.__session.close()
@@ -0,0 +1,32 @@
+def first_fit_decreasing(capacities: list[int], weights: list[int]) -> list[int | None]:
+    """
+    Pack the items of `weights` into the bins of `capacities` with the first
+    fit decreasing heuristic: the heaviest items are placed first, each one in
+    the first bin, in the given order, that still has room for it.
+
+    Return, for every item, the index of its bin or `None` if it fits in none.
+    The first bin with room is found in a tree of the maximum remaining
+    capacity of the bins, so every item costs `O(log bins)`.
+    """
+    size = 1
+    while size < len(capacities):
+        size *= 2
+    tree = [0] * (2 * size)
+    tree[size : size + len(capacities)] = capacities
+    for node in range(size - 1, 0, -1):
+        tree[node] = max(tree[2 * node], tree[2 * node + 1])
+    bins: list[int | None] = [None] * len(weights)
+    for item in sorted(range(len(weights)), key=weights.__getitem__, reverse=True):
+        weight = weights[item]
+        if tree[1] < weight:
+            continue
+        node = 1
+        while node < size:
+            node = 2 * node if tree[2 * node] >= weight else 2 * node + 1
+        bins[item] = node - size
+        tree[node] -= weight
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+    return bins
@@ -0,0 +1,26 @@
+from uuid import UUID
+
+
+def drone_etag(drone_id: UUID, version: int, sequence: int | None = None) -> str:
+    """
+    Return the tag of the drone at `version`, and with the buffered telemetry
+    report numbered `sequence` on top of it if there is one.
+    """
+    if sequence is not None:
+        return f'"{drone_id.hex}-{version}.{sequence}"'
+    return f'"{drone_id.hex}-{version}"'
+
+
+def fleet_etag(version: int) -> str:
+    return f'"fleet-{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """
+    Check if the `If-None-Match` header matches `etag`, comparing the tags
+    weakly as required for this header.
+    """
+    if if_none_match is None:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
@@ -0,0 +1,111 @@
+import csv
+import io
+import zlib
+from typing import Any, Iterable, Iterator
+
+import orjson
+
+from .repositories.drone_repository import DRONE_ROW_COLUMNS, MEDICATION_ROW_COLUMNS
+
+DRONE_FIELDS = tuple(column.key for column in DRONE_ROW_COLUMNS)
+MEDICATION_FIELDS = tuple(column.key for column in MEDICATION_ROW_COLUMNS)
+MEDICATION_PREFIX = "medication_"
+
+
+def group_medications(
+    batches: Iterable[list[dict[str, Any]]],
+) -> Iterator[list[dict[str, Any]]]:
+    """
+    Turn the batches of joined drone and medication rows, ordered by drone,
+    into batches of drones with the list of their medications, as in
+    `DroneGetDetailsSchema`. The last drone of a batch is held until the next
+    one, its medications may continue there.
+    """
+    current: dict[str, Any] | None = None
+    for rows in batches:
+        drones = []
+        for row in rows:
+            if current is None or current["id"] != row["id"]:
+                if current is not None:
+                    drones.append(current)
+                current = {field: row[field] for field in DRONE_FIELDS}
+                current["medications"] = []
+            if row["medication_id"] is not None:
+                medication = {
+                    field.removeprefix(MEDICATION_PREFIX): row[field]
+                    for field in MEDICATION_FIELDS
+                }
+                medication["drone_id"] = row["id"]
+                current["medications"].append(medication)
+        if drones:
+            yield drones
+    if current is not None:
+        yield [current]
+
+
+def ndjson_chunks(
+    batches: Iterable[list[dict[str, Any]]],
+    with_medications: bool = False,
+) -> Iterator[bytes]:
+    """
+    Encode every batch of rows as a chunk of NDJSON lines.
+    """
+    if with_medications:
+        batches = group_medications(batches)
+    for rows in batches:
+        yield b"".join(
+            orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE) for row in rows
+        )
+
+
+def csv_chunks(
+    batches: Iterable[list[dict[str, Any]]],
+    with_medications: bool = False,
+) -> Iterator[bytes]:
+    """
+    Encode every batch of rows as a chunk of CSV lines, after a chunk with the
+    header. With `with_medications` there is a line per medication.
+    """
+    fields = DRONE_FIELDS + MEDICATION_FIELDS if with_medications else DRONE_FIELDS
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for rows in batches:
+        writer.writerows([[row[field] for field in fields] for row in rows])
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """
+    Check if the `Accept-Encoding` header accepts gzip with a quality value
+    other than zero.
+    """
+    if accept_encoding is None:
+        return False
+    for coding in accept_encoding.split(","):
+        name, _, params = coding.partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip().lower().removeprefix("q=")
+        try:
+            return float(quality or 1) > 0
+        except ValueError:
+            return False
+    return False
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """
+    Compress the chunks as a single gzip stream, without waiting for all of
+    them.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
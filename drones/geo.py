@@ -0,0 +1,61 @@
+from math import asin, cos, degrees, pi, radians, sin, sqrt
+
+EARTH_RADIUS = 6371.0088
+
+# Note: The radii, in kilometers, of the circles searched for the nearest
+# drones, growing by half a decade so a search reads at most ten times the
+# area it needs, the last one covers the whole Earth.
+SEARCH_RADII = tuple(10 ** (step / 2) for step in range(9)) + (pi * EARTH_RADIUS,)
+
+Box = tuple[float, float, float, float]
+
+
+def distance(
+    latitude1: float, longitude1: float, latitude2: float, longitude2: float
+) -> float:
+    """
+    Return the great circle distance, in kilometers, between two points given
+    in degrees, with the haversine formula.
+    """
+    phi1, phi2 = radians(latitude1), radians(latitude2)
+    half_phi = (phi2 - phi1) / 2
+    half_lambda = radians(longitude2 - longitude1) / 2
+    a = sin(half_phi) ** 2 + cos(phi1) * cos(phi2) * sin(half_lambda) ** 2
+    return 2 * EARTH_RADIUS * asin(min(1.0, sqrt(a)))
+
+
+def bounding_boxes(latitude: float, longitude: float, radius: float) -> list[Box]:
+    """
+    Return the boxes, as `(min_latitude, max_latitude, min_longitude,
+    max_longitude)` in degrees, that hold every point at `radius` kilometers
+    or less from the given one. There are two of them when the circle crosses
+    the antimeridian.
+    """
+    angle = radius / EARTH_RADIUS
+    phi, lam = radians(latitude), radians(longitude)
+    min_phi, max_phi = phi - angle, phi + angle
+    if min_phi <= -pi / 2 or max_phi >= pi / 2 or sin(angle) >= cos(phi):
+        # Note: The circle holds a pole, or is wide enough at its latitude,
+        # so every longitude is in it.
+        return [
+            (
+                degrees(max(min_phi, -pi / 2)),
+                degrees(min(max_phi, pi / 2)),
+                -180.0,
+                180.0,
+            )
+        ]
+    delta = asin(sin(angle) / cos(phi))
+    min_lam, max_lam = lam - delta, lam + delta
+    min_latitude, max_latitude = degrees(min_phi), degrees(max_phi)
+    if min_lam < -pi:
+        return [
+            (min_latitude, max_latitude, degrees(min_lam + 2 * pi), 180.0),
+            (min_latitude, max_latitude, -180.0, degrees(max_lam)),
+        ]
+    if max_lam > pi:
+        return [
+            (min_latitude, max_latitude, degrees(min_lam), 180.0),
+            (min_latitude, max_latitude, -180.0, degrees(max_lam - 2 * pi)),
+        ]
+    return [(min_latitude, max_latitude, degrees(min_lam), degrees(max_lam))]
@@ -1,6 +1,8 @@
 from fastapi import Request, Response, status
 from fastapi.responses import JSONResponse
 
+from .pagination import InvalidCursorError
+from .services.battery_history_service import InvalidTimeRangeError
 from .services.drone_service import (
     DroneCantBeDeletedError,
     DroneCantLoadMedicationsError,
@@ -47,3 +49,23 @@ def medication_not_found_handler(
         status_code=status.HTTP_404_NOT_FOUND,
         content={"details": f"Medication not found: {exc.args[0]}"},
     )
+
+
+def invalid_cursor_handler(
+    _: Request,
+    exc: InvalidCursorError,
+) -> Response:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"details": f"Invalid cursor: {exc.args[0]}"},
+    )
+
+
+def invalid_time_range_handler(
+    _: Request,
+    exc: InvalidTimeRangeError,
+) -> Response:
+    return JSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={"details": f"Invalid time range: {exc.args[0]}"},
+    )
@@ -0,0 +1,265 @@
+"""
+Import drones and their medications from NDJSON or CSV files, in the formats
+of `GET /drones/export`, optionally compressed with gzip.
+
+    python -m drones.importer drones.ndjson --workers 4 --resume
+"""
+
+import argparse
+import csv
+import gzip
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import IO, Any, Callable, Iterable, Iterator, NamedTuple
+from uuid import UUID
+
+import orjson
+from pydantic import ValidationError
+
+from .data.database import new_uuid
+from .deps import ImportServiceWithoutDepends
+from .export import DRONE_FIELDS, MEDICATION_FIELDS, MEDICATION_PREFIX
+from .schemas import DronePostSchema, ExportFormat, MedicationPostSchema
+
+
+class InvalidRecordsError(Exception):
+    pass
+
+
+class ValidatedChunk(NamedTuple):
+    end: int
+    drones: list[dict[str, Any]]
+    medications: list[dict[str, Any]]
+    errors: list[str]
+
+
+class ImportStats(NamedTuple):
+    records: int
+    drones: int
+    medications: int
+    elapsed: float
+
+
+def detect_format(path: Path) -> ExportFormat:
+    suffixes = [suffix.lower() for suffix in path.suffixes if suffix != ".gz"]
+    if suffixes and suffixes[-1] == ".csv":
+        return ExportFormat.CSV
+    return ExportFormat.NDJSON
+
+
+def open_text(path: Path) -> IO[str]:
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, encoding="utf-8", newline="")
+
+
+def read_ndjson(file: IO[str]) -> Iterator[Any]:
+    """
+    Read a record per non empty line, a drone with the list of its
+    medications as in `DroneGetDetailsSchema`.
+    """
+    for number, line in enumerate(file, 1):
+        if line.strip():
+            try:
+                yield orjson.loads(line)
+            except orjson.JSONDecodeError as exc:
+                raise InvalidRecordsError([f"Line {number}: {exc}"]) from None
+
+
+def read_csv(file: IO[str]) -> Iterator[dict[str, Any]]:
+    """
+    Read the records of a CSV file with a line per drone, or per medication
+    with the `medication_` columns, where the consecutive lines with the same
+    drone `id` are a single drone.
+    """
+    current: dict[str, Any] | None = None
+    for row in csv.DictReader(file):
+        if current is None or not row.get("id") or current.get("id") != row["id"]:
+            if current is not None:
+                yield current
+            current = {field: row[field] for field in DRONE_FIELDS if row.get(field)}
+            current["medications"] = []
+        medication = {
+            field.removeprefix(MEDICATION_PREFIX): row[field]
+            for field in MEDICATION_FIELDS
+            if row.get(field)
+        }
+        if medication:
+            current["medications"].append(medication)
+    if current is not None:
+        yield current
+
+
+def validate_records(start: int, records: list[Any]) -> ValidatedChunk:
+    """
+    Validate the records that follow the first `start` ones and turn them into
+    the plain columns of the drones and medications to insert. The id of the
+    drones and medications is kept if the record has one. The loaded weight of
+    the drones is the sum of the weights of their medications.
+    """
+    drones: list[dict[str, Any]] = []
+    medications: list[dict[str, Any]] = []
+    errors: list[str] = []
+    for number, record in enumerate(records, start + 1):
+        try:
+            if not isinstance(record, dict):
+                raise TypeError("value is not a valid dict")
+            drone = DronePostSchema.parse_obj(record)
+            drone_id = UUID(str(record["id"])) if record.get("id") else new_uuid()
+            loaded = []
+            for item in record.get("medications") or []:
+                medication = MedicationPostSchema.parse_obj(item)
+                loaded.append(
+                    {
+                        **medication.dict(),
+                        "id": UUID(str(item["id"])) if item.get("id") else new_uuid(),
+                        "image": str(medication.image),
+                        "drone_id": drone_id,
+                    }
+                )
+            loaded_weight = sum(medication["weight"] for medication in loaded)
+            if loaded_weight > drone.weight_limit:
+                raise ValueError("the medications exceed the weight limit")
+        except (ValidationError, ValueError, TypeError) as exc:
+            errors.append(f"Record {number}: {exc}")
+            continue
+        drones.append({**drone.dict(), "id": drone_id, "loaded_weight": loaded_weight})
+        medications.extend(loaded)
+    return ValidatedChunk(start + len(records), drones, medications, errors)
+
+
+def chunk_records(
+    records: Iterable[Any],
+    size: int,
+    skip: int = 0,
+) -> Iterator[tuple[int, list[Any]]]:
+    """
+    Split the records into chunks of `size`, after skipping the first `skip`
+    of them, along with the number of the first record of every chunk.
+    """
+    iterator = iter(records)
+    next(islice(iterator, skip, skip), None)
+    start = skip
+    while chunk := list(islice(iterator, size)):
+        yield start, chunk
+        start += len(chunk)
+
+
+def validate_chunks(
+    chunks: Iterable[tuple[int, list[Any]]],
+    workers: int,
+) -> Iterator[ValidatedChunk]:
+    """
+    Validate the chunks in a pool of `workers` processes, or in this process
+    if there are none, and yield them in order. Only a few chunks per worker
+    are read ahead, so the memory used does not grow with the file.
+    """
+    if workers <= 0:
+        for start, records in chunks:
+            yield validate_records(start, records)
+        return
+    with ProcessPoolExecutor(workers) as executor:
+        pending: deque[Future[ValidatedChunk]] = deque()
+        for start, records in chunks:
+            pending.append(executor.submit(validate_records, start, records))
+            if len(pending) > 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def import_file(
+    path: Path,
+    source: str | None = None,
+    format: ExportFormat | None = None,
+    chunk_size: int = 10000,
+    workers: int = 0,
+    resume: bool = False,
+    report: Callable[[ImportStats], None] | None = None,
+) -> ImportStats:
+    """
+    Import the drones and medications of the file in a transaction per
+    chunk, which also records how many records of `source`, the path of the
+    file by default, are imported. With `resume` the records imported by a
+    previous run are skipped. A chunk with invalid records stops the import,
+    the chunks before it stay imported and the import can be resumed once the
+    records are fixed.
+    """
+    source = source or str(path.resolve())
+    format = format or detect_format(path)
+    started = time.perf_counter()
+    with ImportServiceWithoutDepends() as service:
+        skip = service.get_progress(source) if resume else 0
+        progress = ImportStats(skip, 0, 0, 0)
+        with open_text(path) as file:
+            records = (
+                read_csv(file) if format == ExportFormat.CSV else read_ndjson(file)
+            )
+            for chunk in validate_chunks(
+                chunk_records(records, chunk_size, skip), workers
+            ):
+                if chunk.errors:
+                    raise InvalidRecordsError(chunk.errors)
+                service.add_rows(source, chunk.end, chunk.drones, chunk.medications)
+                progress = ImportStats(
+                    chunk.end,
+                    progress.drones + len(chunk.drones),
+                    progress.medications + len(chunk.medications),
+                    time.perf_counter() - started,
+                )
+                if report is not None:
+                    report(progress)
+    return progress
+
+
+def print_progress(progress: ImportStats) -> None:
+    rate = progress.drones / progress.elapsed if progress.elapsed else 0
+    print(
+        f"\r{progress.records} records, {progress.drones} drones and"
+        f" {progress.medications} medications imported, {rate:.0f} drones/s",
+        end="",
+        file=sys.stderr,
+        flush=True,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=Path)
+    parser.add_argument("--format", type=ExportFormat, choices=list(ExportFormat))
+    parser.add_argument(
+        "--source", help="name of the import to resume, the path by default"
+    )
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the records imported by a previous run",
+    )
+    args = parser.parse_args(argv)
+    try:
+        import_file(
+            args.path,
+            args.source,
+            args.format,
+            args.chunk_size,
+            args.workers,
+            args.resume,
+            print_progress,
+        )
+    except InvalidRecordsError as exc:
+        print(file=sys.stderr)
+        for error in exc.args[0][:10]:
+            print(error, file=sys.stderr)
+        sys.exit("Import stopped, fix the records and run it again with --resume")
+    print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
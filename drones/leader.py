@@ -0,0 +1,76 @@
+import os
+from threading import Lock
+from typing import IO
+
+from fastapi import Depends
+
+from .settings import Settings, get_settings
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore
+
+
+class LeaderElection:
+    """
+    Elect a single leader among the worker processes of the API, the one
+    holding an exclusive lock on the file at `path`, to run the tasks that
+    must run only once per deployment.
+
+    The lock is released by the operating system when the leader exits, so a
+    worker that asks again takes over. Without `path`, or where file locks
+    are not available, every process is its own leader.
+    """
+
+    def __init__(self, path: str | None) -> None:
+        self.__path = path
+        self.__file: IO[bytes] | None = None
+        self.__lock = Lock()
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self.__after_fork)
+
+    def is_leader(self) -> bool:
+        """
+        Return if this process is the leader, trying to become it first if it
+        is not.
+        """
+        if self.__path is None or fcntl is None:
+            return True
+        with self.__lock:
+            if self.__file is not None:
+                return True
+            file = open(self.__path, "ab")
+            try:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                file.close()
+                return False
+            self.__file = file
+            return True
+
+    def resign(self) -> None:
+        with self.__lock:
+            if self.__file is not None:
+                self.__file.close()
+                self.__file = None
+
+    def __after_fork(self) -> None:
+        # Note: The child shares the lock of the parent through the inherited
+        # file, it must not think it is the leader too.
+        self.__lock = Lock()
+        if self.__file is not None:
+            self.__file.close()
+            self.__file = None
+
+
+__leader_election: LeaderElection | None = None
+
+
+def get_leader_election(
+    settings: Settings = Depends(get_settings),
+) -> LeaderElection:
+    global __leader_election
+    if __leader_election is None:
+        __leader_election = LeaderElection(settings.leader_lock_file_path)
+    return __leader_election
@@ -1,17 +1,155 @@
+import atexit
+import gzip
 import logging
+import os
+import shutil
+from logging.handlers import (
+    QueueHandler,
+    QueueListener,
+    RotatingFileHandler,
+    TimedRotatingFileHandler,
+)
+from queue import SimpleQueue
+from uuid import UUID
 
-from .settings import get_settings
+from .data.database import DroneState
+from .schemas import DroneGetSchema
+from .settings import Settings, get_settings
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves the formatting of the records to the writer thread.
+
+    The queue never leaves the process, so the records don't need to be made
+    pickleable and the caller only pays for enqueueing them.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class DroneChangesTracker:
+    """
+    Remember the last battery capacity and state seen for every drone.
+    """
+
+    def __init__(self):
+        self.__last: dict[UUID, tuple[float, DroneState]] = {}
+
+    def changed(self, drones: list[DroneGetSchema]) -> list[DroneGetSchema]:
+        """
+        Return the drones whose battery capacity or state changed since the
+        previous call, forgetting the drones that are no longer present.
+        """
+        last = self.__last
+        self.__last = {}
+        result: list[DroneGetSchema] = []
+        for drone in drones:
+            current = (drone.battery_capacity, drone.state)
+            if last.get(drone.id) != current:
+                result.append(drone)
+            self.__last[drone.id] = current
+        return result
+
+
+__listener: QueueListener | None = None
+__listener_running = False
+
+
+def gzip_namer(name: str) -> str:
+    return f"{name}.gz"
+
+
+def gzip_rotator(source: str, dest: str) -> None:
+    with open(source, "rb") as source_file, gzip.open(dest, "wb") as dest_file:
+        shutil.copyfileobj(source_file, dest_file)
+    os.remove(source)
+
+
+def get_file_handler(settings: Settings) -> logging.FileHandler:
+    filename = settings.logger_drones_batteries_capacity_file_path
+    backup_count = settings.logger_drones_batteries_capacity_backup_count
+    handler: logging.FileHandler
+    if settings.logger_drones_batteries_capacity_max_bytes > 0:
+        handler = RotatingFileHandler(
+            filename,
+            maxBytes=settings.logger_drones_batteries_capacity_max_bytes,
+            backupCount=backup_count,
+        )
+    elif settings.logger_drones_batteries_capacity_when:
+        handler = TimedRotatingFileHandler(
+            filename,
+            when=settings.logger_drones_batteries_capacity_when,
+            backupCount=backup_count,
+        )
+    else:
+        return logging.FileHandler(filename)
+    if settings.logger_drones_batteries_capacity_compress:
+        handler.namer = gzip_namer
+        handler.rotator = gzip_rotator
+    return handler
 
 
 def config_loggers():
+    global __listener
+    settings = get_settings()
     formater = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(formater)
-    file_handler_filename = get_settings().logger_drones_batteries_capacity_file_path
-    file_handler = logging.FileHandler(file_handler_filename)
+    file_handler = get_file_handler(settings)
     file_handler.setFormatter(formater)
-    logger_name = get_settings().logger_drones_batteries_capacity_name
+    logger_name = settings.logger_drones_batteries_capacity_name
     logger = logging.getLogger(logger_name)
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
+    if settings.logger_drones_batteries_capacity_queue:
+        queue: SimpleQueue[logging.LogRecord] = SimpleQueue()
+        __listener = QueueListener(queue, console_handler, file_handler)
+        start_loggers()
+        atexit.register(stop_loggers)
+        logger.addHandler(DeferredQueueHandler(queue))
+    else:
+        logger.addHandler(console_handler)
+        logger.addHandler(file_handler)
     logger.setLevel(logging.DEBUG)
+
+
+def start_loggers():
+    """
+    Start the background writer, if any and not running already.
+    """
+    global __listener_running
+    if __listener is not None and not __listener_running:
+        __listener.start()
+        __listener_running = True
+
+
+def stop_loggers():
+    """
+    Flush the pending records and stop the background writer, if any.
+
+    It must run before the handlers and their streams are closed, the writer
+    would keep writing to them otherwise. It can be started again with
+    `start_loggers`.
+    """
+    global __listener_running
+    if __listener is not None and __listener_running:
+        __listener.stop()
+        __listener_running = False
+
+
+def restart_loggers_after_fork():
+    """
+    Start a background writer in the child process, the one of the parent is
+    not copied by the fork.
+    """
+    global __listener, __listener_running
+    if __listener is not None:
+        running = __listener_running
+        __listener = QueueListener(__listener.queue, *__listener.handlers)
+        __listener_running = False
+        if running:
+            start_loggers()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=restart_loggers_after_fork)
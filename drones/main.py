@@ -1,34 +1,50 @@
 import logging
+from datetime import datetime, timezone
+from time import perf_counter
 
 from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from fastapi_restful.tasks import repeat_every
 
-from .deps import DroneServiceWithoutDepends
+from .cache import drone_details_cache_metrics
+from .data.database import dispose_async_engine
+from .deps import BatteryHistoryServiceWithoutDepends, DroneServiceWithoutDepends
 from .handlers import (
     drone_cant_be_deleted_handler,
     drone_cant_load_medications_handler,
     drone_not_found_handler,
+    invalid_cursor_handler,
+    invalid_time_range_handler,
     medication_not_found_handler,
 )
-from .loggers import config_loggers
+from .leader import get_leader_election
+from .loggers import DroneChangesTracker, config_loggers, start_loggers, stop_loggers
+from .metrics import CONTENT_TYPE, MetricsMiddleware, get_metrics
+from .pagination import InvalidCursorError
+from .query_budget import QueryBudgetMiddleware
 from .routes.drones_router import router as drones_router
+from .routes.medications_router import router as medications_router
 from .seed import run_seed
+from .services.battery_history_service import InvalidTimeRangeError
 from .services.drone_service import (
     DroneCantBeDeletedError,
     DroneCantLoadMedicationsError,
     DroneNotFoundError,
     MedicationNotFoundError,
 )
-from .settings import get_settings
+from .settings import QueryBudgetMode, get_settings
+
+logger = logging.getLogger(__name__)
 
 config_loggers()
+drone_changes_tracker = DroneChangesTracker()
 
 app = FastAPI(
     title="Drones API",
     description="A solution for the technical task of the recruitment process of Musala Soft.",
 )
 app.include_router(drones_router, prefix="/drones")
+app.include_router(medications_router, prefix="/medications")
 app.add_exception_handler(
     DroneCantBeDeletedError,
     drone_cant_be_deleted_handler,
@@ -45,6 +61,25 @@ app.add_exception_handler(
     MedicationNotFoundError,
     medication_not_found_handler,
 )
+app.add_exception_handler(
+    InvalidCursorError,
+    invalid_cursor_handler,
+)
+app.add_exception_handler(
+    InvalidTimeRangeError,
+    invalid_time_range_handler,
+)
+
+
+if get_settings().metrics:
+    app.add_middleware(MetricsMiddleware)
+    get_metrics().registry.add_collector(drone_details_cache_metrics)
+app.add_middleware(
+    QueryBudgetMiddleware,
+    enforce=get_settings().query_budget != QueryBudgetMode.OFF,
+    repeats=get_settings().query_budget_repeats,
+    fail=get_settings().query_budget == QueryBudgetMode.FAIL,
+)
 
 
 @app.get("/", include_in_schema=False)
@@ -52,23 +87,91 @@ def index():
     return RedirectResponse("/docs")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(get_metrics().registry.render(), media_type=CONTENT_TYPE)
+
+
+@app.on_event("startup")
+def start_loggers_event():
+    start_loggers()
+
+
 @app.on_event("startup")
 def seed_event():
     settings = get_settings()
-    if settings.seed:
-        run_seed(settings)
+    if settings.seed and get_leader_election(settings).is_leader():
+        run_seed()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine_event():
+    await dispose_async_engine()
 
 
 @app.on_event("startup")
 @repeat_every(seconds=get_settings().time_interval_battery)
 def log_battery_capacity_event():
-    logger_name = get_settings().logger_drones_batteries_capacity_name
-    logger = logging.getLogger(logger_name)
+    start = perf_counter()
+    settings = get_settings()
+    if not get_leader_election(settings).is_leader():
+        return
+    logger = logging.getLogger(settings.logger_drones_batteries_capacity_name)
     with DroneServiceWithoutDepends() as service:
         drones = service.get_drones()
-        for drone in drones:
-            logger.info(
-                f"Drone id: {drone.id}, "
-                + f"serial number: {drone.serial_number}, "
-                + f"battery capacity: {drone.battery_capacity}%"
-            )
+    logged = drones
+    if settings.logger_drones_batteries_capacity_only_changes:
+        logged = drone_changes_tracker.changed(drones)
+    for drone in logged:
+        logger.info(
+            "Drone id: %s, serial number: %s, battery capacity: %s%%, state: %s",
+            drone.id,
+            drone.serial_number,
+            drone.battery_capacity,
+            drone.state.name,
+        )
+    with BatteryHistoryServiceWithoutDepends() as battery_history_service:
+        battery_history_service.add_samples(drones, datetime.now(timezone.utc))
+    metrics = get_metrics()
+    metrics.battery_tick_duration.observe(perf_counter() - start)
+    metrics.battery_tick_drones.set(len(drones))
+
+
+@app.on_event("startup")
+@repeat_every(seconds=get_settings().time_interval_stats_reconciliation)
+def reconcile_stats_event():
+    if not get_leader_election(get_settings()).is_leader():
+        return
+    with DroneServiceWithoutDepends() as service:
+        fixed = service.reconcile_stats()
+    if fixed:
+        logger.warning("Fixed %s drifted counters of the fleet statistics", fixed)
+
+
+@app.on_event("startup")
+@repeat_every(seconds=get_settings().time_interval_telemetry_flush)
+def flush_telemetry_event():
+    with DroneServiceWithoutDepends() as service:
+        service.flush_telemetry()
+
+
+@app.on_event("shutdown")
+def flush_telemetry_on_shutdown_event():
+    with DroneServiceWithoutDepends() as service:
+        service.flush_telemetry()
+
+
+@app.on_event("startup")
+@repeat_every(seconds=get_settings().time_interval_battery_downsampling)
+def downsample_battery_history_event():
+    if not get_leader_election(get_settings()).is_leader():
+        return
+    with BatteryHistoryServiceWithoutDepends() as battery_history_service:
+        battery_history_service.downsample(datetime.now(timezone.utc))
+
+
+@app.on_event("shutdown")
+def stop_loggers_event():
+    # Note: Registered last, so the records of the other shutdown events are
+    # written before the handlers and their streams are closed.
+    stop_loggers()
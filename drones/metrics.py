@@ -0,0 +1,373 @@
+from bisect import bisect_left
+from threading import Lock
+from time import perf_counter
+from typing import Any, Callable, Iterable, Iterator
+
+import sqlalchemy as sqla
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 1)
+UNMATCHED_ROUTE = "<unmatched>"
+
+Labels = tuple[str, ...]
+Sample = tuple[str, dict[str, str], float]
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'),
+        )
+        for name, value in labels.items()
+    )
+    return "{" + pairs + "}"
+
+
+class Metric:
+    """
+    Base of the metrics of the registry, a family of values of the same kind
+    with a value per combination of the values of its labels.
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._lock = Lock()
+
+    def _label_dict(self, values: Labels) -> dict[str, str]:
+        return dict(zip(self.labels, values))
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError()
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()) -> None:
+        super().__init__(name, help, labels)
+        self.__values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self.__values[labels] = self.__values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        with self._lock:
+            return self.__values.get(labels, 0)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self.__values.items())
+        for labels, value in values:
+            yield self.name, self._label_dict(labels), value
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Labels = ()) -> None:
+        super().__init__(name, help, labels)
+        self.__values: dict[Labels, float] = {}
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self.__values[labels] = value
+
+    def get(self, *labels: str) -> float:
+        with self._lock:
+            return self.__values.get(labels, 0)
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = list(self.__values.items())
+        for labels, value in values:
+            yield self.name, self._label_dict(labels), value
+
+
+class Histogram(Metric):
+    """
+    Count the observed values in cumulative buckets by their upper bound, along
+    with their count and sum, as the histograms of Prometheus.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labels: Labels = (),
+        buckets: Iterable[float] = REQUEST_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self.__values: dict[Labels, tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        # Note: Only the bucket of the value is counted here, the buckets are
+        # made cumulative when they are read.
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self.__values.get(labels)
+            if entry is None:
+                entry = self.__values[labels] = ([0] * (len(self.buckets) + 1), [0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            entry = self.__values.get(labels)
+            return sum(entry[0]) if entry is not None else 0
+
+    def samples(self) -> Iterator[Sample]:
+        with self._lock:
+            values = [
+                (labels, list(counts), total[0])
+                for labels, (counts, total) in self.__values.items()
+            ]
+        for labels, counts, total in values:
+            label_dict = self._label_dict(labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield (
+                    f"{self.name}_bucket",
+                    {**label_dict, "le": _format_value(bound)},
+                    cumulative,
+                )
+            yield f"{self.name}_count", label_dict, cumulative
+            yield f"{self.name}_sum", label_dict, total
+
+
+class MetricsRegistry:
+    """
+    Registry of the metrics of the process, rendered in the text format of
+    Prometheus. The collectors are called on every render to add the metrics
+    read from elsewhere, like the stats of the caches.
+    """
+
+    def __init__(self) -> None:
+        self.__metrics: dict[str, Metric] = {}
+        self.__collectors: list[Callable[[], Iterable[Metric]]] = []
+        self.__lock = Lock()
+
+    def register(self, metric: Metric) -> Any:
+        with self.__lock:
+            if metric.name in self.__metrics:
+                raise ValueError(f"Metric {metric.name} already registered")
+            self.__metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Labels = ()) -> Counter:
+        return self.register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Labels = ()) -> Gauge:
+        return self.register(Gauge(name, help, labels))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labels: Labels = (),
+        buckets: Iterable[float] = REQUEST_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labels, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[Metric]]) -> None:
+        with self.__lock:
+            self.__collectors.append(collector)
+
+    def render(self) -> str:
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+            collectors = list(self.__collectors)
+        for collector in collectors:
+            metrics.extend(collector())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class Metrics:
+    """
+    The metrics reported by the API.
+    """
+
+    def __init__(self, registry: MetricsRegistry) -> None:
+        self.registry = registry
+        self.http_requests = registry.counter(
+            "drones_http_requests_total",
+            "Requests handled, by route and status code.",
+            ("method", "route", "status"),
+        )
+        self.http_request_duration = registry.histogram(
+            "drones_http_request_duration_seconds",
+            "Time to handle the requests, by route.",
+            ("method", "route"),
+        )
+        self.db_statements = registry.counter(
+            "drones_db_statements_total",
+            "SQL statements executed, by engine and operation.",
+            ("engine", "operation"),
+        )
+        self.db_statement_duration = registry.histogram(
+            "drones_db_statement_duration_seconds",
+            "Time to execute the SQL statements, by engine and operation.",
+            ("engine", "operation"),
+            QUERY_BUCKETS,
+        )
+        self.db_pool_checkout_wait = registry.histogram(
+            "drones_db_pool_checkout_wait_seconds",
+            "Time waited to check out a connection from the pool, by engine.",
+            ("engine",),
+            QUERY_BUCKETS,
+        )
+        self.battery_tick_duration = registry.histogram(
+            "drones_battery_tick_duration_seconds",
+            "Time to log the battery capacity of the drones.",
+        )
+        self.battery_tick_drones = registry.gauge(
+            "drones_battery_tick_drones",
+            "Drones whose battery capacity was read in the last tick.",
+        )
+
+
+__metrics: Metrics | None = None
+
+
+def get_metrics() -> Metrics:
+    global __metrics
+    if __metrics is None:
+        __metrics = Metrics(MetricsRegistry())
+    return __metrics
+
+
+def _operation(statement: str) -> str:
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else ""
+
+
+def instrument_engine(engine: sqla.engine.Engine, name: str) -> None:
+    """
+    Count and time the statements executed by the engine, also the ones of an
+    async engine through its `sync_engine`.
+    """
+    metrics = get_metrics()
+
+    @sqla.event.listens_for(engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(perf_counter())
+
+    @sqla.event.listens_for(engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["query_start"].pop()
+        operation = _operation(statement)
+        metrics.db_statements.inc(name, operation)
+        metrics.db_statement_duration.observe(elapsed, name, operation)
+
+    @sqla.event.listens_for(engine, "handle_error")
+    def discard_timer(context):
+        starts = (
+            context.connection.info.get("query_start") if context.connection else None
+        )
+        if starts:
+            starts.pop()
+
+
+class TimedPoolMixin:
+    """
+    Measure how long every checkout of the pool waits for a connection,
+    labeled with the `pool_logging_name` of the engine.
+    """
+
+    _orig_logging_name: str | None
+
+    def _do_get(self):
+        start = perf_counter()
+        try:
+            return super()._do_get()  # type: ignore
+        finally:
+            get_metrics().db_pool_checkout_wait.observe(
+                perf_counter() - start, self._orig_logging_name or ""
+            )
+
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that counts and times the HTTP requests by the path
+    template of their route, so the ids in the paths do not make a new series
+    for every drone.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: Metrics | None = None) -> None:
+        self.app = app
+        self.metrics = metrics or get_metrics()
+        self.__routes: dict[Any, str] = {}
+
+    def route_path(self, scope: Scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        path = self.__routes.get(endpoint)
+        if path is None:
+            # Note: Starlette does not tell the matched route, only its
+            # endpoint, so the paths are looked up once per endpoint.
+            path = UNMATCHED_ROUTE
+            for route in scope["app"].routes:
+                if getattr(route, "endpoint", None) is endpoint:
+                    path = route.path
+                    break
+            self.__routes[endpoint] = path
+        return path
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        start = perf_counter()
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - start
+            method = scope["method"]
+            route = self.route_path(scope)
+            self.metrics.http_requests.inc(method, route, str(status))
+            self.metrics.http_request_duration.observe(elapsed, method, route)
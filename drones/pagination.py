@@ -0,0 +1,25 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from uuid import UUID
+
+
+class InvalidCursorError(Exception):
+    pass
+
+
+def encode_cursor(value: UUID) -> str:
+    """
+    Encode the last seen key of a page as an opaque cursor.
+    """
+    return urlsafe_b64encode(value.bytes).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> UUID:
+    """
+    Decode a cursor produced by `encode_cursor` back into the key it wraps.
+    """
+    try:
+        padding = "=" * (-len(cursor) % 4)
+        return UUID(bytes=urlsafe_b64decode(cursor + padding))
+    except (BinasciiError, ValueError):
+        raise InvalidCursorError("Invalid cursor") from None
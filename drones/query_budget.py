@@ -0,0 +1,179 @@
+import logging
+import re
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from typing import Callable, Iterator, TypeVar
+
+import sqlalchemy as sqla
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+EndpointT = TypeVar("EndpointT", bound=Callable)
+
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACES = re.compile(r"\s+")
+
+
+class QueryBudgetExceededError(Exception):
+    pass
+
+
+def statement_shape(statement: str) -> str:
+    """
+    Return the statement without the differences between the executions of
+    the same query, the whitespace and the length of the lists of parameters.
+    """
+    return _IN_LIST.sub("(?...)", _SPACES.sub(" ", statement).strip())
+
+
+class QueryCounter:
+    """
+    Record the SQL statements executed while it is active.
+    """
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, repeats: int) -> list[tuple[str, int]]:
+        """
+        Return the shapes of the statements executed `repeats` times or more,
+        the sign of a query run once per row of a previous one.
+        """
+        shapes = Counter(statement_shape(statement) for statement in self.statements)
+        return [(shape, count) for shape, count in shapes.items() if count >= repeats]
+
+    def problems(
+        self,
+        budget: int | None = None,
+        repeats: int | None = None,
+    ) -> list[str]:
+        problems = []
+        if budget is not None and self.count > budget:
+            problems.append(f"{self.count} statements over a budget of {budget}")
+        if repeats is not None:
+            for shape, count in self.repeated(repeats):
+                problems.append(f"{count} executions of {shape}")
+        return problems
+
+    def check(self, budget: int | None = None, repeats: int | None = None) -> None:
+        problems = self.problems(budget, repeats)
+        if problems:
+            raise QueryBudgetExceededError("; ".join(problems))
+
+
+_current_counter: ContextVar[QueryCounter | None] = ContextVar(
+    "current_query_counter", default=None
+)
+_request_counters: list[QueryCounter] = []
+_request_counters_lock = Lock()
+
+
+def _record_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = _current_counter.get()
+    if counter is not None:
+        counter.statements.append(statement)
+
+
+def track_statements(engine: sqla.engine.Engine) -> None:
+    """
+    Let the query counters see the statements executed by the engine, or by
+    an async engine through its `sync_engine`.
+    """
+    if not sqla.event.contains(engine, "before_cursor_execute", _record_statement):
+        sqla.event.listen(engine, "before_cursor_execute", _record_statement)
+
+
+@contextmanager
+def count_statements(
+    budget: int | None = None,
+    repeats: int | None = None,
+    requests: bool = False,
+) -> Iterator[QueryCounter]:
+    """
+    Count the statements executed inside the block by the tracked engines and
+    raise `QueryBudgetExceededError` if they are more than `budget` or the
+    same statement is executed `repeats` times.
+
+    Only the statements of the current context are counted or, with
+    `requests`, the ones of the requests handled meanwhile by the app, as
+    needed when they are sent through a test client.
+    """
+    counter = QueryCounter()
+    if requests:
+        with _request_counters_lock:
+            _request_counters.append(counter)
+    token = _current_counter.set(None if requests else counter)
+    try:
+        yield counter
+    finally:
+        _current_counter.reset(token)
+        if requests:
+            with _request_counters_lock:
+                _request_counters.remove(counter)
+    counter.check(budget, repeats)
+
+
+def query_budget(statements: int) -> Callable[[EndpointT], EndpointT]:
+    """
+    Declare the maximum number of statements a request to the route executes.
+    """
+
+    def decorator(endpoint: EndpointT) -> EndpointT:
+        endpoint.query_budget = statements  # type: ignore
+        return endpoint
+
+    return decorator
+
+
+class QueryBudgetMiddleware:
+    """
+    ASGI middleware that counts the statements executed by every request and,
+    with `enforce`, reports the requests over the budget of their route or
+    repeating the same statement `repeats` times. The problems are logged as
+    warnings, or raised as `QueryBudgetExceededError` with `fail`, once the
+    request is handled. The requests are only counted when enforced or for a
+    `count_statements` block with `requests`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        enforce: bool = True,
+        repeats: int | None = None,
+        fail: bool = False,
+    ) -> None:
+        self.app = app
+        self.enforce = enforce
+        self.repeats = repeats
+        self.fail = fail
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not (self.enforce or _request_counters):
+            await self.app(scope, receive, send)
+            return
+        counter = QueryCounter()
+        token = _current_counter.set(counter)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current_counter.reset(token)
+            with _request_counters_lock:
+                for request_counter in _request_counters:
+                    request_counter.statements.extend(counter.statements)
+        if not self.enforce:
+            return
+        budget = getattr(scope.get("endpoint"), "query_budget", None)
+        problems = counter.problems(budget, self.repeats)
+        if not problems:
+            return
+        message = f"{scope['method']} {scope['path']}: {'; '.join(problems)}"
+        if self.fail:
+            raise QueryBudgetExceededError(message)
+        logger.warning(message)
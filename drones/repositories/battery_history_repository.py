@@ -0,0 +1,160 @@
+from uuid import UUID
+
+from sqlalchemy import delete, func, insert, literal, select, union_all
+from sqlalchemy.engine import Row
+from sqlmodel import Session
+
+from ..data.database import BatteryRollup, BatterySample
+
+
+class BatteryHistoryRepository:
+    def __init__(self, session: Session) -> None:
+        self.__session = session
+
+    def add_samples(self, samples: list[BatterySample]) -> None:
+        if samples:
+            self.__session.execute(
+                insert(BatterySample).prefix_with("OR IGNORE"),
+                [sample.dict() for sample in samples],
+            )
+            self.__session.commit()
+
+    def get_samples(self, drone_id: UUID, start: int, end: int) -> list[BatterySample]:
+        query = (
+            select(BatterySample)
+            .where(BatterySample.drone_id == drone_id)
+            .where(BatterySample.timestamp >= start)
+            .where(BatterySample.timestamp < end)
+            .order_by(BatterySample.timestamp)
+        )
+        return self.__session.execute(query).scalars().all()
+
+    def get_rollups(
+        self,
+        drone_id: UUID,
+        resolution: int,
+        start: int,
+        end: int,
+    ) -> list[Row]:
+        """
+        Return the rollups of `resolution` seconds of the drone between `start`
+        and `end`, as rows with the columns of `BatteryRollup`. The samples and
+        finer rollups not rolled up yet, the recent ones, are rolled up on the
+        fly and merged with them, in a single statement.
+        """
+        sample_bucket = BatterySample.timestamp - BatterySample.timestamp % resolution
+        rollup_bucket = BatteryRollup.timestamp - BatteryRollup.timestamp % resolution
+        parts = union_all(
+            select(
+                sample_bucket.label("timestamp"),
+                BatterySample.battery_capacity.label("min_battery_capacity"),
+                BatterySample.battery_capacity.label("max_battery_capacity"),
+                BatterySample.battery_capacity.label("total_battery_capacity"),
+                literal(1).label("samples"),
+            )
+            .where(BatterySample.drone_id == drone_id)
+            .where(BatterySample.timestamp >= start)
+            .where(BatterySample.timestamp < end),
+            select(
+                rollup_bucket,
+                BatteryRollup.min_battery_capacity,
+                BatteryRollup.max_battery_capacity,
+                BatteryRollup.avg_battery_capacity * BatteryRollup.samples,
+                BatteryRollup.samples,
+            )
+            .where(BatteryRollup.drone_id == drone_id)
+            .where(BatteryRollup.resolution <= resolution)
+            .where(BatteryRollup.timestamp >= start)
+            .where(BatteryRollup.timestamp < end),
+        ).subquery()
+        samples = func.sum(parts.c.samples)
+        query = (
+            select(
+                parts.c.timestamp,
+                func.min(parts.c.min_battery_capacity).label("min_battery_capacity"),
+                func.max(parts.c.max_battery_capacity).label("max_battery_capacity"),
+                (func.sum(parts.c.total_battery_capacity) / samples).label(
+                    "avg_battery_capacity"
+                ),
+                samples.label("samples"),
+            )
+            .group_by(parts.c.timestamp)
+            .having(parts.c.timestamp >= start)
+            .order_by(parts.c.timestamp)
+        )
+        return self.__session.execute(query).all()
+
+    def rollup_samples(self, resolution: int, before: int) -> None:
+        """
+        Replace the samples older than `before` with rollups of `resolution`
+        seconds. `before` must be aligned to `resolution`.
+        """
+        bucket = BatterySample.timestamp - BatterySample.timestamp % resolution
+        query = select(
+            BatterySample.drone_id,
+            literal(resolution),
+            bucket,
+            func.min(BatterySample.battery_capacity),
+            func.max(BatterySample.battery_capacity),
+            func.avg(BatterySample.battery_capacity),
+            func.count(),
+        ).where(BatterySample.timestamp < before)
+        query = query.group_by(BatterySample.drone_id, bucket)
+        self.__session.execute(
+            insert(BatteryRollup).from_select(self.__rollup_columns(), query)
+        )
+        self.__session.execute(
+            delete(BatterySample)
+            .where(BatterySample.timestamp < before)
+            .execution_options(synchronize_session=False)
+        )
+        self.__session.commit()
+
+    def rollup_rollups(self, source: int, resolution: int, before: int) -> None:
+        """
+        Replace the rollups of `source` seconds older than `before` with rollups
+        of `resolution` seconds. `before` must be aligned to `resolution`.
+        """
+        bucket = BatteryRollup.timestamp - BatteryRollup.timestamp % resolution
+        query = select(
+            BatteryRollup.drone_id,
+            literal(resolution),
+            bucket,
+            func.min(BatteryRollup.min_battery_capacity),
+            func.max(BatteryRollup.max_battery_capacity),
+            func.sum(BatteryRollup.avg_battery_capacity * BatteryRollup.samples)
+            / func.sum(BatteryRollup.samples),
+            func.sum(BatteryRollup.samples),
+        )
+        query = query.where(BatteryRollup.resolution == source)
+        query = query.where(BatteryRollup.timestamp < before)
+        query = query.group_by(BatteryRollup.drone_id, bucket)
+        self.__session.execute(
+            insert(BatteryRollup).from_select(self.__rollup_columns(), query)
+        )
+        self.__remove_rollups(source, before)
+        self.__session.commit()
+
+    def remove_rollups(self, resolution: int, before: int) -> None:
+        self.__remove_rollups(resolution, before)
+        self.__session.commit()
+
+    def __remove_rollups(self, resolution: int, before: int) -> None:
+        self.__session.execute(
+            delete(BatteryRollup)
+            .where(BatteryRollup.resolution == resolution)
+            .where(BatteryRollup.timestamp < before)
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def __rollup_columns() -> list[str]:
+        return [
+            "drone_id",
+            "resolution",
+            "timestamp",
+            "min_battery_capacity",
+            "max_battery_capacity",
+            "avg_battery_capacity",
+            "samples",
+        ]
@@ -1,8 +1,55 @@
+from typing import Any, Iterator, TypeVar
 from uuid import UUID
 
+from sqlalchemy import bindparam, delete, func, insert, or_
+from sqlalchemy import select as sqla_select
+from sqlalchemy import union_all, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
 from sqlmodel import Session, select
 
-from ..data.database import Drone, DroneState
+from ..data.database import (
+    DRONE_AVAILABLE_CONDITION,
+    DRONE_BATTERY_LEVEL,
+    DRONE_POSITIONS,
+    DRONE_REMAINING_WEIGHT,
+    FLEET_ID,
+    Drone,
+    DroneModelType,
+    DroneState,
+    DroneStats,
+    Fleet,
+    Medication,
+    MedicationProduct,
+)
+from ..geo import Box
+
+DRONE_ROW_COLUMNS = (
+    Drone.id,
+    Drone.serial_number,
+    Drone.model,
+    Drone.weight_limit,
+    Drone.battery_capacity,
+    Drone.state,
+    Drone.loaded_weight,
+    Drone.latitude,
+    Drone.longitude,
+)
+
+MEDICATION_ROW_COLUMNS = (
+    Medication.id.label("medication_id"),
+    MedicationProduct.name.label("medication_name"),
+    Medication.weight.label("medication_weight"),
+    MedicationProduct.code.label("medication_code"),
+    MedicationProduct.image.label("medication_image"),
+)
+
+# Note: The sums of battery capacity drift by the rounding of every change,
+# only larger differences are fixed by the reconciliation.
+STATS_BATTERY_TOLERANCE = 1e-3
+
+QueryT = TypeVar("QueryT", bound=Select)
 
 
 class DroneRepository:
@@ -11,22 +58,419 @@ class DroneRepository:
 
     def add_drone(self, drone: Drone) -> Drone:
         self.__session.add(drone)
+        self.__bump_fleet_version()
         self.__session.commit()
         self.__session.refresh(drone)
         return drone
 
+    def add_drones(self, drones: list[Drone]) -> list[Drone]:
+        if drones:
+            self.__session.execute(insert(Drone), [drone.dict() for drone in drones])
+            self.__bump_fleet_version()
+            self.__session.commit()
+        return drones
+
     def remove_drone(self, drone: Drone) -> None:
-        self.__session.delete(drone)
+        # Note: Delete the row directly, the unit of work would load the
+        # medications of the drone first to detach them from it.
+        self.__session.execute(delete(Drone).where(Drone.id == drone.id))
+        self.__session.expunge(drone)
+        self.__bump_fleet_version()
         self.__session.commit()
 
-    def get_drones(self, state: DroneState | None = None) -> list[Drone]:
-        query = select(Drone)
-        if state is not None:
-            query = query.where(Drone.state == state)
+    def get_drones(
+        self,
+        state: DroneState | None = None,
+        model: DroneModelType | None = None,
+        min_battery_capacity: float | None = None,
+        max_battery_capacity: float | None = None,
+        min_weight_limit: int | None = None,
+        max_weight_limit: int | None = None,
+        after: UUID | None = None,
+        limit: int | None = None,
+        with_medications: bool = False,
+    ) -> list[Drone]:
+        """
+        Return the drones that match the filters ordered by id. With
+        `with_medications` their medications are loaded in a single extra
+        query for the whole page.
+        """
+        query = self.__filter_drones(
+            select(Drone),
+            state,
+            model,
+            min_battery_capacity,
+            max_battery_capacity,
+            min_weight_limit,
+            max_weight_limit,
+            after,
+            limit,
+        )
+        if with_medications:
+            query = query.options(selectinload(Drone.medications))
         drones = self.__session.exec(query).all()
         return drones
 
-    def get_drone(self, drone_id: UUID) -> Drone | None:
+    def get_drone_rows(
+        self,
+        state: DroneState | None = None,
+        model: DroneModelType | None = None,
+        min_battery_capacity: float | None = None,
+        max_battery_capacity: float | None = None,
+        min_weight_limit: int | None = None,
+        max_weight_limit: int | None = None,
+        after: UUID | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Same as `get_drones` but return the plain columns of the drones as
+        dicts, without building ORM objects.
+        """
+        query = self.__filter_drones(
+            sqla_select(*DRONE_ROW_COLUMNS),
+            state,
+            model,
+            min_battery_capacity,
+            max_battery_capacity,
+            min_weight_limit,
+            max_weight_limit,
+            after,
+            limit,
+        )
+        result = self.__session.execute(query)
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    def iter_drone_rows(
+        self,
+        with_medications: bool = False,
+        batch_size: int = 1000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Iterate over the plain columns of all the drones, ordered by id, in
+        batches of about `batch_size` rows read from a server side cursor.
+        With `with_medications` there is a row per medication, with the
+        columns of `MEDICATION_ROW_COLUMNS`, and a row with them set to
+        `None` per drone without medications.
+        """
+        query = sqla_select(*DRONE_ROW_COLUMNS)
+        if with_medications:
+            query = (
+                query.add_columns(*MEDICATION_ROW_COLUMNS)
+                .outerjoin(Medication, Medication.drone_id == Drone.id)
+                .outerjoin(
+                    MedicationProduct, MedicationProduct.id == Medication.product_id
+                )
+            )
+        query = query.order_by(Drone.id)
+        connection = self.__session.connection()
+        result = connection.execution_options(stream_results=True).execute(query)
+        keys = tuple(result.keys())
+        for rows in result.partitions(batch_size):
+            yield [dict(zip(keys, row)) for row in rows]
+
+    def get_available_drones(
+        self,
+        weight: int,
+        min_battery_capacity: float,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Return the plain columns of the idle or loading drones that can take
+        `weight` more, the best fit first. The query is served by the
+        `ix_drones_available` partial index.
+        """
+        query = (
+            sqla_select(*DRONE_ROW_COLUMNS)
+            .where(DRONE_AVAILABLE_CONDITION)
+            .where(DRONE_REMAINING_WEIGHT >= weight)
+            .where(Drone.battery_capacity >= min_battery_capacity)
+            .order_by(DRONE_REMAINING_WEIGHT, Drone.battery_capacity.desc())
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        result = self.__session.execute(query)
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    def get_available_drones_in_boxes(
+        self,
+        boxes: list[Box],
+        weight: int,
+        min_battery_capacity: float,
+    ) -> list[dict[str, Any]]:
+        """
+        Return the plain columns of the drones that `get_available_drones`
+        returns whose position is in one of the `(min_latitude, max_latitude,
+        min_longitude, max_longitude)` boxes. The positions are looked up in
+        the `drone_positions` R*Tree, the drones by their `position_id`.
+        """
+        queries = [
+            sqla_select(*DRONE_ROW_COLUMNS)
+            .select_from(DRONE_POSITIONS)
+            .join(Drone, Drone.position_id == DRONE_POSITIONS.c.id)
+            .where(DRONE_POSITIONS.c.min_latitude <= max_latitude)
+            .where(DRONE_POSITIONS.c.max_latitude >= min_latitude)
+            .where(DRONE_POSITIONS.c.min_longitude <= max_longitude)
+            .where(DRONE_POSITIONS.c.max_longitude >= min_longitude)
+            .where(DRONE_AVAILABLE_CONDITION)
+            .where(DRONE_REMAINING_WEIGHT >= weight)
+            .where(Drone.battery_capacity >= min_battery_capacity)
+            for min_latitude, max_latitude, min_longitude, max_longitude in boxes
+        ]
+        query = queries[0] if len(queries) == 1 else union_all(*queries)
+        result = self.__session.execute(query)
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    def get_drone(
+        self,
+        drone_id: UUID,
+        with_medications: bool = False,
+    ) -> Drone | None:
         query = select(Drone).where(Drone.id == drone_id)
+        if with_medications:
+            query = query.options(selectinload(Drone.medications))
         drone = self.__session.exec(query).first()
         return drone
+
+    def get_drone_version(self, drone_id: UUID) -> int | None:
+        query = select(Drone.version).where(Drone.id == drone_id)
+        return self.__session.exec(query).first()
+
+    def get_fleet_version(self) -> int:
+        query = select(Fleet.version).where(Fleet.id == FLEET_ID)
+        return self.__session.exec(query).one()
+
+    def get_stats(self, min_battery_capacity: int) -> list[dict[str, Any]]:
+        """
+        Return the counters of `drone_stats` added up by state, model and if
+        their battery level is below `min_battery_capacity`.
+        """
+        low_battery = DroneStats.battery_level < min_battery_capacity
+        query = (
+            sqla_select(
+                DroneStats.state,
+                DroneStats.model,
+                low_battery.label("low_battery"),
+                func.sum(DroneStats.drones).label("drones"),
+                func.sum(DroneStats.battery_capacity).label("battery_capacity"),
+                func.sum(DroneStats.loaded_weight).label("loaded_weight"),
+            )
+            .where(DroneStats.drones != 0)
+            .group_by(DroneStats.state, DroneStats.model, low_battery)
+        )
+        result = self.__session.execute(query)
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    def reconcile_stats(self) -> int:
+        """
+        Compare `drone_stats` with the aggregates of the drones and add the
+        differences to it, in a single statement each. Adding the differences,
+        instead of overwriting the counters, keeps the changes made to the
+        drones meanwhile. Return the number of groups that had drifted.
+        """
+        counted = union_all(
+            sqla_select(
+                Drone.state,
+                Drone.model,
+                DRONE_BATTERY_LEVEL.label("battery_level"),
+                func.count().label("drones"),
+                func.sum(Drone.battery_capacity).label("battery_capacity"),
+                func.sum(Drone.loaded_weight).label("loaded_weight"),
+            ).group_by(Drone.state, Drone.model, DRONE_BATTERY_LEVEL),
+            sqla_select(
+                DroneStats.state,
+                DroneStats.model,
+                DroneStats.battery_level,
+                -DroneStats.drones,
+                -DroneStats.battery_capacity,
+                -DroneStats.loaded_weight,
+            ),
+        ).subquery()
+        drones = func.sum(counted.c.drones)
+        battery_capacity = func.sum(counted.c.battery_capacity)
+        loaded_weight = func.sum(counted.c.loaded_weight)
+        query = (
+            sqla_select(
+                counted.c.state,
+                counted.c.model,
+                counted.c.battery_level,
+                drones.label("drones"),
+                battery_capacity.label("battery_capacity"),
+                loaded_weight.label("loaded_weight"),
+            )
+            .group_by(counted.c.state, counted.c.model, counted.c.battery_level)
+            .having(
+                or_(
+                    drones != 0,
+                    loaded_weight != 0,
+                    func.abs(battery_capacity) > STATS_BATTERY_TOLERANCE,
+                )
+            )
+        )
+        differences = [dict(row) for row in self.__session.execute(query).mappings()]
+        if not differences:
+            return 0
+        statement = sqlite_insert(DroneStats)
+        self.__session.execute(
+            statement.on_conflict_do_update(
+                index_elements=[
+                    DroneStats.state,
+                    DroneStats.model,
+                    DroneStats.battery_level,
+                ],
+                set_={
+                    "drones": DroneStats.drones + statement.excluded.drones,
+                    "battery_capacity": (
+                        DroneStats.battery_capacity
+                        + statement.excluded.battery_capacity
+                    ),
+                    "loaded_weight": (
+                        DroneStats.loaded_weight + statement.excluded.loaded_weight
+                    ),
+                },
+            ),
+            differences,
+        )
+        self.__session.commit()
+        return len(differences)
+
+    def load_weight(self, drone_id: UUID, weight: int) -> bool:
+        """
+        Add `weight` to the load of the drone only if it still fits in its
+        weight limit. The change is not committed here, it is committed
+        together with the next commit of the session.
+        """
+        query = (
+            update(Drone)
+            .where(Drone.id == drone_id)
+            .where(Drone.loaded_weight + weight <= Drone.weight_limit)
+            .values(
+                loaded_weight=Drone.loaded_weight + weight,
+                version=Drone.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        result = self.__session.execute(query)
+        if result.rowcount != 1:
+            return False
+        self.__bump_fleet_version()
+        return True
+
+    def load_weights(self, weights: dict[UUID, int]) -> bool:
+        """
+        Same as `load_weight` for many drones at once, in a single statement.
+        Return whether every drone could take its weight, otherwise the
+        caller must not commit the session.
+        """
+        if not weights:
+            return True
+        table = Drone.__table__
+        query = (
+            update(table)
+            .where(table.c.id == bindparam("drone_id"))
+            .where(table.c.loaded_weight + bindparam("weight") <= table.c.weight_limit)
+            .values(
+                loaded_weight=table.c.loaded_weight + bindparam("weight"),
+                version=table.c.version + 1,
+            )
+        )
+        result = self.__session.execute(
+            query,
+            [
+                {"drone_id": drone_id, "weight": weight}
+                for drone_id, weight in weights.items()
+            ],
+        )
+        if result.rowcount != len(weights):
+            return False
+        self.__bump_fleet_version()
+        return True
+
+    def update_telemetry(self, reports: list[dict[str, Any]]) -> int:
+        """
+        Set the battery capacity, state and position of many drones in a
+        single statement and commit them. Every report is a dict with the
+        `drone_id`, `battery_capacity`, `state`, `latitude` and `longitude` of
+        a drone, the position is kept when they are `None`. Return the number
+        of drones updated, the reports of unknown drones are ignored.
+        """
+        if not reports:
+            return 0
+        table = Drone.__table__
+        query = (
+            update(table)
+            .where(table.c.id == bindparam("drone_id"))
+            .values(
+                battery_capacity=bindparam("battery_capacity"),
+                state=bindparam("state"),
+                latitude=func.coalesce(bindparam("latitude"), table.c.latitude),
+                longitude=func.coalesce(bindparam("longitude"), table.c.longitude),
+                version=table.c.version + 1,
+            )
+        )
+        result = self.__session.execute(query, reports)
+        if result.rowcount:
+            self.__bump_fleet_version()
+        self.__session.commit()
+        return result.rowcount
+
+    def unload_weight(self, drone_id: UUID, weight: int) -> None:
+        """
+        Remove `weight` from the load of the drone and commit it together with
+        the pending changes of the session.
+        """
+        query = (
+            update(Drone)
+            .where(Drone.id == drone_id)
+            .values(
+                loaded_weight=Drone.loaded_weight - weight,
+                version=Drone.version + 1,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        self.__session.execute(query)
+        self.__bump_fleet_version()
+        self.__session.commit()
+
+    @staticmethod
+    def __filter_drones(
+        query: QueryT,
+        state: DroneState | None,
+        model: DroneModelType | None,
+        min_battery_capacity: float | None,
+        max_battery_capacity: float | None,
+        min_weight_limit: int | None,
+        max_weight_limit: int | None,
+        after: UUID | None,
+        limit: int | None,
+    ) -> QueryT:
+        if state is not None:
+            query = query.where(Drone.state == state)
+        if model is not None:
+            query = query.where(Drone.model == model)
+        if min_battery_capacity is not None:
+            query = query.where(Drone.battery_capacity >= min_battery_capacity)
+        if max_battery_capacity is not None:
+            query = query.where(Drone.battery_capacity <= max_battery_capacity)
+        if min_weight_limit is not None:
+            query = query.where(Drone.weight_limit >= min_weight_limit)
+        if max_weight_limit is not None:
+            query = query.where(Drone.weight_limit <= max_weight_limit)
+        if after is not None:
+            query = query.where(Drone.id > after)
+        query = query.order_by(Drone.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query
+
+    def __bump_fleet_version(self) -> None:
+        query = (
+            update(Fleet)
+            .where(Fleet.id == FLEET_ID)
+            .values(version=Fleet.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        self.__session.execute(query)
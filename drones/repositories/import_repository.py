@@ -0,0 +1,58 @@
+from typing import Any
+
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from ..data.database import FLEET_ID, Drone, Fleet, ImportProgress, Medication
+from .medication_repository import add_product_rows
+
+
+class ImportRepository:
+    def __init__(self, session: Session) -> None:
+        self.__session = session
+
+    def get_progress(self, source: str) -> int:
+        query = select(ImportProgress.records).where(ImportProgress.source == source)
+        return self.__session.exec(query).first() or 0
+
+    def add_rows(
+        self,
+        source: str,
+        records: int,
+        drones: list[dict[str, Any]],
+        medications: list[dict[str, Any]],
+    ) -> None:
+        """
+        Insert the plain columns of the drones and medications and record that
+        the first `records` records of `source` are imported, all of it in a
+        single transaction. The medications are described by their name, code
+        and image, they are loaded with the products of the catalog for them.
+        """
+        if drones:
+            self.__session.execute(insert(Drone), drones)
+            self.__session.execute(
+                update(Fleet)
+                .where(Fleet.id == FLEET_ID)
+                .values(version=Fleet.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+        if medications:
+            keys = [
+                (medication["code"], medication["name"], medication["image"])
+                for medication in medications
+            ]
+            product_ids = add_product_rows(self.__session, keys)
+            self.__session.execute(
+                insert(Medication),
+                [
+                    {
+                        "id": medication["id"],
+                        "product_id": product_ids[key],
+                        "weight": medication["weight"],
+                        "drone_id": medication["drone_id"],
+                    }
+                    for key, medication in zip(keys, medications)
+                ],
+            )
+        self.__session.merge(ImportProgress(source=source, records=records))
+        self.__session.commit()
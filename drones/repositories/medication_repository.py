@@ -1,8 +1,87 @@
+import re
+from typing import Any, Iterable
 from uuid import UUID
 
+from sqlalchemy import delete, insert
+from sqlalchemy import select as sqla_select
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlmodel import Session, select
 
-from ..data.database import Medication
+from ..cache import ProductKey
+from ..data.database import (
+    MEDICATION_PRODUCTS_FTS,
+    Drone,
+    DroneState,
+    Medication,
+    MedicationProduct,
+)
+
+PRODUCTS_BATCH_SIZE = 500
+
+MEDICATION_SEARCH_COLUMNS = (
+    Medication.id,
+    MedicationProduct.name,
+    Medication.weight,
+    MedicationProduct.code,
+    MedicationProduct.image,
+    Medication.drone_id,
+)
+
+_TOKEN = re.compile(r"[A-Za-z0-9]+")
+
+
+def name_prefix_match(prefix: str) -> str | None:
+    """
+    Return the FTS5 query for the names that start with the tokens of
+    `prefix`, the last one of them maybe incomplete, or `None` if it has no
+    tokens. It matches a superset of the names that start with `prefix`, as
+    the separators between the tokens are not compared.
+    """
+    tokens = _TOKEN.findall(prefix)
+    if not tokens:
+        return None
+    return f'^ "{" ".join(tokens)}" *'
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def add_product_rows(
+    session: Session, keys: Iterable[ProductKey]
+) -> dict[ProductKey, int]:
+    """
+    Add the products of the catalog with the given keys that are not there
+    yet and return the id of all of them by their key. The products are not
+    committed here, they are committed together with the next commit of the
+    session.
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    if not unique_keys:
+        return {}
+    session.execute(
+        sqlite_insert(MedicationProduct).on_conflict_do_nothing(),
+        [
+            {"code": code, "name": name, "image": image}
+            for code, name, image in unique_keys
+        ],
+    )
+    ids = {}
+    for index in range(0, len(unique_keys), PRODUCTS_BATCH_SIZE):
+        query = select(
+            MedicationProduct.id,
+            MedicationProduct.code,
+            MedicationProduct.name,
+            MedicationProduct.image,
+        ).where(
+            tuple_(
+                MedicationProduct.code, MedicationProduct.name, MedicationProduct.image
+            ).in_(unique_keys[index : index + PRODUCTS_BATCH_SIZE])
+        )
+        for product_id, code, name, image in session.execute(query):
+            ids[(code, name, image)] = product_id
+    return ids
 
 
 class MedicationRepository:
@@ -15,9 +94,104 @@ class MedicationRepository:
         self.__session.refresh(medication)
         return medication
 
-    def remove_medication(self, medication: Medication) -> None:
-        self.__session.delete(medication)
-        self.__session.commit()
+    def add_medications(self, medications: list[Medication]) -> list[Medication]:
+        if medications:
+            self.__session.execute(
+                insert(Medication),
+                [medication.dict() for medication in medications],
+            )
+            self.__session.commit()
+        return medications
+
+    def add_medication_rows(self, rows: list[dict[str, Any]]) -> None:
+        """
+        Same as `add_medications` from the plain columns of the medications,
+        without building ORM objects.
+        """
+        if rows:
+            self.__session.execute(insert(Medication), rows)
+            self.__session.commit()
+
+    def add_products(self, keys: list[ProductKey]) -> list[MedicationProduct]:
+        """
+        Add the products of the catalog with the given keys that are not there
+        yet and return all of them. The products are not committed here, they
+        are committed together with the next commit of the session.
+        """
+        ids = add_product_rows(self.__session, keys)
+        return [
+            MedicationProduct(id=product_id, code=code, name=name, image=image)
+            for (code, name, image), product_id in ids.items()
+        ]
+
+    def get_products(self, product_ids: Iterable[int]) -> list[MedicationProduct]:
+        query = select(MedicationProduct).where(
+            MedicationProduct.id.in_(list(product_ids))  # type: ignore
+        )
+        return self.__session.exec(query).all()
+
+    def search_medication_rows(
+        self,
+        code: str | None = None,
+        name_prefix: str | None = None,
+        drone_state: DroneState | None = None,
+        after: UUID | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Return the plain columns of the medications of all the drones, ordered
+        by id, with the given code, a name starting with `name_prefix`, case
+        insensitive, and loaded onto a drone in `drone_state`. The products
+        are found by the unique index led by their code and by the FTS5 index
+        of their names, the medications by the index of their product.
+        """
+        query = sqla_select(*MEDICATION_SEARCH_COLUMNS).join(
+            MedicationProduct, MedicationProduct.id == Medication.product_id
+        )
+        if code is not None:
+            query = query.where(MedicationProduct.code == code)
+        if name_prefix is not None:
+            match = name_prefix_match(name_prefix)
+            if match is not None:
+                query = query.where(
+                    MedicationProduct.id.in_(  # type: ignore
+                        sqla_select(MEDICATION_PRODUCTS_FTS.c.rowid).where(
+                            text("medication_products_fts MATCH :match").bindparams(
+                                match=match
+                            )
+                        )
+                    )
+                )
+            query = query.where(
+                MedicationProduct.name.like(  # type: ignore
+                    f"{_escape_like(name_prefix)}%", escape="\\"
+                )
+            )
+        if drone_state is not None:
+            query = query.join(Drone, Drone.id == Medication.drone_id).where(
+                Drone.state == drone_state
+            )
+        if after is not None:
+            query = query.where(Medication.id > after)
+        query = query.order_by(Medication.id)
+        if limit is not None:
+            query = query.limit(limit)
+        result = self.__session.execute(query)
+        keys = tuple(result.keys())
+        return [dict(zip(keys, row)) for row in result]
+
+    def remove_medication(self, drone_id: UUID, medication_id: UUID) -> bool:
+        """
+        Remove the medication from the drone and return whether it was there.
+        The change is not committed here, it is committed together with the
+        next commit of the session.
+        """
+        query = (
+            delete(Medication)
+            .where(Medication.id == medication_id, Medication.drone_id == drone_id)
+            .execution_options(synchronize_session=False)
+        )
+        return self.__session.execute(query).rowcount == 1
 
     def get_medications(self, drone_id: UUID | None = None) -> list[Medication]:
         query = select(Medication)
@@ -26,6 +200,10 @@ class MedicationRepository:
         medications = self.__session.exec(query).all()
         return medications
 
+    def has_medications(self, drone_id: UUID) -> bool:
+        query = select(Medication.id).where(Medication.drone_id == drone_id).limit(1)
+        return self.__session.exec(query).first() is not None
+
     def get_medication(self, medication_id: UUID) -> Medication | None:
         query = select(Medication).where(Medication.id == medication_id)
         medication = self.__session.exec(query).first()
@@ -1,74 +1,352 @@
+from datetime import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic.error_wrappers import ErrorWrapper
 
-from ..data.database import DroneState
-from ..deps import get_drone_service
+from ..cache import DroneDetailsCache, get_drone_details_cache
+from ..data.database import DroneModelType, DroneState
+from ..deps import (
+    CSV_MEDIA_TYPE,
+    NDJSON_MEDIA_TYPE,
+    get_async_drone_service,
+    get_async_read_battery_history_service,
+    get_async_read_drone_service,
+    get_drones_post_bulk,
+    get_read_drone_service,
+)
+from ..etags import drone_etag, etag_matches, fleet_etag
+from ..export import accepts_gzip, csv_chunks, gzip_chunks, ndjson_chunks
+from ..geo import SEARCH_RADII
+from ..query_budget import query_budget
 from ..schemas import (
+    BatteryHistoryResolution,
+    BatteryHistorySchema,
+    CacheStatsSchema,
+    DispatchPlanSchema,
+    DroneFiltersSchema,
     DroneGetDetailsSchema,
     DroneGetSchema,
+    DroneInclude,
+    DroneNearestSchema,
     DronePostSchema,
+    DroneStatsSchema,
+    DroneTelemetryReportSchema,
+    DroneTelemetrySchema,
+    ExportFormat,
     MedicationGetSchema,
     MedicationPostSchema,
+    TelemetryStatsSchema,
 )
+from ..services.async_battery_history_service import AsyncBatteryHistoryService
+from ..services.async_drone_service import AsyncDroneService
 from ..services.drone_service import DroneService
+from ..settings import get_settings
+from ..telemetry import TelemetryBuffer, get_telemetry_buffer
 
-router = APIRouter(tags=["Drones"])
+router = APIRouter(tags=["Drones"], default_response_class=ORJSONResponse)
 
 
-@router.get("", response_model=list[DroneGetSchema])
-def get_drones(
+@router.get("", response_model=list[DroneGetDetailsSchema | DroneGetSchema])
+@query_budget(4)
+async def get_drones(
     state: DroneState | None = None,
-    drone_service: DroneService = Depends(get_drone_service),
+    model: DroneModelType | None = None,
+    min_battery_capacity: float | None = Query(default=None, ge=0, le=100),
+    max_battery_capacity: float | None = Query(default=None, ge=0, le=100),
+    min_weight_limit: int | None = Query(default=None, gt=0, le=500),
+    max_weight_limit: int | None = Query(default=None, gt=0, le=500),
+    limit: int = Query(
+        default=get_settings().drones_page_size,
+        gt=0,
+        le=get_settings().drones_max_page_size,
+    ),
+    after: str | None = None,
+    include: DroneInclude | None = None,
+    if_none_match: str | None = Header(default=None),
+    drone_service: AsyncDroneService = Depends(get_async_read_drone_service),
+):
+    # Note: The version is read before the rows so a concurrent write can only
+    # make the tag older than the body, which costs a refetch but is never stale.
+    etag = fleet_etag(await drone_service.get_fleet_version())
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    filters = DroneFiltersSchema(
+        state=state,
+        model=model,
+        min_battery_capacity=min_battery_capacity,
+        max_battery_capacity=max_battery_capacity,
+        min_weight_limit=min_weight_limit,
+        max_weight_limit=max_weight_limit,
+    )
+    page = await drone_service.get_drones_page(
+        filters, limit, after, include == DroneInclude.MEDICATIONS
+    )
+    headers = {"ETag": etag}
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = page.next_cursor
+    # Note: The rows are returned in a response so FastAPI does not validate
+    # them again against the response model.
+    return ORJSONResponse(page.items, headers=headers)
+
+
+@router.get("/available", response_model=list[DroneGetSchema])
+@query_budget(1)
+async def get_available_drones(
+    weight: int = Query(gt=0, le=500),
+    limit: int = Query(
+        default=get_settings().drones_available_size,
+        gt=0,
+        le=get_settings().drones_max_page_size,
+    ),
+    drone_service: AsyncDroneService = Depends(get_async_read_drone_service),
+):
+    return ORJSONResponse(await drone_service.get_available_drones(weight, limit))
+
+
+@router.get("/nearest", response_model=list[DroneNearestSchema])
+@query_budget(len(SEARCH_RADII))
+async def get_nearest_drones(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    weight: int = Query(gt=0, le=500),
+    k: int = Query(
+        default=get_settings().drones_nearest_size,
+        gt=0,
+        le=get_settings().drones_max_page_size,
+    ),
+    drone_service: AsyncDroneService = Depends(get_async_read_drone_service),
+):
+    return ORJSONResponse(await drone_service.get_nearest_drones(lat, lon, k, weight))
+
+
+@router.post("/dispatch", response_model=DispatchPlanSchema)
+@query_budget(6)
+async def post_dispatch(
+    medications: list[MedicationPostSchema],
+    commit: bool = False,
+    drone_service: AsyncDroneService = Depends(get_async_drone_service),
+):
+    if len(medications) > get_settings().drones_dispatch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Too many medications in a single dispatch",
+        )
+    plan = await drone_service.dispatch_medications(medications, commit)
+    return ORJSONResponse(plan.dict())
+
+
+@router.get(
+    "/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"content": {NDJSON_MEDIA_TYPE: {}, CSV_MEDIA_TYPE: {}}},
+    },
+)
+@query_budget(1)
+async def export_drones(
+    format: ExportFormat = ExportFormat.NDJSON,
+    include: DroneInclude | None = None,
+    accept_encoding: str | None = Header(default=None),
+    drone_service: DroneService = Depends(get_read_drone_service),
+):
+    # Note: The rows are read with the sync service in every database mode,
+    # the response iterates over them in the threadpool while the session of
+    # the request stays open.
+    with_medications = include == DroneInclude.MEDICATIONS
+    batches = drone_service.iter_drone_rows(
+        with_medications, get_settings().drones_export_batch_size
+    )
+    if format == ExportFormat.CSV:
+        chunks, media_type = csv_chunks(batches, with_medications), CSV_MEDIA_TYPE
+    else:
+        chunks = ndjson_chunks(batches, with_medications)
+        media_type = NDJSON_MEDIA_TYPE
+    headers = {
+        "Content-Disposition": f'attachment; filename="drones.{format.value}"',
+        "Vary": "Accept-Encoding",
+    }
+    if accepts_gzip(accept_encoding):
+        chunks = gzip_chunks(chunks)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(chunks, media_type=media_type, headers=headers)
+
+
+@router.get("/stats", response_model=DroneStatsSchema)
+@query_budget(1)
+async def get_drones_stats(
+    drone_service: AsyncDroneService = Depends(get_async_read_drone_service),
 ):
-    return drone_service.get_drones(state)
+    return await drone_service.get_stats()
+
+
+@router.get("/details-cache", response_model=CacheStatsSchema)
+@query_budget(0)
+async def get_details_cache_stats(
+    details_cache: DroneDetailsCache = Depends(get_drone_details_cache),
+):
+    return details_cache.stats()
+
+
+@router.post("/telemetry", status_code=status.HTTP_202_ACCEPTED)
+@query_budget(0)
+async def post_telemetry_batch(
+    reports: list[DroneTelemetryReportSchema],
+    telemetry_buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
+):
+    telemetry_buffer.put_many([(report.drone_id, report) for report in reports])
+
+
+@router.get("/telemetry", response_model=TelemetryStatsSchema)
+@query_budget(0)
+async def get_telemetry_stats(
+    telemetry_buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
+):
+    return telemetry_buffer.stats()
 
 
 @router.get("/{drone_id}", response_model=DroneGetDetailsSchema)
-def get_drone(
+@query_budget(4)
+async def get_drone(
     drone_id: UUID,
-    drone_service: DroneService = Depends(get_drone_service),
+    if_none_match: str | None = Header(default=None),
+    drone_service: AsyncDroneService = Depends(get_async_read_drone_service),
+    telemetry_buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
 ):
-    return drone_service.get_drone(drone_id)
+    version = await drone_service.get_drone_version(drone_id)
+    pending = telemetry_buffer.get(drone_id)
+    etag = drone_etag(
+        drone_id, version, pending.sequence if pending is not None else None
+    )
+    if etag_matches(if_none_match, etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag}
+        )
+    details = await drone_service.get_drone(drone_id, version)
+    return ORJSONResponse(details.dict(), headers={"ETag": etag})
 
 
 @router.post("", response_model=DroneGetSchema)
-def post_drone(
+@query_budget(3)
+async def post_drone(
     drone: DronePostSchema,
-    drone_service: DroneService = Depends(get_drone_service),
+    drone_service: AsyncDroneService = Depends(get_async_drone_service),
 ):
-    return drone_service.add_drone(drone)
+    return await drone_service.add_drone(drone)
+
+
+@router.post(
+    "/bulk",
+    response_model=list[DroneGetSchema],
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "type": "array",
+                        "items": {"$ref": "#/components/schemas/DronePostSchema"},
+                    }
+                },
+                NDJSON_MEDIA_TYPE: {
+                    "schema": {"$ref": "#/components/schemas/DronePostSchema"}
+                },
+            },
+        }
+    },
+)
+@query_budget(2)
+async def post_drones_bulk(
+    drones: list[DronePostSchema] = Depends(get_drones_post_bulk),
+    drone_service: AsyncDroneService = Depends(get_async_drone_service),
+):
+    return await drone_service.add_drones(drones)
+
+
+@router.put("/{drone_id}/telemetry", status_code=status.HTTP_202_ACCEPTED)
+@query_budget(0)
+async def put_telemetry(
+    drone_id: UUID,
+    telemetry: DroneTelemetrySchema,
+    telemetry_buffer: TelemetryBuffer = Depends(get_telemetry_buffer),
+):
+    telemetry_buffer.put(drone_id, telemetry)
 
 
 @router.delete("/{drone_id}")
-def delete_drone(
+@query_budget(4)
+async def delete_drone(
     drone_id: UUID,
-    drone_service: DroneService = Depends(get_drone_service),
+    drone_service: AsyncDroneService = Depends(get_async_drone_service),
 ):
-    return drone_service.remove_drone(drone_id)
+    return await drone_service.remove_drone(drone_id)
 
 
 @router.get("/{drone_id}/medications", response_model=list[MedicationGetSchema])
-def get_medications(
+@query_budget(3)
+async def get_medications(
     drone_id: UUID,
-    drone_service: DroneService = Depends(get_drone_service),
+    drone_service: AsyncDroneService = Depends(get_async_read_drone_service),
 ):
-    return drone_service.get_drone(drone_id).medications
+    return await drone_service.get_medications(drone_id)
 
 
 @router.post("/{drone_id}/medications", response_model=MedicationGetSchema)
-def post_medication(
+@query_budget(7)
+async def post_medication(
     drone_id: UUID,
     medication: MedicationPostSchema,
-    drone_service: DroneService = Depends(get_drone_service),
+    drone_service: AsyncDroneService = Depends(get_async_drone_service),
+):
+    return await drone_service.add_medication(drone_id, medication)
+
+
+@router.post(
+    "/{drone_id}/medications/batch",
+    response_model=list[MedicationGetSchema],
+)
+@query_budget(6)
+async def post_medications_batch(
+    drone_id: UUID,
+    medications: list[MedicationPostSchema],
+    drone_service: AsyncDroneService = Depends(get_async_drone_service),
 ):
-    return drone_service.add_medication(drone_id, medication)
+    if not medications:
+        error = ValueError("ensure this value has at least 1 items")
+        raise RequestValidationError([ErrorWrapper(error, ("body",))])
+    if len(medications) > get_settings().medications_batch_max_size:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Too many medications in a single batch",
+        )
+    return await drone_service.add_medications(drone_id, medications)
 
 
 @router.delete("/{drone_id}/medications/{medication_id}")
-def delete_medication(
+@query_budget(4)
+async def delete_medication(
     drone_id: UUID,
     medication_id: UUID,
-    drone_service: DroneService = Depends(get_drone_service),
+    drone_service: AsyncDroneService = Depends(get_async_drone_service),
+):
+    return await drone_service.remove_medication(drone_id, medication_id)
+
+
+@router.get("/{drone_id}/battery-history", response_model=BatteryHistorySchema)
+@query_budget(2)
+async def get_battery_history(
+    drone_id: UUID,
+    start: datetime | None = Query(default=None, alias="from"),
+    end: datetime | None = Query(default=None, alias="to"),
+    resolution: BatteryHistoryResolution | None = None,
+    battery_history_service: AsyncBatteryHistoryService = Depends(
+        get_async_read_battery_history_service
+    ),
 ):
-    return drone_service.remove_medication(drone_id, medication_id)
+    return await battery_history_service.get_battery_history(
+        drone_id, start, end, resolution
+    )
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import ORJSONResponse
+
+from ..data.database import DroneState
+from ..deps import get_async_read_drone_service
+from ..query_budget import query_budget
+from ..schemas import MedicationFiltersSchema, MedicationGetSchema
+from ..services.async_drone_service import AsyncDroneService
+from ..settings import get_settings
+
+router = APIRouter(tags=["Medications"], default_response_class=ORJSONResponse)
+
+
+@router.get("", response_model=list[MedicationGetSchema])
+@query_budget(1)
+async def get_medications(
+    code: str | None = Query(default=None, regex="^[A-Z0-9_]+$"),
+    name_prefix: str | None = Query(default=None, regex="^[A-Za-z0-9_-]+$"),
+    drone_state: DroneState | None = None,
+    limit: int = Query(
+        default=get_settings().medications_page_size,
+        gt=0,
+        le=get_settings().medications_max_page_size,
+    ),
+    after: str | None = None,
+    drone_service: AsyncDroneService = Depends(get_async_read_drone_service),
+):
+    filters = MedicationFiltersSchema(
+        code=code, name_prefix=name_prefix, drone_state=drone_state
+    )
+    page = await drone_service.search_medications(filters, limit, after)
+    headers = {}
+    if page.next_cursor is not None:
+        headers["X-Next-Cursor"] = page.next_cursor
+    # Note: The rows are returned in a response so FastAPI does not validate
+    # them again against the response model.
+    return ORJSONResponse(page.items, headers=headers)
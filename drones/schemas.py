@@ -1,3 +1,6 @@
+from datetime import datetime
+from enum import Enum
+from typing import Any
 from uuid import UUID
 
 from pydantic import AnyHttpUrl, BaseModel, Field
@@ -15,10 +18,16 @@ class DroneBaseSchema(BaseModel):
     weight_limit: int = Field(gt=0, le=500)
     battery_capacity: float = Field(ge=0, le=100)
     state: DroneState
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
 
 
 class DroneGetSchema(DroneBaseSchema, IdSchema):
-    pass
+    loaded_weight: int = Field(default=0, ge=0)
+
+
+class DroneNearestSchema(DroneGetSchema):
+    distance: float
 
 
 class DroneGetDetailsSchema(DroneGetSchema):
@@ -29,6 +38,45 @@ class DronePostSchema(DroneBaseSchema):
     pass
 
 
+class DroneFiltersSchema(BaseModel):
+    state: DroneState | None = None
+    model: DroneModelType | None = None
+    min_battery_capacity: float | None = Field(default=None, ge=0, le=100)
+    max_battery_capacity: float | None = Field(default=None, ge=0, le=100)
+    min_weight_limit: int | None = Field(default=None, gt=0, le=500)
+    max_weight_limit: int | None = Field(default=None, gt=0, le=500)
+
+
+class DroneInclude(str, Enum):
+    MEDICATIONS = "medications"
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+
+class DronesPageSchema(BaseModel):
+    # Note: The items are the rows of `DroneGetSchema`, or `DroneGetDetailsSchema`
+    # with the medications, read from the database. They are already valid, so
+    # they are kept as plain dicts.
+    items: list[dict[str, Any]]
+    next_cursor: str | None = None
+
+
+class MedicationFiltersSchema(BaseModel):
+    code: str | None = Field(default=None, regex="^[A-Z0-9_]+$")
+    name_prefix: str | None = Field(default=None, regex="^[A-Za-z0-9_-]+$")
+    drone_state: DroneState | None = None
+
+
+class MedicationsPageSchema(BaseModel):
+    # Note: The items are the rows of `MedicationGetSchema` read from the
+    # database, kept as plain dicts as the ones of `DronesPageSchema`.
+    items: list[dict[str, Any]]
+    next_cursor: str | None = None
+
+
 class MedicationBaseSchema(BaseModel):
     name: str = Field(regex="^[A-Za-z0-9_-]*$")
     weight: int = Field(gt=0)
@@ -44,8 +92,83 @@ class MedicationPostSchema(MedicationBaseSchema):
     pass
 
 
+class MedicationProductSchema(BaseModel):
+    id: int
+    code: str
+    name: str
+    image: AnyHttpUrl
+
+
+class DispatchAssignmentSchema(BaseModel):
+    drone_id: UUID
+    # Note: The medications are the indexes of the items of the request.
+    medications: list[int]
+    weight: int
+
+
+class DispatchPlanSchema(BaseModel):
+    assignments: list[DispatchAssignmentSchema]
+    unassigned: list[int]
+    committed: bool
+
+
+class DroneTelemetrySchema(BaseModel):
+    battery_capacity: float = Field(ge=0, le=100)
+    state: DroneState
+    latitude: float | None = Field(default=None, ge=-90, le=90)
+    longitude: float | None = Field(default=None, ge=-180, le=180)
+
+
+class DroneTelemetryReportSchema(DroneTelemetrySchema):
+    drone_id: UUID
+
+
+class TelemetryStatsSchema(BaseModel):
+    pending: int
+    lag: float
+    received: int
+    flushed: int
+    last_flush_size: int
+
+
+class DroneStatsSchema(BaseModel):
+    drones: int
+    states: dict[str, int]
+    models: dict[str, int]
+    average_battery_capacity: float | None
+    loaded_weight: int
+    low_battery: int
+
+
+class BatteryHistoryResolution(str, Enum):
+    RAW = "raw"
+    MINUTE = "1m"
+    HOUR = "1h"
+
+
+class BatterySampleSchema(BaseModel):
+    timestamp: datetime
+    battery_capacity: float
+    min_battery_capacity: float
+    max_battery_capacity: float
+
+
+class BatteryHistorySchema(BaseModel):
+    drone_id: UUID
+    resolution: BatteryHistoryResolution
+    samples: list[BatterySampleSchema]
+
+
+class CacheStatsSchema(BaseModel):
+    size: int
+    max_size: int
+    hits: int
+    misses: int
+
+
 DroneGetSchema.update_forward_refs()
 DroneGetDetailsSchema.update_forward_refs()
 DronePostSchema.update_forward_refs()
+DronesPageSchema.update_forward_refs()
 MedicationGetSchema.update_forward_refs()
 MedicationPostSchema.update_forward_refs()
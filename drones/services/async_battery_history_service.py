@@ -0,0 +1,21 @@
+from datetime import datetime
+from uuid import UUID
+
+from ..schemas import BatteryHistoryResolution, BatteryHistorySchema
+from .async_service import AsyncService
+from .battery_history_service import BatteryHistoryService
+
+
+class AsyncBatteryHistoryService(AsyncService[BatteryHistoryService]):
+    async def get_battery_history(
+        self,
+        drone_id: UUID,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        resolution: BatteryHistoryResolution | None = None,
+    ) -> BatteryHistorySchema:
+        return await self._run(
+            lambda service: service.get_battery_history(
+                drone_id, start, end, resolution
+            )
+        )
@@ -0,0 +1,123 @@
+from typing import Any
+from uuid import UUID
+
+from ..schemas import (
+    DispatchPlanSchema,
+    DroneFiltersSchema,
+    DroneGetDetailsSchema,
+    DroneGetSchema,
+    DronePostSchema,
+    DronesPageSchema,
+    DroneStatsSchema,
+    MedicationFiltersSchema,
+    MedicationGetSchema,
+    MedicationPostSchema,
+    MedicationsPageSchema,
+)
+from .async_service import AsyncService
+from .drone_service import DroneService
+
+
+class AsyncDroneService(AsyncService[DroneService]):
+    async def add_drone(self, drone: DronePostSchema) -> DroneGetSchema:
+        return await self._run(lambda service: service.add_drone(drone))
+
+    async def add_drones(self, drones: list[DronePostSchema]) -> list[DroneGetSchema]:
+        return await self._run(lambda service: service.add_drones(drones))
+
+    async def remove_drone(self, drone_id: UUID) -> None:
+        return await self._run(lambda service: service.remove_drone(drone_id))
+
+    async def get_drones_page(
+        self,
+        filters: DroneFiltersSchema,
+        limit: int,
+        after: str | None = None,
+        with_medications: bool = False,
+    ) -> DronesPageSchema:
+        return await self._run(
+            lambda service: service.get_drones_page(
+                filters, limit, after, with_medications
+            )
+        )
+
+    async def get_available_drones(
+        self,
+        weight: int,
+        limit: int,
+    ) -> list[dict[str, Any]]:
+        return await self._run(
+            lambda service: service.get_available_drones(weight, limit)
+        )
+
+    async def get_nearest_drones(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        weight: int,
+    ) -> list[dict[str, Any]]:
+        return await self._run(
+            lambda service: service.get_nearest_drones(latitude, longitude, k, weight)
+        )
+
+    async def get_drone(
+        self,
+        drone_id: UUID,
+        version: int | None = None,
+    ) -> DroneGetDetailsSchema:
+        return await self._run(lambda service: service.get_drone(drone_id, version))
+
+    async def get_stats(self) -> DroneStatsSchema:
+        return await self._run(lambda service: service.get_stats())
+
+    async def get_medications(self, drone_id: UUID) -> list[MedicationGetSchema]:
+        return await self._run(lambda service: service.get_medications(drone_id))
+
+    async def search_medications(
+        self,
+        filters: MedicationFiltersSchema,
+        limit: int,
+        after: str | None = None,
+    ) -> MedicationsPageSchema:
+        return await self._run(
+            lambda service: service.search_medications(filters, limit, after)
+        )
+
+    async def get_drone_version(self, drone_id: UUID) -> int:
+        return await self._run(lambda service: service.get_drone_version(drone_id))
+
+    async def get_fleet_version(self) -> int:
+        return await self._run(lambda service: service.get_fleet_version())
+
+    async def add_medication(
+        self,
+        drone_id: UUID,
+        medication: MedicationPostSchema,
+    ) -> MedicationGetSchema:
+        return await self._run(
+            lambda service: service.add_medication(drone_id, medication)
+        )
+
+    async def add_medications(
+        self,
+        drone_id: UUID,
+        medications: list[MedicationPostSchema],
+    ) -> list[MedicationGetSchema]:
+        return await self._run(
+            lambda service: service.add_medications(drone_id, medications)
+        )
+
+    async def dispatch_medications(
+        self,
+        medications: list[MedicationPostSchema],
+        commit: bool = False,
+    ) -> DispatchPlanSchema:
+        return await self._run(
+            lambda service: service.dispatch_medications(medications, commit)
+        )
+
+    async def remove_medication(self, drone_id: UUID, medication_id: UUID) -> None:
+        return await self._run(
+            lambda service: service.remove_medication(drone_id, medication_id)
+        )
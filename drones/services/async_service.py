@@ -0,0 +1,42 @@
+from typing import Any, Awaitable, Callable, Generic, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlmodel import Session
+from starlette.concurrency import run_in_threadpool
+
+ServiceT = TypeVar("ServiceT")
+
+ServiceCall = Callable[[ServiceT], Any]
+ServiceRunner = Callable[[ServiceCall[ServiceT]], Awaitable[Any]]
+
+
+class AsyncService(Generic[ServiceT]):
+    """
+    Base of the awaitable versions of the services. The rules of every
+    operation live only in the wrapped service, this class only decides where
+    its calls are run: in the threadpool or in the event loop through an
+    `AsyncSession`.
+    """
+
+    def __init__(self, run: ServiceRunner[ServiceT]) -> None:
+        self._run = run
+
+    @classmethod
+    def from_threadpool(cls, service: ServiceT):
+        async def run(call: ServiceCall[ServiceT]) -> Any:
+            return await run_in_threadpool(call, service)
+
+        return cls(run)
+
+    @classmethod
+    def from_async_session(
+        cls,
+        session: AsyncSession,
+        build_service: Callable[[Session], ServiceT],
+    ):
+        async def run(call: ServiceCall[ServiceT]) -> Any:
+            return await session.run_sync(
+                lambda sync_session: call(build_service(sync_session))
+            )
+
+        return cls(run)
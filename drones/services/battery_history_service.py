@@ -0,0 +1,166 @@
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+
+from ..data.database import BatteryRollup, BatterySample
+from ..repositories.battery_history_repository import BatteryHistoryRepository
+from ..repositories.drone_repository import DroneRepository
+from ..schemas import (
+    BatteryHistoryResolution,
+    BatteryHistorySchema,
+    BatterySampleSchema,
+    DroneGetSchema,
+)
+from .drone_service import DroneNotFoundError
+
+ROLLUP_SECONDS = {
+    BatteryHistoryResolution.MINUTE: 60,
+    BatteryHistoryResolution.HOUR: 60 * 60,
+}
+DEFAULT_RANGE = timedelta(hours=1)
+
+
+class InvalidTimeRangeError(Exception):
+    pass
+
+
+class BatteryHistoryService:
+    def __init__(
+        self,
+        battery_history_repository: BatteryHistoryRepository,
+        drone_repository: DroneRepository,
+        sample_interval: int,
+        raw_retention: int,
+        minute_retention: int,
+        hour_retention: int,
+        max_points: int,
+    ) -> None:
+        self.__battery_history_repository = battery_history_repository
+        self.__drone_repository = drone_repository
+        self.__steps = {
+            BatteryHistoryResolution.RAW: sample_interval,
+            **ROLLUP_SECONDS,
+        }
+        self.__retentions = {
+            BatteryHistoryResolution.RAW: raw_retention,
+            BatteryHistoryResolution.MINUTE: minute_retention,
+            BatteryHistoryResolution.HOUR: hour_retention,
+        }
+        self.__max_points = max_points
+
+    def add_samples(self, drones: list[DroneGetSchema], timestamp: datetime) -> None:
+        seconds = int(timestamp.timestamp())
+        self.__battery_history_repository.add_samples(
+            [
+                BatterySample(
+                    drone_id=drone.id,
+                    timestamp=seconds,
+                    battery_capacity=drone.battery_capacity,
+                )
+                for drone in drones
+            ]
+        )
+
+    def downsample(self, now: datetime) -> None:
+        """
+        Roll the raw samples up into minutes and the minutes up into hours once
+        they are older than their retention, and drop the expired hours.
+        """
+        seconds = int(now.timestamp())
+        minute = ROLLUP_SECONDS[BatteryHistoryResolution.MINUTE]
+        hour = ROLLUP_SECONDS[BatteryHistoryResolution.HOUR]
+        before = self.__expiration(BatteryHistoryResolution.RAW, seconds, minute)
+        self.__battery_history_repository.rollup_samples(minute, before)
+        before = self.__expiration(BatteryHistoryResolution.MINUTE, seconds, hour)
+        self.__battery_history_repository.rollup_rollups(minute, hour, before)
+        before = self.__expiration(BatteryHistoryResolution.HOUR, seconds, hour)
+        self.__battery_history_repository.remove_rollups(hour, before)
+
+    def get_battery_history(
+        self,
+        drone_id: UUID,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        resolution: BatteryHistoryResolution | None = None,
+        now: datetime | None = None,
+    ) -> BatteryHistorySchema:
+        now = now or datetime.now(timezone.utc)
+        end = _as_utc(end or now)
+        start = _as_utc(start or end - DEFAULT_RANGE)
+        if start >= end:
+            raise InvalidTimeRangeError("The start must be before the end")
+        if self.__drone_repository.get_drone(drone_id) is None:
+            raise DroneNotFoundError("Drone not found")
+        if resolution is None:
+            resolution = self.__resolution_for(start, end, now)
+        start_seconds, end_seconds = int(start.timestamp()), int(end.timestamp())
+        if resolution == BatteryHistoryResolution.RAW:
+            samples = [
+                _sample_schema(sample)
+                for sample in self.__battery_history_repository.get_samples(
+                    drone_id, start_seconds, end_seconds
+                )
+            ]
+        else:
+            samples = [
+                _rollup_schema(rollup)
+                for rollup in self.__battery_history_repository.get_rollups(
+                    drone_id, ROLLUP_SECONDS[resolution], start_seconds, end_seconds
+                )
+            ]
+        return BatteryHistorySchema(
+            drone_id=drone_id,
+            resolution=resolution,
+            samples=samples,
+        )
+
+    def __resolution_for(
+        self,
+        start: datetime,
+        end: datetime,
+        now: datetime,
+    ) -> BatteryHistoryResolution:
+        """
+        Pick the finest resolution that still holds data from `start` and that
+        answers the range without exceeding the maximum number of points. The
+        data not rolled up into it yet is rolled up when it is read.
+        """
+        span = (end - start).total_seconds()
+        for resolution in BatteryHistoryResolution:
+            retained = now - timedelta(seconds=self.__retentions[resolution])
+            points = span / self.__steps[resolution]
+            if start >= retained and points <= self.__max_points:
+                return resolution
+        return BatteryHistoryResolution.HOUR
+
+    def __expiration(
+        self,
+        resolution: BatteryHistoryResolution,
+        now: int,
+        alignment: int,
+    ) -> int:
+        expiration = now - self.__retentions[resolution]
+        return expiration - expiration % alignment
+
+
+def _as_utc(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _sample_schema(sample: BatterySample) -> BatterySampleSchema:
+    return BatterySampleSchema(
+        timestamp=datetime.fromtimestamp(sample.timestamp, timezone.utc),
+        battery_capacity=sample.battery_capacity,
+        min_battery_capacity=sample.battery_capacity,
+        max_battery_capacity=sample.battery_capacity,
+    )
+
+
+def _rollup_schema(rollup: BatteryRollup) -> BatterySampleSchema:
+    return BatterySampleSchema(
+        timestamp=datetime.fromtimestamp(rollup.timestamp, timezone.utc),
+        battery_capacity=rollup.avg_battery_capacity,
+        min_battery_capacity=rollup.min_battery_capacity,
+        max_battery_capacity=rollup.max_battery_capacity,
+    )
@@ -1,17 +1,31 @@
+from typing import Any, Iterable, Iterator
 from uuid import UUID
 
 from pydantic import parse_obj_as
 
-from ..data.database import Drone, DroneState, Medication
+from ..cache import DroneDetailsCache, MedicationCatalog, product_key
+from ..data.database import Drone, DroneModelType, DroneState, Medication, new_uuid
+from ..dispatch import first_fit_decreasing
+from ..geo import SEARCH_RADII, bounding_boxes, distance
+from ..pagination import decode_cursor, encode_cursor
 from ..repositories.drone_repository import DroneRepository
 from ..repositories.medication_repository import MedicationRepository
 from ..schemas import (
+    DispatchAssignmentSchema,
+    DispatchPlanSchema,
+    DroneFiltersSchema,
     DroneGetDetailsSchema,
     DroneGetSchema,
     DronePostSchema,
+    DronesPageSchema,
+    DroneStatsSchema,
+    MedicationFiltersSchema,
     MedicationGetSchema,
     MedicationPostSchema,
+    MedicationProductSchema,
+    MedicationsPageSchema,
 )
+from ..telemetry import TelemetryBuffer
 
 
 class DroneNotFoundError(Exception):
@@ -36,44 +50,491 @@ class DroneService:
         drone_repository: DroneRepository,
         medication_repository: MedicationRepository,
         min_battery_capacity_for_loading: int,
+        details_cache: DroneDetailsCache | None = None,
+        telemetry_buffer: TelemetryBuffer | None = None,
+        catalog: MedicationCatalog | None = None,
     ) -> None:
         self.__drone_repository = drone_repository
         self.__medication_repository = medication_repository
         self.__min_battery_capacity_for_loading = min_battery_capacity_for_loading
+        self.__details_cache = details_cache
+        self.__telemetry_buffer = telemetry_buffer
+        self.__catalog = catalog or MedicationCatalog(0)
 
     def add_drone(self, drone: DronePostSchema) -> DroneGetSchema:
         entity = Drone(**drone.dict())
         self.__drone_repository.add_drone(entity)
+        self.__invalidate(entity.id)
         return DroneGetSchema(**entity.dict())
 
+    def add_drones(self, drones: list[DronePostSchema]) -> list[DroneGetSchema]:
+        entities = [Drone(**drone.dict()) for drone in drones]
+        self.__drone_repository.add_drones(entities)
+        return [DroneGetSchema(**entity.dict()) for entity in entities]
+
     def remove_drone(self, drone_id: UUID) -> None:
         entity = self.__drone_repository.get_drone(drone_id)
         if entity is None:
             raise DroneNotFoundError("Drone not found")
-        medications = self.__medication_repository.get_medications(drone_id)
-        if medications:
+        if self.__medication_repository.has_medications(drone_id):
             raise DroneCantBeDeletedError("Drone cannot be deleted")
         self.__drone_repository.remove_drone(entity)
+        self.__invalidate(drone_id)
 
     def get_drones(self, state: DroneState | None = None) -> list[DroneGetSchema]:
         entities = self.__drone_repository.get_drones(state)
         return parse_obj_as(list[DroneGetSchema], entities)
 
-    def get_drone(self, drone_id: UUID) -> DroneGetDetailsSchema:
-        entity = self.__drone_repository.get_drone(drone_id)
-        if entity is None:
+    def get_drones_page(
+        self,
+        filters: DroneFiltersSchema,
+        limit: int,
+        after: str | None = None,
+        with_medications: bool = False,
+    ) -> DronesPageSchema:
+        """
+        Return a page of drones as plain dicts. With `with_medications` they
+        are the details of the drones, including their medications.
+        """
+        query_filters = {
+            **filters.dict(),
+            "after": decode_cursor(after) if after is not None else None,
+            "limit": limit + 1,
+        }
+        rows: list[dict[str, Any]]
+        if with_medications:
+            entities = self.__drone_repository.get_drones(
+                **query_filters, with_medications=True
+            )
+            products = self.__products(
+                medication.product_id
+                for entity in entities
+                for medication in entity.medications
+            )
+            rows = [self.__details(entity, products).dict() for entity in entities]
+        else:
+            rows = self.__drone_repository.get_drone_rows(**query_filters)
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["id"])
+        return DronesPageSchema.construct(items=rows, next_cursor=next_cursor)
+
+    def iter_drone_rows(
+        self,
+        with_medications: bool = False,
+        batch_size: int = 1000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        """
+        Iterate over all the drones as batches of plain dicts, without ever
+        holding more than a batch in memory.
+        """
+        return self.__drone_repository.iter_drone_rows(with_medications, batch_size)
+
+    def get_available_drones(self, weight: int, limit: int) -> list[dict[str, Any]]:
+        """
+        Return the drones that can load `weight` right now as plain dicts, the
+        best fit first.
+        """
+        return self.__drone_repository.get_available_drones(
+            weight, self.__min_battery_capacity_for_loading, limit
+        )
+
+    def get_nearest_drones(
+        self,
+        latitude: float,
+        longitude: float,
+        k: int,
+        weight: int,
+    ) -> list[dict[str, Any]]:
+        """
+        Return the `k` drones nearest to the given point that can load
+        `weight` right now as plain dicts, the nearest first, with their
+        `distance` in kilometers. The drones without a position are never
+        returned.
+
+        The drones are searched in circles of growing radius around the
+        point, until one holds `k` of them, so a dense fleet only reads the
+        drones close to it.
+        """
+        drones: dict[UUID, dict[str, Any]] = {}
+        for radius in SEARCH_RADII:
+            rows = self.__drone_repository.get_available_drones_in_boxes(
+                bounding_boxes(latitude, longitude, radius),
+                weight,
+                self.__min_battery_capacity_for_loading,
+            )
+            for row in rows:
+                row["distance"] = distance(
+                    latitude, longitude, row["latitude"], row["longitude"]
+                )
+                if row["distance"] <= radius:
+                    drones[row["id"]] = row
+            if len(drones) >= k:
+                break
+        return sorted(drones.values(), key=lambda row: row["distance"])[:k]
+
+    def get_drone(
+        self,
+        drone_id: UUID,
+        version: int | None = None,
+    ) -> DroneGetDetailsSchema:
+        """
+        Return the details of the drone, from the cache when they are there
+        and, if `version` is given, they were read at that version. The
+        telemetry not yet written to the database replaces the battery
+        capacity, state and position read.
+        """
+        details = None
+        if self.__details_cache is not None:
+            cached = self.__details_cache.get(drone_id)
+            if cached is not None and version in (None, cached[0]):
+                details = cached[1]
+        if details is None:
+            entity = self.__drone_repository.get_drone(drone_id, with_medications=True)
+            if entity is None:
+                raise DroneNotFoundError("Drone not found")
+            details = self.__details(entity)
+            if self.__details_cache is not None:
+                self.__details_cache.set(drone_id, (entity.version, details))
+        if self.__telemetry_buffer is not None:
+            pending = self.__telemetry_buffer.get(drone_id)
+            if pending is not None:
+                update = {
+                    "battery_capacity": pending.battery_capacity,
+                    "state": pending.state,
+                }
+                if pending.latitude is not None and pending.longitude is not None:
+                    update["latitude"] = pending.latitude
+                    update["longitude"] = pending.longitude
+                details = details.copy(update=update)
+        return details
+
+    def get_stats(self) -> DroneStatsSchema:
+        """
+        Return the statistics of the fleet from the counters kept for every
+        state, model and battery level, without reading the drones. The low
+        battery drones are the ones that can't be loaded. The telemetry is
+        counted once it is written to the database.
+        """
+        states = {state.name: 0 for state in DroneState}
+        models = {model.name: 0 for model in DroneModelType}
+        battery_capacity = 0.0
+        loaded_weight = low_battery = 0
+        for stats in self.__drone_repository.get_stats(
+            self.__min_battery_capacity_for_loading
+        ):
+            states[DroneState(stats["state"]).name] += stats["drones"]
+            models[DroneModelType(stats["model"]).name] += stats["drones"]
+            battery_capacity += stats["battery_capacity"]
+            loaded_weight += stats["loaded_weight"]
+            if stats["low_battery"]:
+                low_battery += stats["drones"]
+        drones = sum(states.values())
+        return DroneStatsSchema(
+            drones=drones,
+            states=states,
+            models=models,
+            average_battery_capacity=battery_capacity / drones if drones else None,
+            loaded_weight=loaded_weight,
+            low_battery=low_battery,
+        )
+
+    def reconcile_stats(self) -> int:
+        """
+        Fix the counters of the statistics of the fleet that drifted from the
+        drones. Return the number of counters fixed.
+        """
+        return self.__drone_repository.reconcile_stats()
+
+    def get_medications(self, drone_id: UUID) -> list[MedicationGetSchema]:
+        """
+        Return the medications of the drone, from the cached details of the
+        drone when they were read at its current version, without reading the
+        drone otherwise.
+        """
+        version = None
+        if self.__details_cache is not None:
+            # Note: Another worker may have changed the drone since it was
+            # cached here, only its version tells.
+            version = self.get_drone_version(drone_id)
+            cached = self.__details_cache.get(drone_id)
+            if cached is not None and cached[0] == version:
+                return cached[1].medications
+        entities = self.__medication_repository.get_medications(drone_id)
+        if (
+            not entities
+            and version is None
+            and self.__drone_repository.get_drone_version(drone_id) is None
+        ):
             raise DroneNotFoundError("Drone not found")
-        medications = self.__medication_repository.get_medications(drone_id)
-        return DroneGetDetailsSchema(
-            **entity.dict(),
-            medications=parse_obj_as(list[MedicationGetSchema], medications),
+        return self.__medication_schemas(entities)
+
+    def search_medications(
+        self,
+        filters: MedicationFiltersSchema,
+        limit: int,
+        after: str | None = None,
+    ) -> MedicationsPageSchema:
+        """
+        Return a page of the medications of all the drones as plain dicts.
+        """
+        rows = self.__medication_repository.search_medication_rows(
+            **filters.dict(),
+            after=decode_cursor(after) if after is not None else None,
+            limit=limit + 1,
         )
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["id"])
+        return MedicationsPageSchema.construct(items=rows, next_cursor=next_cursor)
+
+    def get_drone_version(self, drone_id: UUID) -> int:
+        version = self.__drone_repository.get_drone_version(drone_id)
+        if version is None:
+            raise DroneNotFoundError("Drone not found")
+        return version
+
+    def get_fleet_version(self) -> int:
+        return self.__drone_repository.get_fleet_version()
 
     def add_medication(
         self,
         drone_id: UUID,
         medication: MedicationPostSchema,
     ) -> MedicationGetSchema:
+        self.__load(drone_id, medication.weight)
+        (product_id,), added = self.__product_ids([medication])
+        entity = Medication(
+            product_id=product_id, weight=medication.weight, drone_id=drone_id
+        )
+        self.__medication_repository.add_medication(entity)
+        self.__catalog.add(added)
+        self.__invalidate(drone_id)
+        return MedicationGetSchema(**medication.dict(), id=entity.id, drone_id=drone_id)
+
+    def add_medications(
+        self,
+        drone_id: UUID,
+        medications: list[MedicationPostSchema],
+    ) -> list[MedicationGetSchema]:
+        self.__load(
+            drone_id,
+            sum(medication.weight for medication in medications),
+        )
+        product_ids, added = self.__product_ids(medications)
+        entities = [
+            Medication(
+                product_id=product_id, weight=medication.weight, drone_id=drone_id
+            )
+            for product_id, medication in zip(product_ids, medications)
+        ]
+        self.__medication_repository.add_medications(entities)
+        self.__catalog.add(added)
+        self.__invalidate(drone_id)
+        return [
+            MedicationGetSchema(**medication.dict(), id=entity.id, drone_id=drone_id)
+            for entity, medication in zip(entities, medications)
+        ]
+
+    def dispatch_medications(
+        self,
+        medications: list[MedicationPostSchema],
+        commit: bool = False,
+    ) -> DispatchPlanSchema:
+        """
+        Plan the loading of the medications onto the available drones, packing
+        them with the first fit decreasing heuristic over the drones ordered by
+        their remaining weight. With `commit` the whole plan is loaded in a
+        single transaction, or none of it if a drone can no longer take its
+        part.
+        """
+        plan = DispatchPlanSchema(assignments=[], unassigned=[], committed=commit)
+        if not medications:
+            return plan
+        weights = [medication.weight for medication in medications]
+        drones = self.__drone_repository.get_available_drones(
+            min(weights), self.__min_battery_capacity_for_loading
+        )
+        bins = first_fit_decreasing(
+            [drone["weight_limit"] - drone["loaded_weight"] for drone in drones],
+            weights,
+        )
+        assignments: dict[int, DispatchAssignmentSchema] = {}
+        for index, drone_index in enumerate(bins):
+            if drone_index is None:
+                plan.unassigned.append(index)
+                continue
+            assignment = assignments.get(drone_index)
+            if assignment is None:
+                assignment = assignments[drone_index] = DispatchAssignmentSchema(
+                    drone_id=drones[drone_index]["id"], medications=[], weight=0
+                )
+            assignment.medications.append(index)
+            assignment.weight += weights[index]
+        plan.assignments = [assignments[key] for key in sorted(assignments)]
+        if commit and plan.assignments:
+            loaded = [
+                (assignment.drone_id, medications[index])
+                for assignment in plan.assignments
+                for index in assignment.medications
+            ]
+            loads = {
+                assignment.drone_id: assignment.weight
+                for assignment in plan.assignments
+            }
+            if not self.__drone_repository.load_weights(loads):
+                raise DroneCantLoadMedicationsError(
+                    "Drone cannot load medication because it is full"
+                )
+            product_ids, added = self.__product_ids(
+                [medication for _, medication in loaded]
+            )
+            self.__medication_repository.add_medication_rows(
+                [
+                    {
+                        "id": new_uuid(),
+                        "product_id": product_id,
+                        "weight": medication.weight,
+                        "drone_id": drone_id,
+                    }
+                    for product_id, (drone_id, medication) in zip(product_ids, loaded)
+                ]
+            )
+            self.__catalog.add(added)
+            for assignment in plan.assignments:
+                self.__invalidate(assignment.drone_id)
+        return plan
+
+    def remove_medication(self, drone_id: UUID, medication_id: UUID) -> None:
+        entity = self.__medication_repository.get_medication(medication_id)
+        if entity is None or entity.drone_id != drone_id:
+            raise MedicationNotFoundError("Medication not found")
+        # Note: The medication is read before it is removed to know its weight,
+        # only one of the concurrent removals of it removes the row and
+        # unloads the weight.
+        if not self.__medication_repository.remove_medication(drone_id, medication_id):
+            raise MedicationNotFoundError("Medication not found")
+        self.__drone_repository.unload_weight(drone_id, entity.weight)
+        self.__invalidate(drone_id)
+
+    def flush_telemetry(self) -> int:
+        """
+        Write the telemetry buffered since the previous flush to the database
+        in a single statement. Return the number of drones updated.
+        """
+        if self.__telemetry_buffer is None:
+            return 0
+        pending = self.__telemetry_buffer.drain()
+        if not pending:
+            return 0
+        try:
+            updated = self.__drone_repository.update_telemetry(
+                [
+                    {
+                        "drone_id": drone_id,
+                        "battery_capacity": telemetry.battery_capacity,
+                        "state": telemetry.state,
+                        "latitude": telemetry.latitude,
+                        "longitude": telemetry.longitude,
+                    }
+                    for drone_id, telemetry in pending.items()
+                ]
+            )
+        except Exception:
+            self.__telemetry_buffer.requeue()
+            raise
+        for drone_id in pending:
+            self.__invalidate(drone_id)
+        self.__telemetry_buffer.flushed()
+        return updated
+
+    def __details(
+        self,
+        entity: Drone,
+        products: dict[int, MedicationProductSchema] | None = None,
+    ) -> DroneGetDetailsSchema:
+        return DroneGetDetailsSchema(
+            **entity.dict(),
+            medications=self.__medication_schemas(entity.medications, products),
+        )
+
+    def __medication_schemas(
+        self,
+        entities: list[Medication],
+        products: dict[int, MedicationProductSchema] | None = None,
+    ) -> list[MedicationGetSchema]:
+        if products is None:
+            products = self.__products(entity.product_id for entity in entities)
+        return [
+            MedicationGetSchema(
+                **products[entity.product_id].dict(exclude={"id"}),
+                id=entity.id,
+                weight=entity.weight,
+                drone_id=entity.drone_id,
+            )
+            for entity in entities
+        ]
+
+    def __products(
+        self, product_ids: Iterable[int]
+    ) -> dict[int, MedicationProductSchema]:
+        """
+        Return the products of the catalog with the given ids, from the cache
+        when they are there and reading the rest at once.
+        """
+        products = {}
+        missing = set()
+        for product_id in product_ids:
+            if product_id in products or product_id in missing:
+                continue
+            product = self.__catalog.get(product_id)
+            if product is None:
+                missing.add(product_id)
+            else:
+                products[product_id] = product
+        if missing:
+            read = [
+                MedicationProductSchema(**entity.dict())
+                for entity in self.__medication_repository.get_products(missing)
+            ]
+            self.__catalog.add(read)
+            products.update((product.id, product) for product in read)
+        return products
+
+    def __product_ids(
+        self, medications: list[MedicationPostSchema]
+    ) -> tuple[list[int], list[MedicationProductSchema]]:
+        """
+        Return the id of the product of the catalog for every medication and
+        the products added for the ones not in the catalog yet. They are added
+        in the transaction that loads the medications, so they must be cached
+        only once it is committed.
+        """
+        keys = [product_key(medication) for medication in medications]
+        ids = {}
+        missing = []
+        added: list[MedicationProductSchema] = []
+        for key in dict.fromkeys(keys):
+            product_id = self.__catalog.get_id(key)
+            if product_id is None:
+                missing.append(key)
+            else:
+                ids[key] = product_id
+        if missing:
+            added = [
+                MedicationProductSchema(**entity.dict())
+                for entity in self.__medication_repository.add_products(missing)
+            ]
+            ids.update((product_key(product), product.id) for product in added)
+        return [ids[key] for key in keys], added
+
+    def __invalidate(self, drone_id: UUID) -> None:
+        if self.__details_cache is not None:
+            self.__details_cache.invalidate(drone_id)
+
+    def __load(self, drone_id: UUID, weight: int) -> None:
         entity = self.__drone_repository.get_drone(drone_id)
         if entity is None:
             raise DroneNotFoundError("Drone not found")
@@ -81,18 +542,7 @@ class DroneService:
             raise DroneCantLoadMedicationsError(
                 "Drone cannot load medication because it is low on battery"
             )
-        medications = self.__medication_repository.get_medications(drone_id)
-        total_weight = sum(medication.weight for medication in medications)
-        if total_weight + medication.weight > entity.weight_limit:
+        if not self.__drone_repository.load_weight(drone_id, weight):
             raise DroneCantLoadMedicationsError(
                 "Drone cannot load medication because it is full"
             )
-        entity = Medication(**medication.dict(), drone_id=drone_id)
-        self.__medication_repository.add_medication(entity)
-        return MedicationGetSchema(**entity.dict())
-
-    def remove_medication(self, drone_id: UUID, medication_id: UUID) -> None:
-        entity = self.__medication_repository.get_medication(medication_id)
-        if entity is None or entity.drone_id != drone_id:
-            raise MedicationNotFoundError("Medication not found")
-        self.__medication_repository.remove_medication(entity)
@@ -0,0 +1,23 @@
+from typing import Any
+
+from ..repositories.import_repository import ImportRepository
+
+
+class ImportService:
+    def __init__(self, import_repository: ImportRepository) -> None:
+        self.__import_repository = import_repository
+
+    def get_progress(self, source: str) -> int:
+        """
+        Return the number of records of `source` already imported.
+        """
+        return self.__import_repository.get_progress(source)
+
+    def add_rows(
+        self,
+        source: str,
+        records: int,
+        drones: list[dict[str, Any]],
+        medications: list[dict[str, Any]],
+    ) -> None:
+        self.__import_repository.add_rows(source, records, drones, medications)
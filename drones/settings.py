@@ -1,17 +1,79 @@
+from enum import Enum
+
 from pydantic import BaseSettings, Field
 
 
+class DatabaseProfile(str, Enum):
+    BASIC = "basic"
+    PRODUCTION = "production"
+
+
+class QueryBudgetMode(str, Enum):
+    OFF = "off"
+    WARN = "warn"
+    FAIL = "fail"
+
+
 class Settings(BaseSettings):
     database_url: str = "sqlite:///drones.db"
     database_debug: bool = False
+    database_profile: DatabaseProfile = DatabaseProfile.PRODUCTION
+    # Note: Keep the pool larger than the 40 threads of the threadpool, the
+    # requests waiting for a connection would block the ones holding them.
+    database_pool_size: int = 40
+    database_max_overflow: int = 10
+    database_pool_timeout: float = 30
+    database_journal_mode: str = "wal"
+    database_synchronous: str = "normal"
+    database_busy_timeout: int = 5000
+    database_cache_size: int = -64000
+    database_mmap_size: int = 256 * 1024 * 1024
+    database_read_pool: bool = False
+    database_read_pool_size: int = 40
+    database_async: bool = False
+    database_async_url: str = "sqlite+aiosqlite:///drones.db"
+    database_async_pool_size: int = 20
 
     min_battery_capacity_for_loading: int = 25
 
+    drones_page_size: int = 100
+    drones_max_page_size: int = 1000
+    drones_bulk_max_size: int = 10000
+    drones_available_size: int = 10
+    drones_nearest_size: int = 5
+    drones_dispatch_max_size: int = 100000
+    drones_export_batch_size: int = 1000
+    medications_page_size: int = 100
+    medications_max_page_size: int = 1000
+    medications_batch_max_size: int = 1000
+
+    drone_details_cache_size: int = 1024
+    drone_details_cache_ttl: float = 5
+    medication_catalog_cache_size: int = 10000
+
     time_interval_battery: int = 5
+    time_interval_telemetry_flush: float = 1
+    time_interval_battery_downsampling: int = 60
+    time_interval_stats_reconciliation: int = 300
+    battery_history_raw_retention: int = 24 * 60 * 60
+    battery_history_minute_retention: int = 30 * 24 * 60 * 60
+    battery_history_hour_retention: int = 365 * 24 * 60 * 60
+    battery_history_max_points: int = 1000
     logger_drones_batteries_capacity_file_path: str = "drones_batteries_capacity.log"
     logger_drones_batteries_capacity_name: str = "drones_batteries_capacity"
+    logger_drones_batteries_capacity_queue: bool = True
+    logger_drones_batteries_capacity_only_changes: bool = False
+    logger_drones_batteries_capacity_max_bytes: int = 0
+    logger_drones_batteries_capacity_when: str | None = None
+    logger_drones_batteries_capacity_backup_count: int = 7
+    logger_drones_batteries_capacity_compress: bool = True
+
+    metrics: bool = True
+    query_budget: QueryBudgetMode = QueryBudgetMode.OFF
+    query_budget_repeats: int = 5
 
     seed: bool = True
+    leader_lock_file_path: str | None = "drones.leader.lock"
 
     class Config:
         env_file = ".env"
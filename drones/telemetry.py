@@ -0,0 +1,136 @@
+from threading import Lock
+from time import monotonic
+from typing import Callable, NamedTuple
+from uuid import UUID
+
+from .data.database import DroneState
+from .schemas import DroneTelemetrySchema, TelemetryStatsSchema
+
+
+class PendingTelemetry(NamedTuple):
+    battery_capacity: float
+    state: DroneState
+    latitude: float | None
+    longitude: float | None
+    sequence: int
+    received_at: float
+
+
+class TelemetryBuffer:
+    """
+    Thread safe buffer of the telemetry reported by the drones that keeps only
+    the last report of every drone until it is written to the database.
+
+    The reports taken by `drain` are still visible through `get` until
+    `flushed` is called, so the readers never see a drone going back to the
+    values in the database while they are being written.
+    """
+
+    def __init__(self, clock: Callable[[], float] = monotonic) -> None:
+        self.__clock = clock
+        self.__pending: dict[UUID, PendingTelemetry] = {}
+        self.__flushing: dict[UUID, PendingTelemetry] = {}
+        self.__lock = Lock()
+        self.__sequence = 0
+        self.__received = 0
+        self.__flushed = 0
+        self.__last_flush_size = 0
+
+    def put(self, drone_id: UUID, telemetry: DroneTelemetrySchema) -> None:
+        self.put_many([(drone_id, telemetry)])
+
+    def put_many(self, reports: list[tuple[UUID, DroneTelemetrySchema]]) -> None:
+        now = self.__clock()
+        with self.__lock:
+            for drone_id, telemetry in reports:
+                self.__sequence += 1
+                previous = self.__pending.get(drone_id)
+                latitude, longitude = telemetry.latitude, telemetry.longitude
+                if latitude is None or longitude is None:
+                    # Note: A report without a position keeps the last one
+                    # reported, even when it is being written.
+                    last = previous or self.__flushing.get(drone_id)
+                    latitude, longitude = (
+                        (last.latitude, last.longitude) if last else (None, None)
+                    )
+                # Note: A drone keeps the time of its first unwritten report,
+                # and its place in the buffer, so the lag is not hidden by the
+                # drones reporting more often than the buffer is flushed.
+                self.__pending[drone_id] = PendingTelemetry(
+                    telemetry.battery_capacity,
+                    telemetry.state,
+                    latitude,
+                    longitude,
+                    self.__sequence,
+                    previous.received_at if previous is not None else now,
+                )
+            self.__received += len(reports)
+
+    def get(self, drone_id: UUID) -> PendingTelemetry | None:
+        with self.__lock:
+            pending = self.__pending.get(drone_id)
+            if pending is None:
+                pending = self.__flushing.get(drone_id)
+            return pending
+
+    def drain(self) -> dict[UUID, PendingTelemetry]:
+        """
+        Take the pending reports to write them to the database.
+        """
+        with self.__lock:
+            self.__flushing, self.__pending = self.__pending, {}
+            return self.__flushing
+
+    def flushed(self) -> None:
+        """
+        Forget the reports taken by the last `drain`, they are in the database.
+        """
+        with self.__lock:
+            self.__flushed += len(self.__flushing)
+            self.__last_flush_size = len(self.__flushing)
+            self.__flushing = {}
+
+    def requeue(self) -> None:
+        """
+        Put back the reports taken by the last `drain` after they could not be
+        written, unless a newer report of the same drone arrived meanwhile.
+        """
+        with self.__lock:
+            pending = self.__flushing
+            for drone_id, telemetry in self.__pending.items():
+                previous = pending.get(drone_id)
+                if previous is not None:
+                    telemetry = telemetry._replace(received_at=previous.received_at)
+                pending[drone_id] = telemetry
+            self.__pending = pending
+            self.__flushing = {}
+
+    def stats(self) -> TelemetryStatsSchema:
+        """
+        Return the counters of the buffer. The lag is the time, in seconds,
+        since the oldest report not yet written to the database was received.
+        """
+        now = self.__clock()
+        with self.__lock:
+            oldest = [
+                next(iter(entries.values())).received_at
+                for entries in (self.__flushing, self.__pending)
+                if entries
+            ]
+            return TelemetryStatsSchema(
+                pending=len(self.__pending) + len(self.__flushing),
+                lag=now - min(oldest) if oldest else 0,
+                received=self.__received,
+                flushed=self.__flushed,
+                last_flush_size=self.__last_flush_size,
+            )
+
+
+__telemetry_buffer: TelemetryBuffer | None = None
+
+
+def get_telemetry_buffer() -> TelemetryBuffer:
+    global __telemetry_buffer
+    if __telemetry_buffer is None:
+        __telemetry_buffer = TelemetryBuffer()
+    return __telemetry_buffer
@@ -1,8 +1,37 @@
-from drones.deps import get_drone_repository, get_medication_repository
+from contextlib import AbstractContextManager
+from functools import partial
+from typing import Callable
+
+import pytest
+from drones.cache import get_medication_catalog
+from drones.data.database import (
+    get_async_engine,
+    get_async_read_engine,
+    get_engine,
+    get_read_engine,
+)
+from drones.deps import (
+    get_battery_history_repository,
+    get_drone_repository,
+    get_medication_repository,
+    get_read_battery_history_repository,
+    get_read_drone_repository,
+    get_read_medication_repository,
+)
+from drones.loggers import stop_loggers
 from drones.main import app
+from drones.query_budget import QueryCounter, count_statements, track_statements
+from drones.settings import get_settings
+from drones.telemetry import get_telemetry_buffer
 from pytest import Config, Parser
 
-from .mocks import get_drone_mock_repository, get_medication_mock_repository
+from .mocks import (
+    get_battery_history_mock_repository,
+    get_drone_mock_repository,
+    get_medication_mock_catalog,
+    get_medication_mock_repository,
+    get_telemetry_mock_buffer,
+)
 
 
 def pytest_addoption(parser: Parser):
@@ -15,3 +44,39 @@ def pytest_configure(config: Config):
         app.dependency_overrides[
             get_medication_repository
         ] = get_medication_mock_repository
+        app.dependency_overrides[
+            get_battery_history_repository
+        ] = get_battery_history_mock_repository
+        app.dependency_overrides[get_read_drone_repository] = get_drone_mock_repository
+        app.dependency_overrides[
+            get_read_medication_repository
+        ] = get_medication_mock_repository
+        app.dependency_overrides[
+            get_read_battery_history_repository
+        ] = get_battery_history_mock_repository
+        app.dependency_overrides[get_telemetry_buffer] = get_telemetry_mock_buffer
+        app.dependency_overrides[get_medication_catalog] = get_medication_mock_catalog
+
+
+def pytest_unconfigure(config: Config):
+    # Note: pytest closes the captured streams before the atexit hooks run.
+    stop_loggers()
+
+
+@pytest.fixture(name="count_statements")
+def fixture_count_statements() -> Callable[..., AbstractContextManager[QueryCounter]]:
+    """
+    Count the statements executed by the app inside a block, failing when
+    they are over a budget or the same one repeats too many times:
+
+        with count_statements(budget=2):
+            client.get(...)
+    """
+    settings = get_settings()
+    track_statements(get_engine(settings))
+    track_statements(get_read_engine(settings))
+    track_statements(get_async_engine(settings).sync_engine)
+    track_statements(get_async_read_engine(settings).sync_engine)
+    return partial(
+        count_statements, repeats=settings.query_budget_repeats, requests=True
+    )
@@ -1,25 +1,227 @@
+from typing import Any, Iterable, Iterator
 from uuid import UUID
 
-from drones.data.database import Drone, DroneState, Medication
+from drones.cache import MedicationCatalog, ProductKey
+from drones.data.database import (
+    BatteryRollup,
+    BatterySample,
+    Drone,
+    DroneModelType,
+    DroneState,
+    Medication,
+    MedicationProduct,
+)
+from drones.schemas import DroneGetSchema
+from drones.telemetry import TelemetryBuffer
 
 mocked_drones: list[Drone] = []
 mocked_medications: list[Medication] = []
+mocked_products: list[MedicationProduct] = []
+mocked_fleet_version = 1
+
+
+def bump_mocked_fleet_version() -> None:
+    global mocked_fleet_version
+    mocked_fleet_version += 1
+
+
+def get_mocked_product(product_id: int) -> MedicationProduct | None:
+    return next((p for p in mocked_products if p.id == product_id), None)
+
+
+def load_mocked_medications(drone: Drone) -> None:
+    drone.medications = [m for m in mocked_medications if m.drone_id == drone.id]
 
 
 class DroneMockRepository:
     def add_drone(self, drone: Drone) -> Drone:
         mocked_drones.append(drone)
+        bump_mocked_fleet_version()
         return drone
 
+    def add_drones(self, drones: list[Drone]) -> list[Drone]:
+        mocked_drones.extend(drones)
+        if drones:
+            bump_mocked_fleet_version()
+        return drones
+
     def remove_drone(self, drone: Drone) -> None:
         global mocked_drones
         mocked_drones = [d for d in mocked_drones if d.id != drone.id]
+        bump_mocked_fleet_version()
 
-    def get_drones(self, state: DroneState | None = None) -> list[Drone]:
-        return [d for d in mocked_drones if state is None or d.state == state]
+    def get_drones(
+        self,
+        state: DroneState | None = None,
+        model: DroneModelType | None = None,
+        min_battery_capacity: float | None = None,
+        max_battery_capacity: float | None = None,
+        min_weight_limit: int | None = None,
+        max_weight_limit: int | None = None,
+        after: UUID | None = None,
+        limit: int | None = None,
+        with_medications: bool = False,
+    ) -> list[Drone]:
+        drones = [
+            d
+            for d in sorted(mocked_drones, key=lambda d: d.id)
+            if (state is None or d.state == state)
+            and (model is None or d.model == model)
+            and (
+                min_battery_capacity is None
+                or d.battery_capacity >= min_battery_capacity
+            )
+            and (
+                max_battery_capacity is None
+                or d.battery_capacity <= max_battery_capacity
+            )
+            and (min_weight_limit is None or d.weight_limit >= min_weight_limit)
+            and (max_weight_limit is None or d.weight_limit <= max_weight_limit)
+            and (after is None or d.id > after)
+        ]
+        drones = drones[:limit]
+        if with_medications:
+            for drone in drones:
+                load_mocked_medications(drone)
+        return drones
 
-    def get_drone(self, drone_id: UUID) -> Drone | None:
-        return next((d for d in mocked_drones if d.id == drone_id), None)
+    def get_drone_rows(self, **filters: Any) -> list[dict[str, Any]]:
+        return [
+            DroneGetSchema(**drone.dict()).dict()
+            for drone in self.get_drones(**filters)
+        ]
+
+    def iter_drone_rows(
+        self,
+        with_medications: bool = False,
+        batch_size: int = 1000,
+    ) -> Iterator[list[dict[str, Any]]]:
+        rows = []
+        for drone in self.get_drones():
+            row = DroneGetSchema(**drone.dict()).dict()
+            medications = [m for m in mocked_medications if m.drone_id == drone.id]
+            if not with_medications:
+                rows.append(row)
+                continue
+            for medication in medications or [None]:
+                product = medication and get_mocked_product(medication.product_id)
+                rows.append(
+                    {
+                        **row,
+                        "medication_id": medication and medication.id,
+                        "medication_name": product and product.name,
+                        "medication_weight": medication and medication.weight,
+                        "medication_code": product and product.code,
+                        "medication_image": product and product.image,
+                    }
+                )
+        for index in range(0, len(rows), batch_size):
+            yield rows[index : index + batch_size]
+
+    def get_available_drones(
+        self,
+        weight: int,
+        min_battery_capacity: float,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        drones = [
+            d
+            for d in mocked_drones
+            if d.state in (DroneState.IDLE, DroneState.LOADING)
+            and d.weight_limit - d.loaded_weight >= weight
+            and d.battery_capacity >= min_battery_capacity
+        ]
+        drones.sort(
+            key=lambda d: (d.weight_limit - d.loaded_weight, -d.battery_capacity)
+        )
+        return [DroneGetSchema(**drone.dict()).dict() for drone in drones[:limit]]
+
+    def get_available_drones_in_boxes(
+        self,
+        boxes: list[tuple[float, float, float, float]],
+        weight: int,
+        min_battery_capacity: float,
+    ) -> list[dict[str, Any]]:
+        return [
+            drone
+            for min_latitude, max_latitude, min_longitude, max_longitude in boxes
+            for drone in self.get_available_drones(weight, min_battery_capacity)
+            if drone["latitude"] is not None
+            and drone["longitude"] is not None
+            and min_latitude <= drone["latitude"] <= max_latitude
+            and min_longitude <= drone["longitude"] <= max_longitude
+        ]
+
+    def get_drone(
+        self,
+        drone_id: UUID,
+        with_medications: bool = False,
+    ) -> Drone | None:
+        drone = next((d for d in mocked_drones if d.id == drone_id), None)
+        if drone is not None and with_medications:
+            load_mocked_medications(drone)
+        return drone
+
+    def get_drone_version(self, drone_id: UUID) -> int | None:
+        drone = self.get_drone(drone_id)
+        return drone.version if drone is not None else None
+
+    def get_fleet_version(self) -> int:
+        return mocked_fleet_version
+
+    def get_stats(self, min_battery_capacity: int) -> list[dict[str, Any]]:
+        return [
+            {
+                "state": drone.state,
+                "model": drone.model,
+                "low_battery": drone.battery_capacity < min_battery_capacity,
+                "drones": 1,
+                "battery_capacity": drone.battery_capacity,
+                "loaded_weight": drone.loaded_weight,
+            }
+            for drone in mocked_drones
+        ]
+
+    def reconcile_stats(self) -> int:
+        return 0
+
+    def load_weight(self, drone_id: UUID, weight: int) -> bool:
+        drone = self.get_drone(drone_id)
+        if drone is None or drone.loaded_weight + weight > drone.weight_limit:
+            return False
+        drone.loaded_weight += weight
+        drone.version += 1
+        bump_mocked_fleet_version()
+        return True
+
+    def load_weights(self, weights: dict[UUID, int]) -> bool:
+        return all(
+            self.load_weight(drone_id, weight) for drone_id, weight in weights.items()
+        )
+
+    def update_telemetry(self, reports: list[dict[str, Any]]) -> int:
+        updated = 0
+        for report in reports:
+            drone = self.get_drone(report["drone_id"])
+            if drone is not None:
+                drone.battery_capacity = report["battery_capacity"]
+                drone.state = report["state"]
+                if report["latitude"] is not None:
+                    drone.latitude = report["latitude"]
+                if report["longitude"] is not None:
+                    drone.longitude = report["longitude"]
+                drone.version += 1
+                updated += 1
+        if updated:
+            bump_mocked_fleet_version()
+        return updated
+
+    def unload_weight(self, drone_id: UUID, weight: int) -> None:
+        drone = self.get_drone(drone_id)
+        if drone is not None:
+            drone.loaded_weight -= weight
+            drone.version += 1
+            bump_mocked_fleet_version()
 
 
 def get_drone_mock_repository() -> DroneMockRepository:
@@ -31,18 +233,234 @@ class MedicationMockRepository:
         mocked_medications.append(medication)
         return medication
 
-    def remove_medication(self, medication: Medication) -> None:
+    def add_medications(self, medications: list[Medication]) -> list[Medication]:
+        mocked_medications.extend(medications)
+        return medications
+
+    def add_medication_rows(self, rows: list[dict[str, Any]]) -> None:
+        mocked_medications.extend(Medication(**row) for row in rows)
+
+    def add_products(self, keys: list[ProductKey]) -> list[MedicationProduct]:
+        products = []
+        for code, name, image in keys:
+            product = next(
+                (
+                    p
+                    for p in mocked_products
+                    if (p.code, p.name, p.image) == (code, name, image)
+                ),
+                None,
+            )
+            if product is None:
+                product = MedicationProduct(
+                    id=len(mocked_products) + 1, code=code, name=name, image=image
+                )
+                mocked_products.append(product)
+            products.append(product)
+        return products
+
+    def get_products(self, product_ids: Iterable[int]) -> list[MedicationProduct]:
+        ids = set(product_ids)
+        return [p for p in mocked_products if p.id in ids]
+
+    def search_medication_rows(
+        self,
+        code: str | None = None,
+        name_prefix: str | None = None,
+        drone_state: DroneState | None = None,
+        after: UUID | None = None,
+        limit: int | None = None,
+    ) -> list[dict[str, Any]]:
+        states = {d.id: d.state for d in mocked_drones}
+        rows = []
+        for medication in sorted(mocked_medications, key=lambda m: m.id):
+            product = get_mocked_product(medication.product_id)
+            if product is None:
+                continue
+            if code is not None and product.code != code:
+                continue
+            if name_prefix is not None and not product.name.lower().startswith(
+                name_prefix.lower()
+            ):
+                continue
+            if (
+                drone_state is not None
+                and states.get(medication.drone_id) != drone_state
+            ):
+                continue
+            if after is not None and medication.id <= after:
+                continue
+            rows.append(
+                {
+                    "id": medication.id,
+                    "name": product.name,
+                    "weight": medication.weight,
+                    "code": product.code,
+                    "image": product.image,
+                    "drone_id": medication.drone_id,
+                }
+            )
+        return rows[:limit]
+
+    def remove_medication(self, drone_id: UUID, medication_id: UUID) -> bool:
         global mocked_medications
-        mocked_medications = [m for m in mocked_medications if m.id != medication.id]
+        remaining = [
+            m
+            for m in mocked_medications
+            if m.id != medication_id or m.drone_id != drone_id
+        ]
+        removed = len(remaining) != len(mocked_medications)
+        mocked_medications = remaining
+        return removed
 
     def get_medications(self, drone_id: UUID | None = None) -> list[Medication]:
         return [
             m for m in mocked_medications if drone_id is None or m.drone_id == drone_id
         ]
 
+    def has_medications(self, drone_id: UUID) -> bool:
+        return any(m.drone_id == drone_id for m in mocked_medications)
+
     def get_medication(self, medication_id: UUID) -> Medication | None:
         return next((m for m in mocked_medications if m.id == medication_id), None)
 
 
 def get_medication_mock_repository() -> MedicationMockRepository:
     return MedicationMockRepository()
+
+
+def get_medication_mock_catalog() -> MedicationCatalog:
+    # Note: The ids of the mocked products are not the ones of the database,
+    # they must not be cached along with them.
+    return MedicationCatalog(0)
+
+
+mocked_battery_samples: list[BatterySample] = []
+mocked_battery_rollups: list[BatteryRollup] = []
+
+
+class BatteryHistoryMockRepository:
+    def add_samples(self, samples: list[BatterySample]) -> None:
+        mocked_battery_samples.extend(samples)
+
+    def get_samples(self, drone_id: UUID, start: int, end: int) -> list[BatterySample]:
+        return sorted(
+            (
+                s
+                for s in mocked_battery_samples
+                if s.drone_id == drone_id and start <= s.timestamp < end
+            ),
+            key=lambda s: s.timestamp,
+        )
+
+    def get_rollups(
+        self,
+        drone_id: UUID,
+        resolution: int,
+        start: int,
+        end: int,
+    ) -> list[BatteryRollup]:
+        buckets: dict[int, list[BatteryRollup]] = {}
+        rollups = [
+            BatteryRollup(
+                drone_id=drone_id,
+                resolution=resolution,
+                timestamp=s.timestamp,
+                min_battery_capacity=s.battery_capacity,
+                max_battery_capacity=s.battery_capacity,
+                avg_battery_capacity=s.battery_capacity,
+                samples=1,
+            )
+            for s in self.get_samples(drone_id, start, end)
+        ] + [
+            r
+            for r in mocked_battery_rollups
+            if r.drone_id == drone_id
+            and r.resolution <= resolution
+            and start <= r.timestamp < end
+        ]
+        for r in rollups:
+            timestamp = r.timestamp - r.timestamp % resolution
+            if timestamp >= start:
+                buckets.setdefault(timestamp, []).append(r)
+        return [
+            BatteryRollup(
+                drone_id=drone_id,
+                resolution=resolution,
+                timestamp=timestamp,
+                min_battery_capacity=min(r.min_battery_capacity for r in rollups),
+                max_battery_capacity=max(r.max_battery_capacity for r in rollups),
+                avg_battery_capacity=sum(
+                    r.avg_battery_capacity * r.samples for r in rollups
+                )
+                / sum(r.samples for r in rollups),
+                samples=sum(r.samples for r in rollups),
+            )
+            for timestamp, rollups in sorted(buckets.items())
+        ]
+
+    def rollup_samples(self, resolution: int, before: int) -> None:
+        global mocked_battery_samples
+        buckets: dict[tuple[UUID, int], list[float]] = {}
+        for s in mocked_battery_samples:
+            if s.timestamp < before:
+                key = (s.drone_id, s.timestamp - s.timestamp % resolution)
+                buckets.setdefault(key, []).append(s.battery_capacity)
+        mocked_battery_rollups.extend(
+            BatteryRollup(
+                drone_id=drone_id,
+                resolution=resolution,
+                timestamp=timestamp,
+                min_battery_capacity=min(values),
+                max_battery_capacity=max(values),
+                avg_battery_capacity=sum(values) / len(values),
+                samples=len(values),
+            )
+            for (drone_id, timestamp), values in buckets.items()
+        )
+        mocked_battery_samples = [
+            s for s in mocked_battery_samples if s.timestamp >= before
+        ]
+
+    def rollup_rollups(self, source: int, resolution: int, before: int) -> None:
+        buckets: dict[tuple[UUID, int], list[BatteryRollup]] = {}
+        for r in mocked_battery_rollups:
+            if r.resolution == source and r.timestamp < before:
+                key = (r.drone_id, r.timestamp - r.timestamp % resolution)
+                buckets.setdefault(key, []).append(r)
+        self.remove_rollups(source, before)
+        mocked_battery_rollups.extend(
+            BatteryRollup(
+                drone_id=drone_id,
+                resolution=resolution,
+                timestamp=timestamp,
+                min_battery_capacity=min(r.min_battery_capacity for r in rollups),
+                max_battery_capacity=max(r.max_battery_capacity for r in rollups),
+                avg_battery_capacity=sum(
+                    r.avg_battery_capacity * r.samples for r in rollups
+                )
+                / sum(r.samples for r in rollups),
+                samples=sum(r.samples for r in rollups),
+            )
+            for (drone_id, timestamp), rollups in buckets.items()
+        )
+
+    def remove_rollups(self, resolution: int, before: int) -> None:
+        mocked_battery_rollups[:] = [
+            r
+            for r in mocked_battery_rollups
+            if r.resolution != resolution or r.timestamp >= before
+        ]
+
+
+def get_battery_history_mock_repository() -> BatteryHistoryMockRepository:
+    return BatteryHistoryMockRepository()
+
+
+# Note: The routes get their own buffer, so the telemetry of the mocked drones
+# is not flushed to the database by the background task.
+mocked_telemetry_buffer = TelemetryBuffer()
+
+
+def get_telemetry_mock_buffer() -> TelemetryBuffer:
+    return mocked_telemetry_buffer
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+
+from dirty_equals import IsApprox, IsList, IsPartialDict
+from drones.data.database import Drone, DroneModelType, DroneState
+from drones.schemas import BatteryHistoryResolution, DroneGetSchema
+from drones.services.battery_history_service import BatteryHistoryService
+
+from .mocks import BatteryHistoryMockRepository, DroneMockRepository
+
+
+def test_downsample_battery_history() -> None:
+    drone = Drone(
+        serial_number="battery-history",
+        model=DroneModelType.Lightweight,
+        weight_limit=100,
+        battery_capacity=100,
+        state=DroneState.IDLE,
+    )
+    drone_repository = DroneMockRepository()
+    drone_repository.add_drone(drone)
+    service = BatteryHistoryService(
+        BatteryHistoryMockRepository(),
+        drone_repository,
+        sample_interval=30,
+        raw_retention=60 * 60,
+        minute_retention=24 * 60 * 60,
+        hour_retention=7 * 24 * 60 * 60,
+        max_points=1000,
+    )
+    start = datetime(2022, 5, 1, tzinfo=timezone.utc)
+    for index in range(4 * 60 * 2):
+        drone.battery_capacity = 100 - index % 100
+        service.add_samples(
+            [DroneGetSchema(**drone.dict())],
+            start + timedelta(seconds=30 * index),
+        )
+    end = start + timedelta(hours=4)
+    service.downsample(end)
+    history = service.get_battery_history(
+        drone.id, start, end, BatteryHistoryResolution.RAW, now=end
+    )
+    assert len(history.samples) == 60 * 2
+    history = service.get_battery_history(
+        drone.id, start, end, BatteryHistoryResolution.MINUTE, now=end
+    )
+    # Note: The last hour, still raw, is rolled up when it is read.
+    assert len(history.samples) == 4 * 60
+    assert history.samples[0].dict() == IsPartialDict(
+        timestamp=start,
+        battery_capacity=99.5,
+        min_battery_capacity=99,
+        max_battery_capacity=100,
+    )
+    service.downsample(end + timedelta(days=1))
+    history = service.get_battery_history(
+        drone.id, start, end, BatteryHistoryResolution.HOUR, now=end
+    )
+    assert [sample.timestamp for sample in history.samples] == IsList(
+        *[start + timedelta(hours=hour) for hour in range(4)]
+    )
+    history = service.get_battery_history(drone.id, start, end, now=end)
+    assert history.resolution == BatteryHistoryResolution.MINUTE
+    assert history.samples == []
+    service.downsample(end + timedelta(days=8))
+    history = service.get_battery_history(
+        drone.id, start, end, BatteryHistoryResolution.HOUR, now=end
+    )
+    assert history.samples == []
+
+
+def test_battery_history_recent_rollups() -> None:
+    drone = Drone(
+        serial_number="battery-history-recent",
+        model=DroneModelType.Lightweight,
+        weight_limit=100,
+        battery_capacity=100,
+        state=DroneState.IDLE,
+    )
+    drone_repository = DroneMockRepository()
+    drone_repository.add_drone(drone)
+    service = BatteryHistoryService(
+        BatteryHistoryMockRepository(),
+        drone_repository,
+        sample_interval=5,
+        raw_retention=24 * 60 * 60,
+        minute_retention=30 * 24 * 60 * 60,
+        hour_retention=365 * 24 * 60 * 60,
+        max_points=1000,
+    )
+    end = datetime(2022, 6, 1, tzinfo=timezone.utc)
+    start = end - timedelta(hours=6)
+    for index in range(6 * 60 * 12):
+        drone.battery_capacity = 100 - index % 100
+        service.add_samples(
+            [DroneGetSchema(**drone.dict())],
+            start + timedelta(seconds=5 * index),
+        )
+    service.downsample(end)
+    history = service.get_battery_history(drone.id, start, end, now=end)
+    assert history.resolution == BatteryHistoryResolution.MINUTE
+    assert len(history.samples) == 6 * 60
+    assert sum(sample.battery_capacity for sample in history.samples) == (
+        IsApprox(sum(100 - index % 100 for index in range(6 * 60 * 12)) / 12)
+    )
+    history = service.get_battery_history(
+        drone.id, start, end, BatteryHistoryResolution.HOUR, now=end
+    )
+    assert [sample.timestamp for sample in history.samples] == IsList(
+        *[start + timedelta(hours=hour) for hour in range(6)]
+    )
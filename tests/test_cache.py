@@ -0,0 +1,104 @@
+import pytest
+
+from drones.cache import LRUCache, MedicationCatalog, product_key
+from drones.data.database import DroneModelType, DroneState
+from drones.schemas import (
+    DronePostSchema,
+    MedicationPostSchema,
+    MedicationProductSchema,
+)
+from drones.services.drone_service import DroneNotFoundError, DroneService
+
+from .mocks import DroneMockRepository, MedicationMockRepository
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_lru_cache_evicts_least_recently_used() -> None:
+    cache: LRUCache[str, int] = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert (stats.size, stats.hits, stats.misses) == (2, 3, 1)
+
+
+def test_lru_cache_expires_entries() -> None:
+    clock = FakeClock()
+    cache: LRUCache[str, int] = LRUCache(max_size=2, ttl=5, clock=clock)
+    cache.set("a", 1)
+    clock.now = 4.9
+    assert cache.get("a") == 1
+    clock.now = 5
+    assert cache.get("a") is None
+    assert cache.stats().size == 0
+
+
+def test_lru_cache_invalidate_and_disable() -> None:
+    cache: LRUCache[str, int] = LRUCache(max_size=2, ttl=60)
+    cache.set("a", 1)
+    cache.invalidate("a")
+    assert cache.get("a") is None
+    disabled: LRUCache[str, int] = LRUCache(max_size=0, ttl=60)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+
+
+def test_medication_catalog() -> None:
+    catalog = MedicationCatalog(max_size=10)
+    product = MedicationProductSchema(
+        id=1, code="A", name="Aspirin", image="https://www.aspirin.com/logo.png"
+    )
+    catalog.add([product])
+    assert catalog.get(1) == product
+    assert catalog.get_id(("A", "Aspirin", "https://www.aspirin.com/logo.png")) == 1
+    assert catalog.get_id(product_key(product.copy(update={"name": "Advil"}))) is None
+    disabled = MedicationCatalog(max_size=0)
+    disabled.add([product])
+    assert disabled.get(1) is None
+
+
+def test_get_medications_checks_cached_version() -> None:
+    # Note: Two services with their own cache, as two workers of the API.
+    drone_repository = DroneMockRepository()
+    medication_repository = MedicationMockRepository()
+    services = [
+        DroneService(
+            drone_repository,
+            medication_repository,
+            25,
+            details_cache=LRUCache(max_size=10, ttl=60),
+        )
+        for _ in range(2)
+    ]
+    drone = services[0].add_drone(
+        DronePostSchema(
+            serial_number="cached-medications",
+            model=DroneModelType.Lightweight,
+            weight_limit=100,
+            battery_capacity=100,
+            state=DroneState.IDLE,
+        )
+    )
+    assert services[0].get_drone(drone.id).medications == []
+    medication = services[1].add_medication(
+        drone.id,
+        MedicationPostSchema(
+            name="Aspirin", weight=10, code="A", image="https://www.aspirin.com/"
+        ),
+    )
+    assert services[0].get_medications(drone.id) == [medication]
+    services[1].remove_medication(drone.id, medication.id)
+    services[1].remove_drone(drone.id)
+    with pytest.raises(DroneNotFoundError):
+        services[0].get_medications(drone.id)
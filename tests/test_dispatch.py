@@ -0,0 +1,11 @@
+from drones.dispatch import first_fit_decreasing
+
+
+def test_first_fit_decreasing_places_heaviest_first() -> None:
+    bins = first_fit_decreasing([10, 20, 30], [5, 25, 10, 20, 8])
+    assert bins == [2, 2, 0, 1, None]
+
+
+def test_first_fit_decreasing_leaves_unfit_items() -> None:
+    assert first_fit_decreasing([10, 10], [11, 10, 10, 1]) == [None, 0, 1, None]
+    assert first_fit_decreasing([], [1]) == [None]
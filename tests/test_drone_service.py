@@ -0,0 +1,71 @@
+from uuid import UUID
+
+import pytest
+from drones.data.database import DroneModelType, DroneState, Medication, new_uuid
+from drones.schemas import DronePostSchema, MedicationPostSchema
+from drones.services.drone_service import (
+    DroneNotFoundError,
+    DroneService,
+    MedicationNotFoundError,
+)
+
+from .mocks import DroneMockRepository, MedicationMockRepository, mocked_products
+
+
+class RacingMedicationRepository(MedicationMockRepository):
+    """
+    Remove every medication with another service right after it is read, as a
+    concurrent request for the same medication would.
+    """
+
+    def __init__(self, other: DroneService) -> None:
+        self.__other = other
+
+    def get_medication(self, medication_id: UUID) -> Medication | None:
+        medication = super().get_medication(medication_id)
+        if medication is not None:
+            self.__other.remove_medication(medication.drone_id, medication_id)
+        return medication
+
+
+def test_remove_medication_concurrently() -> None:
+    drone_repository = DroneMockRepository()
+    other = DroneService(drone_repository, MedicationMockRepository(), 25)
+    service = DroneService(drone_repository, RacingMedicationRepository(other), 25)
+    drone = other.add_drone(
+        DronePostSchema(
+            serial_number="concurrent-removal",
+            model=DroneModelType.Lightweight,
+            weight_limit=100,
+            battery_capacity=100,
+            state=DroneState.IDLE,
+        )
+    )
+    medications = other.add_medications(
+        drone.id,
+        [
+            MedicationPostSchema(
+                name=name, weight=weight, code=name, image="https://www.aspirin.com/"
+            )
+            for name, weight in [("A", 30), ("B", 40)]
+        ],
+    )
+    with pytest.raises(MedicationNotFoundError):
+        service.remove_medication(drone.id, medications[0].id)
+    assert other.get_medications(drone.id) == [medications[1]]
+    assert other.get_drone(drone.id).loaded_weight == 40
+    other.remove_medication(drone.id, medications[1].id)
+    other.remove_drone(drone.id)
+
+
+def test_failed_load_adds_no_products() -> None:
+    service = DroneService(DroneMockRepository(), MedicationMockRepository(), 25)
+    products = len(mocked_products)
+    with pytest.raises(DroneNotFoundError):
+        service.add_medication(
+            new_uuid(),
+            MedicationPostSchema(
+                name="Unknown", weight=10, code="U", image="https://www.unknown.com/"
+            ),
+        )
+    assert len(mocked_products) == products
@@ -0,0 +1,54 @@
+from typing import Any
+
+from drones.data.database import DroneModelType, DroneState
+from drones.services.drone_service import DroneService
+
+
+class DroneStatsRepository:
+    def __init__(self, stats: list[dict[str, Any]]) -> None:
+        self.stats = stats
+
+    def get_stats(self, min_battery_capacity: int) -> list[dict[str, Any]]:
+        return self.stats
+
+
+def test_drone_stats() -> None:
+    repository = DroneStatsRepository(
+        [
+            {
+                "state": DroneState.IDLE,
+                "model": DroneModelType.Heavyweight,
+                "low_battery": True,
+                "drones": 2,
+                "battery_capacity": 49,
+                "loaded_weight": 100,
+            },
+            {
+                "state": DroneState.LOADING,
+                "model": DroneModelType.Heavyweight,
+                "low_battery": False,
+                "drones": 1,
+                "battery_capacity": 25.5,
+                "loaded_weight": 50,
+            },
+        ]
+    )
+    stats = DroneService(repository, None, 25).get_stats()  # type: ignore
+    assert stats.drones == 3
+    assert stats.states == {
+        "IDLE": 2,
+        "LOADING": 1,
+        "LOADED": 0,
+        "DELIVERING": 0,
+        "DELIVERED": 0,
+        "RETURNING": 0,
+    }
+    assert stats.models["Heavyweight"] == 3 and stats.models["Lightweight"] == 0
+    assert stats.average_battery_capacity == 24.833333333333332
+    assert (stats.loaded_weight, stats.low_battery) == (150, 2)
+
+
+def test_drone_stats_empty_fleet() -> None:
+    stats = DroneService(DroneStatsRepository([]), None, 25).get_stats()  # type: ignore
+    assert stats.drones == 0
+    assert stats.average_battery_capacity is None
@@ -1,3 +1,7 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
 from typing import Iterable
 
@@ -153,6 +157,23 @@ def test_post_medication(
 
 
 @pytest.mark.depends(on=[test_post_medication.__name__])
+def test_post_medication_same_code(client: TestClient) -> None:
+    variant = {**medication, "name": f"{medication['name']}-variant", "weight": 1}
+    response = client.post(f"/drones/{drone_id}/medications", json=variant)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data == IsPartialDict(**variant)
+    response = client.get(f"/drones/{drone_id}/medications")
+    assert response.status_code == 200, response.text
+    assert response.json() == Contains(
+        IsPartialDict(**medication, id=medication_id),
+        IsPartialDict(**variant, id=data["id"]),
+    )
+    response = client.delete(f"/drones/{drone_id}/medications/{data['id']}")
+    assert response.status_code == 200, response.text
+
+
+@pytest.mark.depends(on=[test_post_medication_same_code.__name__])
 def test_post_medications_over_weight(
     client: TestClient,
     faker_internet: Internet,
@@ -179,8 +200,9 @@ def test_delete_drone_with_medications(client: TestClient) -> None:
 
 
 @pytest.mark.depends(on=[test_delete_drone_with_medications.__name__])
-def test_get_medication(client: TestClient) -> None:
-    response = client.get(f"/drones/{drone_id}/medications")
+def test_get_medication(client: TestClient, count_statements) -> None:
+    with count_statements(budget=2):
+        response = client.get(f"/drones/{drone_id}/medications")
     assert response.status_code == 200, response.text
     data = response.json()
     assert data == IsInstance(list)
@@ -202,11 +224,18 @@ def test_get_medication_not_found(client: TestClient) -> None:
 
 
 @pytest.mark.depends(on=[test_get_medication_not_found.__name__])
-def test_delete_drone(client: TestClient) -> None:
-    response = client.delete(f"/drones/{drone_id}")
+def test_delete_drone(client: TestClient, count_statements) -> None:
+    with count_statements(budget=4):
+        response = client.delete(f"/drones/{drone_id}")
     assert response.status_code == 200, response.text
 
 
+@pytest.mark.depends(on=[test_delete_drone.__name__])
+def test_get_medications_not_found(client: TestClient) -> None:
+    response = client.get(f"/drones/{drone_id}/medications")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
 @pytest.mark.depends(on=[test_delete_drone.__name__])
 def test_get_drone_not_found_in_get(client: TestClient) -> None:
     response = client.get(f"/drones/{drone_id}")
@@ -274,3 +303,808 @@ def test_insert_drone_with_low_of_batery(
     assert response.status_code == HTTPStatus.BAD_REQUEST
     response = client.delete(f"/drones/{drone_id}")
     assert response.status_code == 200, response.text
+
+
+def test_get_drones_paginated(
+    client: TestClient,
+    faker_numeric: Numeric,
+) -> None:
+    drone_ids = []
+    for _ in range(3):
+        drone = {
+            "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+            "model": faker_numeric.integer_number(start=0, end=3),
+            "weight_limit": faker_numeric.integer_number(start=1, end=400),
+            "battery_capacity": faker_numeric.integer_number(start=0, end=100),
+            "state": faker_numeric.integer_number(start=0, end=5),
+        }
+        response = client.post("/drones", json=drone)
+        assert response.status_code == 200, response.text
+        drone_ids.append(response.json()["id"])
+    seen_ids: list[str] = []
+    params: dict[str, str | int] = {"limit": 1}
+    while True:
+        response = client.get("/drones", params=params)
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert len(data) <= 1
+        seen_ids.extend(item["id"] for item in data)
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params["after"] = response.headers["X-Next-Cursor"]
+    assert len(seen_ids) == len(set(seen_ids))
+    assert seen_ids == sorted(seen_ids)
+    assert set(drone_ids) <= set(seen_ids)
+    for drone_id in drone_ids:
+        response = client.delete(f"/drones/{drone_id}")
+        assert response.status_code == 200, response.text
+
+
+def test_get_drones_filtered(
+    client: TestClient,
+    faker_numeric: Numeric,
+    settings: Settings,
+) -> None:
+    drone = {
+        "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+        "model": faker_numeric.integer_number(start=0, end=3),
+        "weight_limit": faker_numeric.integer_number(start=100, end=400),
+        "battery_capacity": faker_numeric.integer_number(start=30, end=70),
+        "state": faker_numeric.integer_number(start=0, end=5),
+    }
+    response = client.post("/drones", json=drone)
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    response = client.get(
+        "/drones",
+        params={
+            "model": drone["model"],
+            "min_battery_capacity": drone["battery_capacity"] - 10,
+            "max_battery_capacity": drone["battery_capacity"] + 10,
+            "min_weight_limit": drone["weight_limit"] - 50,
+            "max_weight_limit": drone["weight_limit"] + 50,
+            "limit": settings.drones_max_page_size,
+        },
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data == Contains(IsPartialDict(id=drone_id))
+    for item in data:
+        assert item["model"] == drone["model"]
+        assert abs(item["battery_capacity"] - drone["battery_capacity"]) <= 10
+        assert abs(item["weight_limit"] - drone["weight_limit"]) <= 50
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+
+
+def test_get_drones_include_medications(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+    faker_person: Person,
+    settings: Settings,
+) -> None:
+    drone = {
+        "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+        "model": faker_numeric.integer_number(start=0, end=3),
+        "weight_limit": 500,
+        "battery_capacity": 100,
+        "state": faker_numeric.integer_number(start=0, end=5),
+    }
+    response = client.post("/drones", json=drone)
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    medication = {
+        "name": faker_person.name(),
+        "weight": 30,
+        "code": str(faker_numeric.integer_number(start=0)),
+        "image": faker_internet.url(),
+    }
+    response = client.post(f"/drones/{drone_id}/medications", json=medication)
+    assert response.status_code == 200, response.text
+    medication_id = response.json()["id"]
+    params = {
+        "model": drone["model"],
+        "min_weight_limit": 500,
+        "min_battery_capacity": 100,
+        "limit": settings.drones_max_page_size,
+    }
+    response = client.get("/drones", params={**params, "include": "medications"})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data == Contains(
+        IsPartialDict(
+            id=drone_id,
+            loaded_weight=30,
+            medications=IsList(IsPartialDict(id=medication_id, drone_id=drone_id)),
+        )
+    )
+    for item in data:
+        assert all(m["drone_id"] == item["id"] for m in item["medications"])
+    response = client.get("/drones", params=params)
+    assert response.status_code == 200, response.text
+    assert all("medications" not in item for item in response.json())
+    response = client.get("/drones", params={"include": "other"})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    response = client.delete(f"/drones/{drone_id}/medications/{medication_id}")
+    assert response.status_code == 200, response.text
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+
+
+def test_get_available_drones(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+    faker_person: Person,
+    settings: Settings,
+) -> None:
+    weight = 487
+    drones = [
+        {"weight_limit": 500, "battery_capacity": 80, "state": 0},
+        {"weight_limit": 495, "battery_capacity": 60, "state": 1},
+        {"weight_limit": 495, "battery_capacity": 90, "state": 0},
+        {"weight_limit": 500, "battery_capacity": 100, "state": 2},
+        {
+            "weight_limit": 500,
+            "battery_capacity": settings.min_battery_capacity_for_loading - 1,
+            "state": 0,
+        },
+        {"weight_limit": 486, "battery_capacity": 100, "state": 0},
+    ]
+    drone_ids = []
+    for drone in drones:
+        response = client.post(
+            "/drones",
+            json={
+                **drone,
+                "serial_number": str(faker_numeric.integer_number(start=0)),
+                "model": faker_numeric.integer_number(start=0, end=3),
+            },
+        )
+        assert response.status_code == 200, response.text
+        drone_ids.append(response.json()["id"])
+    medication = {
+        "name": faker_person.name(),
+        "weight": 20,
+        "code": str(faker_numeric.integer_number(start=0)),
+        "image": faker_internet.url(),
+    }
+    response = client.post(f"/drones/{drone_ids[0]}/medications", json=medication)
+    assert response.status_code == 200, response.text
+    medication_id = response.json()["id"]
+    response = client.get(
+        "/drones/available",
+        params={"weight": weight, "limit": settings.drones_max_page_size},
+    )
+    assert response.status_code == 200, response.text
+    data = response.json()
+    remaining = [item["weight_limit"] - item["loaded_weight"] for item in data]
+    assert all(value >= weight for value in remaining)
+    assert remaining == sorted(remaining)
+    assert all(item["state"] in (0, 1) for item in data)
+    assert all(
+        item["battery_capacity"] >= settings.min_battery_capacity_for_loading
+        for item in data
+    )
+    created = [item["id"] for item in data if item["id"] in drone_ids]
+    assert created == [drone_ids[2], drone_ids[1]]
+    response = client.get("/drones/available", params={"weight": 0})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    response = client.delete(f"/drones/{drone_ids[0]}/medications/{medication_id}")
+    assert response.status_code == 200, response.text
+    for drone_id in drone_ids:
+        response = client.delete(f"/drones/{drone_id}")
+        assert response.status_code == 200, response.text
+
+
+def test_dispatch_medications(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+    faker_person: Person,
+    settings: Settings,
+) -> None:
+    drone_ids = []
+    for weight_limit in (100, 300):
+        response = client.post(
+            "/drones",
+            json={
+                "serial_number": str(faker_numeric.integer_number(start=0)),
+                "model": faker_numeric.integer_number(start=0, end=3),
+                "weight_limit": weight_limit,
+                "battery_capacity": 100,
+                "state": 0,
+            },
+        )
+        assert response.status_code == 200, response.text
+        drone_ids.append(response.json()["id"])
+    medications = [
+        {
+            "name": faker_person.name(),
+            "weight": weight,
+            "code": str(faker_numeric.integer_number(start=0)),
+            "image": faker_internet.url(),
+        }
+        for weight in (90, 250, 501, 40)
+    ]
+    response = client.post("/drones/dispatch", json=medications)
+    assert response.status_code == 200, response.text
+    plan = response.json()
+    assert plan["committed"] is False
+    assert 2 in plan["unassigned"]
+    indexes = plan["unassigned"][:]
+    for assignment in plan["assignments"]:
+        indexes.extend(assignment["medications"])
+        assert assignment["weight"] == sum(
+            medications[index]["weight"] for index in assignment["medications"]
+        )
+        response = client.get(f"/drones/{assignment['drone_id']}")
+        assert response.status_code == 200, response.text
+        drone = response.json()
+        assert assignment["weight"] <= drone["weight_limit"] - drone["loaded_weight"]
+    assert sorted(indexes) == list(range(len(medications)))
+    response = client.get(f"/drones/{drone_ids[0]}")
+    assert response.json() == IsPartialDict(loaded_weight=0, medications=[])
+    response = client.post(
+        "/drones/dispatch", params={"commit": True}, json=medications[1:2]
+    )
+    assert response.status_code == 200, response.text
+    plan = response.json()
+    assert plan["committed"] is True
+    assert plan["unassigned"] == []
+    assert len(plan["assignments"]) == 1
+    assignment = plan["assignments"][0]
+    assert assignment == IsPartialDict(medications=[0], weight=250)
+    response = client.get(f"/drones/{assignment['drone_id']}")
+    assert response.status_code == 200, response.text
+    dispatched = [
+        item
+        for item in response.json()["medications"]
+        if item == IsPartialDict(**medications[1])
+    ]
+    assert len(dispatched) == 1
+    response = client.delete(
+        f"/drones/{assignment['drone_id']}/medications/{dispatched[0]['id']}"
+    )
+    assert response.status_code == 200, response.text
+    for drone_id in drone_ids:
+        response = client.delete(f"/drones/{drone_id}")
+        assert response.status_code == 200, response.text
+
+
+def test_search_medications(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+) -> None:
+    response = client.post(
+        "/drones",
+        json={
+            "serial_number": str(faker_numeric.integer_number(start=0)),
+            "model": faker_numeric.integer_number(start=0, end=3),
+            "weight_limit": 500,
+            "battery_capacity": 100,
+            "state": 0,
+        },
+    )
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    code = new_uuid().hex.upper()
+    medication = {
+        "name": f"Search-{code}",
+        "weight": 10,
+        "code": code,
+        "image": faker_internet.url(),
+    }
+    response = client.post(
+        f"/drones/{drone_id}/medications/batch", json=[medication] * 3
+    )
+    assert response.status_code == 200, response.text
+    ids = sorted(item["id"] for item in response.json())
+    response = client.get("/medications", params={"code": code, "limit": 2})
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()] == ids[:2]
+    assert response.json()[0] == IsPartialDict(**medication, drone_id=drone_id)
+    response = client.get(
+        "/medications",
+        params={"code": code, "after": response.headers["X-Next-Cursor"]},
+    )
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()] == ids[2:]
+    assert "X-Next-Cursor" not in response.headers
+    response = client.get(
+        "/medications", params={"name_prefix": f"search-{code[:8].lower()}"}
+    )
+    assert response.status_code == 200, response.text
+    assert [item["id"] for item in response.json()] == ids
+    state = client.get(f"/drones/{drone_id}").json()["state"]
+    response = client.get("/medications", params={"code": code, "drone_state": state})
+    assert [item["id"] for item in response.json()] == ids
+    response = client.get(
+        "/medications", params={"code": code, "drone_state": (state + 1) % 6}
+    )
+    assert response.json() == []
+    response = client.get("/medications", params={"name_prefix": "Search%"})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_get_drones_invalid_cursor(client: TestClient) -> None:
+    response = client.get("/drones", params={"after": "not-a-cursor"})
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_post_drones_bulk(
+    client: TestClient,
+    faker_numeric: Numeric,
+) -> None:
+    drones = [
+        {
+            "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+            "model": faker_numeric.integer_number(start=0, end=3),
+            "weight_limit": faker_numeric.integer_number(start=1, end=400),
+            "battery_capacity": faker_numeric.integer_number(start=0, end=100),
+            "state": faker_numeric.integer_number(start=0, end=5),
+        }
+        for _ in range(4)
+    ]
+    response = client.post("/drones/bulk", json=drones[:2])
+    assert response.status_code == 200, response.text
+    data = response.json()
+    response = client.post(
+        "/drones/bulk",
+        data="\n".join(json.dumps(drone) for drone in drones[2:]),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert response.status_code == 200, response.text
+    data += response.json()
+    assert data == IsList(*[IsPartialDict(**drone, id=IsUUID) for drone in drones])
+    for item in data:
+        response = client.get(f"/drones/{item['id']}")
+        assert response.status_code == 200, response.text
+        response = client.delete(f"/drones/{item['id']}")
+        assert response.status_code == 200, response.text
+
+
+def test_post_drones_bulk_invalid(
+    client: TestClient,
+    faker_numeric: Numeric,
+) -> None:
+    drone = {
+        "serial_number": new_uuid().hex,
+        "model": faker_numeric.integer_number(start=0, end=3),
+        "weight_limit": faker_numeric.integer_number(start=1, end=400),
+        "battery_capacity": faker_numeric.integer_number(start=0, end=100),
+        "state": faker_numeric.integer_number(start=0, end=5),
+    }
+    response = client.post(
+        "/drones/bulk",
+        json=[drone, {**drone, "weight_limit": 0}, {**drone, "battery_capacity": 101}],
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    data = response.json()
+    assert [error["loc"][:2] for error in data["detail"]] == [["body", 1], ["body", 2]]
+    response = client.get("/drones", params={"limit": 1000})
+    assert response.status_code == 200, response.text
+    assert all(
+        item["serial_number"] != drone["serial_number"] for item in response.json()
+    )
+
+
+def test_post_medications_batch(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+    faker_person: Person,
+    settings: Settings,
+) -> None:
+    drone = {
+        "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+        "model": faker_numeric.integer_number(start=0, end=3),
+        "weight_limit": 100,
+        "battery_capacity": faker_numeric.integer_number(
+            start=settings.min_battery_capacity_for_loading + 1, end=100
+        ),
+        "state": faker_numeric.integer_number(start=0, end=5),
+    }
+    response = client.post("/drones", json=drone)
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    medications = [
+        {
+            "name": faker_person.name(),
+            "weight": 30,
+            "code": str(faker_numeric.integer_number(start=0)),
+            "image": faker_internet.url(),
+        }
+        for _ in range(3)
+    ]
+    response = client.post(f"/drones/{drone_id}/medications/batch", json=medications)
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data == IsList(
+        *[
+            IsPartialDict(**medication, id=IsUUID, drone_id=drone_id)
+            for medication in medications
+        ]
+    )
+    response = client.post(
+        f"/drones/{drone_id}/medications/batch",
+        json=medications[:1] + [{**medications[1], "weight": 1}],
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    response = client.post(f"/drones/{drone_id}/medications/batch", json=[])
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    response = client.post(
+        f"/drones/{drone_id}/medications/batch",
+        json=medications[:1] * (settings.medications_batch_max_size + 1),
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    response = client.get(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    assert response.json() == IsPartialDict(loaded_weight=90)
+    assert len(response.json()["medications"]) == len(medications)
+    for item in data:
+        response = client.delete(f"/drones/{drone_id}/medications/{item['id']}")
+        assert response.status_code == 200, response.text
+    response = client.get(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    assert response.json() == IsPartialDict(loaded_weight=0)
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    response = client.post(f"/drones/{drone_id}/medications/batch", json=medications)
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_drone_details_cache(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+    faker_person: Person,
+    settings: Settings,
+) -> None:
+    drone = {
+        "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+        "model": faker_numeric.integer_number(start=0, end=3),
+        "weight_limit": 100,
+        "battery_capacity": 100,
+        "state": faker_numeric.integer_number(start=0, end=5),
+    }
+    response = client.post("/drones", json=drone)
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    stats = client.get("/drones/details-cache").json()
+    response = client.get(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    response = client.get(f"/drones/{drone_id}/medications")
+    assert response.status_code == 200, response.text
+    assert response.json() == []
+    response = client.get("/drones/details-cache")
+    assert response.status_code == 200, response.text
+    assert response.json() == IsPartialDict(
+        hits=stats["hits"] + 1,
+        misses=stats["misses"] + 1,
+        max_size=settings.drone_details_cache_size,
+    )
+    medication = {
+        "name": faker_person.name(),
+        "weight": 30,
+        "code": str(faker_numeric.integer_number(start=0)),
+        "image": faker_internet.url(),
+    }
+    response = client.post(f"/drones/{drone_id}/medications", json=medication)
+    assert response.status_code == 200, response.text
+    medication_id = response.json()["id"]
+    response = client.get(f"/drones/{drone_id}/medications")
+    assert response.json() == IsList(IsPartialDict(id=medication_id))
+    response = client.delete(f"/drones/{drone_id}/medications/{medication_id}")
+    assert response.status_code == 200, response.text
+    response = client.get(f"/drones/{drone_id}/medications")
+    assert response.json() == []
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    response = client.get(f"/drones/{drone_id}")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_drone_etags(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+    faker_person: Person,
+) -> None:
+    drone = {
+        "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+        "model": faker_numeric.integer_number(start=0, end=3),
+        "weight_limit": 100,
+        "battery_capacity": 100,
+        "state": faker_numeric.integer_number(start=0, end=5),
+    }
+    response = client.post("/drones", json=drone)
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    response = client.get(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    drone_etag = response.headers["ETag"]
+    response = client.get("/drones")
+    assert response.status_code == 200, response.text
+    fleet_etag = response.headers["ETag"]
+    response = client.get(f"/drones/{drone_id}", headers={"If-None-Match": drone_etag})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers["ETag"] == drone_etag
+    assert response.content == b""
+    response = client.get("/drones", headers={"If-None-Match": f"W/{fleet_etag}"})
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    medication = {
+        "name": faker_person.name(),
+        "weight": 30,
+        "code": str(faker_numeric.integer_number(start=0)),
+        "image": faker_internet.url(),
+    }
+    response = client.post(f"/drones/{drone_id}/medications", json=medication)
+    assert response.status_code == 200, response.text
+    medication_id = response.json()["id"]
+    response = client.get(f"/drones/{drone_id}", headers={"If-None-Match": drone_etag})
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] != drone_etag
+    assert response.json()["medications"] == IsList(IsPartialDict(id=medication_id))
+    response = client.get("/drones", headers={"If-None-Match": fleet_etag})
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] != fleet_etag
+    response = client.delete(f"/drones/{drone_id}/medications/{medication_id}")
+    assert response.status_code == 200, response.text
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    response = client.get(f"/drones/{drone_id}", headers={"If-None-Match": drone_etag})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_export_drones(
+    client: TestClient,
+    faker_internet: Internet,
+    faker_numeric: Numeric,
+    faker_person: Person,
+) -> None:
+    drone_ids = []
+    for _ in range(2):
+        response = client.post(
+            "/drones",
+            json={
+                "serial_number": str(faker_numeric.integer_number(start=0)),
+                "model": 1,
+                "weight_limit": 200,
+                "battery_capacity": 100,
+                "state": 0,
+            },
+        )
+        assert response.status_code == 200, response.text
+        drone_ids.append(response.json()["id"])
+    medication = {
+        "name": faker_person.name(),
+        "weight": 50,
+        "code": str(faker_numeric.integer_number(start=0)),
+        "image": faker_internet.url(),
+    }
+    response = client.post(f"/drones/{drone_ids[0]}/medications", json=medication)
+    assert response.status_code == 200, response.text
+    medication_id = response.json()["id"]
+    response = client.get("/drones/export", headers={"Accept-Encoding": "identity"})
+    assert response.status_code == 200, response.text
+    assert response.headers["Content-Type"].startswith("application/x-ndjson")
+    assert "Content-Encoding" not in response.headers
+    drones = [json.loads(line) for line in response.text.splitlines()]
+    ids = [drone["id"] for drone in drones]
+    assert ids == sorted(ids)
+    exported = [drone for drone in drones if drone["id"] in drone_ids]
+    assert exported == IsList(
+        *[IsPartialDict(id=drone_id, loaded_weight=IsInt) for drone_id in drone_ids],
+        check_order=False,
+    )
+    response = client.get(
+        "/drones/export",
+        params={"include": "medications"},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["Content-Encoding"] == "gzip"
+    drones = {
+        drone["id"]: drone
+        for drone in map(json.loads, response.text.splitlines())
+        if drone["id"] in drone_ids
+    }
+    assert drones[drone_ids[0]]["medications"] == [
+        IsPartialDict(**medication, id=medication_id, drone_id=drone_ids[0])
+    ]
+    assert drones[drone_ids[1]]["medications"] == []
+    response = client.get(
+        "/drones/export", params={"format": "csv", "include": "medications"}
+    )
+    assert response.status_code == 200, response.text
+    assert response.headers["Content-Type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    rows = [row for row in rows if row["id"] in drone_ids]
+    assert len(rows) == 2
+    assert {row["medication_id"] for row in rows} == {medication_id, ""}
+    response = client.get("/drones/export", params={"format": "xml"})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    response = client.delete(f"/drones/{drone_ids[0]}/medications/{medication_id}")
+    assert response.status_code == 200, response.text
+    for drone_id in drone_ids:
+        response = client.delete(f"/drones/{drone_id}")
+        assert response.status_code == 200, response.text
+
+
+def test_get_drones_stats(client: TestClient, faker_numeric: Numeric) -> None:
+    response = client.get("/drones/stats")
+    assert response.status_code == 200, response.text
+    before = response.json()
+    response = client.post(
+        "/drones",
+        json={
+            "serial_number": str(faker_numeric.integer_number(start=0)),
+            "model": 3,
+            "weight_limit": 100,
+            "battery_capacity": 10,
+            "state": 2,
+        },
+    )
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    response = client.get("/drones/stats")
+    assert response.status_code == 200, response.text
+    after = response.json()
+    assert after["drones"] == before["drones"] + 1
+    assert after["states"]["LOADED"] == before["states"]["LOADED"] + 1
+    assert after["models"]["Heavyweight"] == before["models"]["Heavyweight"] + 1
+    assert after["low_battery"] == before["low_battery"] + 1
+    assert after["loaded_weight"] == before["loaded_weight"]
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    response = client.get("/drones/stats")
+    assert response.status_code == 200, response.text
+    assert response.json()["drones"] == before["drones"]
+
+
+def test_get_nearest_drones(client: TestClient, faker_numeric: Numeric) -> None:
+    drone_ids = []
+    for latitude, longitude, battery_capacity, state in [
+        (45.1, 179.99, 100, 0),
+        (45.0, -179.99, 100, 1),
+        (45.0, 179.99, 10, 0),
+        (45.0, 179.99, 100, 3),
+        (-45.0, 0.0, 100, 0),
+    ]:
+        response = client.post(
+            "/drones",
+            json={
+                "serial_number": str(faker_numeric.integer_number(start=0)),
+                "model": 0,
+                "weight_limit": 100,
+                "battery_capacity": battery_capacity,
+                "state": state,
+                "latitude": latitude,
+                "longitude": longitude,
+            },
+        )
+        assert response.status_code == 200, response.text
+        drone_ids.append(response.json()["id"])
+    response = client.get(
+        "/drones/nearest", params={"lat": 45, "lon": 179.99, "k": 2, "weight": 10}
+    )
+    assert response.status_code == 200, response.text
+    assert response.json() == [
+        IsPartialDict(id=drone_ids[1], distance=IsFloat(gt=1.5, lt=1.6)),
+        IsPartialDict(id=drone_ids[0], distance=IsFloat(gt=11, lt=11.2)),
+    ]
+    response = client.get("/drones/nearest", params={"lat": 91, "lon": 0, "weight": 10})
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    for drone_id in drone_ids:
+        response = client.delete(f"/drones/{drone_id}")
+        assert response.status_code == 200, response.text
+
+
+def test_drone_telemetry(client: TestClient, faker_numeric: Numeric) -> None:
+    response = client.post(
+        "/drones",
+        json={
+            "serial_number": str(faker_numeric.integer_number(start=0)),
+            "model": 0,
+            "weight_limit": 100,
+            "battery_capacity": 100,
+            "state": 0,
+        },
+    )
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    response = client.get(f"/drones/{drone_id}")
+    etag = response.headers["ETag"]
+    response = client.get("/drones/telemetry")
+    assert response.status_code == 200, response.text
+    received = response.json()["received"]
+    response = client.put(
+        f"/drones/{drone_id}/telemetry", json={"battery_capacity": 90, "state": 1}
+    )
+    assert response.status_code == HTTPStatus.ACCEPTED, response.text
+    response = client.post(
+        "/drones/telemetry",
+        json=[
+            {
+                "drone_id": drone_id,
+                "battery_capacity": 80,
+                "state": 3,
+                "latitude": 23.1,
+                "longitude": -82.4,
+            }
+        ],
+    )
+    assert response.status_code == HTTPStatus.ACCEPTED, response.text
+    response = client.get(f"/drones/{drone_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200, response.text
+    assert response.headers["ETag"] != etag
+    assert response.json() == IsPartialDict(
+        battery_capacity=80, state=3, latitude=23.1, longitude=-82.4
+    )
+    response = client.get("/drones/telemetry")
+    assert response.status_code == 200, response.text
+    assert response.json() == IsPartialDict(
+        received=received + 2, pending=IsInt(ge=0), lag=IsFloat(ge=0)
+    )
+    response = client.put(
+        f"/drones/{drone_id}/telemetry", json={"battery_capacity": 101, "state": 1}
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+
+
+def test_get_battery_history(
+    client: TestClient,
+    faker_numeric: Numeric,
+) -> None:
+    drone = {
+        "serial_number": str(faker_numeric.integer_number(start=0, end=10**6)),
+        "model": faker_numeric.integer_number(start=0, end=3),
+        "weight_limit": faker_numeric.integer_number(start=1, end=400),
+        "battery_capacity": faker_numeric.integer_number(start=0, end=100),
+        "state": faker_numeric.integer_number(start=0, end=5),
+    }
+    response = client.post("/drones", json=drone)
+    assert response.status_code == 200, response.text
+    drone_id = response.json()["id"]
+    now = datetime.now(timezone.utc)
+    for start, resolution in [
+        (now - timedelta(minutes=30), "raw"),
+        (now - timedelta(hours=12), "1m"),
+        (now - timedelta(days=7), "1h"),
+    ]:
+        response = client.get(
+            f"/drones/{drone_id}/battery-history",
+            params={"from": start.isoformat(), "to": now.isoformat()},
+        )
+        assert response.status_code == 200, response.text
+        data = response.json()
+        assert data == IsPartialDict(drone_id=drone_id, resolution=resolution)
+        assert data["samples"] == IsInstance(list)
+    response = client.get(
+        f"/drones/{drone_id}/battery-history",
+        params={"from": now.isoformat(), "to": (now - timedelta(hours=1)).isoformat()},
+    )
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    response = client.delete(f"/drones/{drone_id}")
+    assert response.status_code == 200, response.text
+    response = client.get(f"/drones/{drone_id}/battery-history")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_metrics(client: TestClient) -> None:
+    response = client.get(f"/drones/{new_uuid()}")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    response = client.get("/metrics")
+    assert response.status_code == 200, response.text
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert (
+        'drones_http_requests_total{method="GET",route="/drones/{drone_id}",'
+        'status="404"}' in response.text
+    )
+    assert "drones_http_request_duration_seconds_bucket" in response.text
+    assert "drones_details_cache_hits_total" in response.text
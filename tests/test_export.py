@@ -0,0 +1,47 @@
+import gzip
+
+from drones.data.database import new_uuid
+from drones.export import accepts_gzip, group_medications, gzip_chunks
+
+
+def test_group_medications_across_batches() -> None:
+    drone_ids = [new_uuid(), new_uuid()]
+    medication_ids = [new_uuid(), new_uuid()]
+
+    def row(drone_index: int, medication_index: int | None) -> dict:
+        medication_id = (
+            medication_ids[medication_index] if medication_index is not None else None
+        )
+        return {
+            "id": drone_ids[drone_index],
+            "serial_number": str(drone_index),
+            "model": 0,
+            "weight_limit": 500,
+            "battery_capacity": 100,
+            "state": 0,
+            "loaded_weight": 0,
+            "latitude": None,
+            "longitude": None,
+            "medication_id": medication_id,
+            "medication_name": "name" if medication_id else None,
+            "medication_weight": 10 if medication_id else None,
+            "medication_code": "CODE" if medication_id else None,
+            "medication_image": "https://example.com" if medication_id else None,
+        }
+
+    batches = list(group_medications([[row(0, 0)], [row(0, 1), row(1, None)]]))
+    drones = [drone for batch in batches for drone in batch]
+    assert [drone["id"] for drone in drones] == drone_ids
+    assert [m["id"] for m in drones[0]["medications"]] == medication_ids
+    assert drones[0]["medications"][0]["drone_id"] == drone_ids[0]
+    assert drones[1]["medications"] == []
+
+
+def test_gzip_chunks() -> None:
+    chunks = [b"a" * 1000, b"b" * 1000]
+    assert gzip.decompress(b"".join(gzip_chunks(chunks))) == b"".join(chunks)
+    assert accepts_gzip("gzip, deflate")
+    assert accepts_gzip("deflate;q=1.0, *;q=0.5")
+    assert not accepts_gzip("gzip;q=0")
+    assert not accepts_gzip("identity")
+    assert not accepts_gzip(None)
@@ -0,0 +1,26 @@
+import pytest
+
+from drones.geo import bounding_boxes, distance
+
+
+def test_distance() -> None:
+    assert distance(0, 0, 0, 0) == 0
+    assert distance(0, 0, 0, 1) == pytest.approx(111.195, abs=1e-3)
+    assert distance(0, 179.5, 0, -179.5) == pytest.approx(111.195, abs=1e-3)
+    assert distance(90, 0, -90, 0) == pytest.approx(20015.114, abs=1e-3)
+
+
+def test_bounding_boxes() -> None:
+    [(min_latitude, max_latitude, min_longitude, max_longitude)] = bounding_boxes(
+        0, 0, 111.195
+    )
+    assert (min_latitude, max_latitude) == pytest.approx((-1, 1), abs=1e-5)
+    assert (min_longitude, max_longitude) == pytest.approx((-1, 1), abs=1e-5)
+    boxes = bounding_boxes(0, 179.5, 111.195)
+    assert boxes == [
+        (pytest.approx(-1), pytest.approx(1), pytest.approx(178.5), 180.0),
+        (pytest.approx(-1), pytest.approx(1), -180.0, pytest.approx(-179.5)),
+    ]
+    assert bounding_boxes(89.5, 10, 111.195) == [
+        (pytest.approx(88.5), 90.0, -180.0, 180.0)
+    ]
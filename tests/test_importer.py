@@ -0,0 +1,62 @@
+import io
+
+from drones.data.database import new_uuid
+from drones.importer import chunk_records, read_csv, validate_records
+
+DRONE = {
+    "serial_number": "1",
+    "model": 0,
+    "weight_limit": 100,
+    "battery_capacity": 100,
+    "state": 0,
+}
+MEDICATION = {
+    "name": "Aspirin",
+    "weight": 60,
+    "code": "A",
+    "image": "https://www.aspirin.com/images/aspirin-logo.png",
+}
+
+
+def test_read_csv_groups_medications() -> None:
+    drone_id = new_uuid()
+    file = io.StringIO(
+        "id,serial_number,model,weight_limit,battery_capacity,state,loaded_weight,"
+        "medication_id,medication_name,medication_weight,medication_code,"
+        "medication_image\n"
+        f"{drone_id},1,0,100,100,0,20,,A,10,A,https://example.com\n"
+        f"{drone_id},1,0,100,100,0,20,,B,10,B,https://example.com\n"
+        ",2,0,100,100,0,0,,,,,\n"
+    )
+    records = list(read_csv(file))
+    assert len(records) == 2
+    assert records[0]["id"] == str(drone_id)
+    assert [m["name"] for m in records[0]["medications"]] == ["A", "B"]
+    assert records[1]["medications"] == []
+    chunk = validate_records(0, records)
+    assert chunk.errors == []
+    assert [drone["loaded_weight"] for drone in chunk.drones] == [20, 0]
+    assert chunk.drones[0]["id"] == drone_id
+    assert {m["drone_id"] for m in chunk.medications} == {drone_id}
+
+
+def test_validate_records_reports_errors() -> None:
+    records = [
+        {**DRONE, "medications": [MEDICATION]},
+        {**DRONE, "medications": [MEDICATION, MEDICATION]},
+        {**DRONE, "weight_limit": 501},
+        [],
+    ]
+    chunk = validate_records(10, records)
+    assert chunk.end == 14
+    assert len(chunk.drones) == 1 and len(chunk.medications) == 1
+    assert [error.split(":")[0] for error in chunk.errors] == [
+        "Record 12",
+        "Record 13",
+        "Record 14",
+    ]
+
+
+def test_chunk_records_skips_imported_records() -> None:
+    chunks = list(chunk_records(range(7), 3, skip=2))
+    assert chunks == [(2, [2, 3, 4]), (5, [5, 6])]
@@ -0,0 +1,18 @@
+from pathlib import Path
+
+from drones.leader import LeaderElection
+
+
+def test_leader_election_failover(tmp_path: Path) -> None:
+    path = str(tmp_path / "leader.lock")
+    first, second = LeaderElection(path), LeaderElection(path)
+    assert first.is_leader()
+    assert not second.is_leader()
+    assert first.is_leader()
+    first.resign()
+    assert second.is_leader()
+    assert not first.is_leader()
+
+
+def test_leader_election_without_lock() -> None:
+    assert LeaderElection(None).is_leader()
@@ -0,0 +1,80 @@
+import gzip
+import logging
+from pathlib import Path
+from uuid import UUID
+
+from drones.data.database import Drone, DroneModelType, DroneState
+from drones.loggers import (
+    DroneChangesTracker,
+    get_file_handler,
+    start_loggers,
+    stop_loggers,
+)
+from drones.schemas import DroneGetSchema
+from drones.settings import Settings, get_settings
+
+
+def test_drone_changes_tracker() -> None:
+    drone = Drone(
+        serial_number="changes-tracker",
+        model=DroneModelType.Lightweight,
+        weight_limit=100,
+        battery_capacity=100,
+        state=DroneState.IDLE,
+    )
+    tracker = DroneChangesTracker()
+
+    def changed() -> list[UUID]:
+        drones = [DroneGetSchema(**drone.dict())]
+        return [changed.id for changed in tracker.changed(drones)]
+
+    assert changed() == [drone.id]
+    assert changed() == []
+    drone.battery_capacity = 90
+    assert changed() == [drone.id]
+    drone.state = DroneState.LOADING
+    assert changed() == [drone.id]
+    assert tracker.changed([]) == []
+    assert changed() == [drone.id]
+
+
+def test_rotated_logs_are_compressed(tmp_path: Path) -> None:
+    path = tmp_path / "batteries.log"
+    settings = Settings(
+        logger_drones_batteries_capacity_file_path=str(path),
+        logger_drones_batteries_capacity_max_bytes=1024,
+        logger_drones_batteries_capacity_backup_count=2,
+    )
+    handler = get_file_handler(settings)
+    logger = logging.getLogger("test_rotated_logs_are_compressed")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    try:
+        for index in range(100):
+            logger.info("Drone id: %s, battery capacity: %s%%", index, 100)
+    finally:
+        logger.removeHandler(handler)
+        handler.close()
+    rotated = sorted(tmp_path.glob("batteries.log.*.gz"))
+    assert [file.name for file in rotated] == [
+        "batteries.log.1.gz",
+        "batteries.log.2.gz",
+    ]
+    with gzip.open(rotated[0], "rt") as file:
+        assert file.read().startswith("Drone id: ")
+
+
+def test_loggers_can_be_stopped_and_started_again() -> None:
+    settings = get_settings()
+    logger = logging.getLogger(settings.logger_drones_batteries_capacity_name)
+    path = Path(settings.logger_drones_batteries_capacity_file_path)
+    stop_loggers()
+    stop_loggers()
+    logger.info("Drone id: stopped-and-started-again")
+    start_loggers()
+    start_loggers()
+    stop_loggers()
+    try:
+        assert "Drone id: stopped-and-started-again" in path.read_text()
+    finally:
+        start_loggers()
@@ -0,0 +1,36 @@
+from drones.metrics import MetricsRegistry
+
+
+def test_metrics_registry_render() -> None:
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests.", ("route",))
+    duration = registry.histogram("duration_seconds", "Duration.", (), (0.1, 1))
+    requests.inc('/a"b')
+    requests.inc('/a"b', amount=2)
+    for value in (0.05, 0.1, 0.5, 2):
+        duration.observe(value)
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b"} 3',
+        "# HELP duration_seconds Duration.",
+        "# TYPE duration_seconds histogram",
+        'duration_seconds_bucket{le="0.1"} 2',
+        'duration_seconds_bucket{le="1"} 3',
+        'duration_seconds_bucket{le="+Inf"} 4',
+        "duration_seconds_count 4",
+        "duration_seconds_sum 2.65",
+    ]
+
+
+def test_metrics_registry_collectors() -> None:
+    registry = MetricsRegistry()
+    other = MetricsRegistry()
+    size = other.gauge("size", "Size.")
+    size.set(7)
+    registry.add_collector(lambda: [size])
+    assert registry.render().splitlines() == [
+        "# HELP size Size.",
+        "# TYPE size gauge",
+        "size 7",
+    ]
@@ -0,0 +1,45 @@
+import pytest
+import sqlalchemy as sqla
+from drones.query_budget import (
+    QueryBudgetExceededError,
+    count_statements,
+    statement_shape,
+    track_statements,
+)
+
+
+@pytest.fixture(name="engine")
+def fixture_engine() -> sqla.engine.Engine:
+    engine = sqla.create_engine("sqlite://")
+    track_statements(engine)
+    with engine.begin() as connection:
+        connection.execute(sqla.text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+    return engine
+
+
+def test_statement_shape() -> None:
+    assert statement_shape("SELECT *\n  FROM items WHERE id IN (?, ?, ?)") == (
+        "SELECT * FROM items WHERE id IN (?...)"
+    )
+
+
+def test_count_statements_budget(engine: sqla.engine.Engine) -> None:
+    with count_statements(budget=2) as counter:
+        with engine.connect() as connection:
+            connection.execute(sqla.text("SELECT 1"))
+            connection.execute(sqla.text("SELECT 2"))
+    assert counter.count == 2
+    with pytest.raises(QueryBudgetExceededError, match="3 statements"):
+        with count_statements(budget=2):
+            with engine.connect() as connection:
+                for value in range(3):
+                    connection.execute(sqla.text(f"SELECT {value}"))
+
+
+def test_count_statements_repeats(engine: sqla.engine.Engine) -> None:
+    query = sqla.text("SELECT id FROM items WHERE id = :id")
+    with pytest.raises(QueryBudgetExceededError, match="3 executions of SELECT"):
+        with count_statements(repeats=3):
+            with engine.connect() as connection:
+                for value in range(3):
+                    connection.execute(query, {"id": value})
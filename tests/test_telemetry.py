@@ -0,0 +1,68 @@
+from drones.data.database import DroneState, new_uuid
+from drones.schemas import DroneTelemetrySchema
+from drones.telemetry import TelemetryBuffer
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_telemetry_buffer_keeps_last_report() -> None:
+    clock = FakeClock()
+    buffer = TelemetryBuffer(clock=clock)
+    drone_id = new_uuid()
+    buffer.put(drone_id, DroneTelemetrySchema(battery_capacity=90, state=0))
+    clock.now = 2
+    buffer.put(drone_id, DroneTelemetrySchema(battery_capacity=80, state=3))
+    pending = buffer.get(drone_id)
+    assert pending is not None
+    assert (pending.battery_capacity, pending.state) == (80, DroneState.DELIVERING)
+    clock.now = 3
+    stats = buffer.stats()
+    assert (stats.pending, stats.lag, stats.received) == (1, 3, 2)
+
+
+def test_telemetry_buffer_keeps_position() -> None:
+    buffer = TelemetryBuffer()
+    drone_id = new_uuid()
+    buffer.put(
+        drone_id,
+        DroneTelemetrySchema(
+            battery_capacity=90, state=0, latitude=23.1, longitude=-82.4
+        ),
+    )
+    buffer.drain()
+    buffer.put(drone_id, DroneTelemetrySchema(battery_capacity=80, state=3))
+    pending = buffer.get(drone_id)
+    assert pending is not None
+    assert (pending.latitude, pending.longitude) == (23.1, -82.4)
+
+
+def test_telemetry_buffer_flush() -> None:
+    clock = FakeClock()
+    buffer = TelemetryBuffer(clock=clock)
+    drone_ids = [new_uuid(), new_uuid()]
+    buffer.put_many(
+        [
+            (drone_id, DroneTelemetrySchema(battery_capacity=50, state=0))
+            for drone_id in drone_ids
+        ]
+    )
+    assert set(buffer.drain()) == set(drone_ids)
+    assert buffer.get(drone_ids[0]) is not None
+    clock.now = 1
+    buffer.put(drone_ids[0], DroneTelemetrySchema(battery_capacity=40, state=1))
+    buffer.requeue()
+    clock.now = 2
+    assert buffer.stats().lag == 2
+    pending = buffer.get(drone_ids[0])
+    assert pending is not None and pending.battery_capacity == 40
+    assert len(buffer.drain()) == 2
+    buffer.flushed()
+    assert buffer.get(drone_ids[0]) is None
+    stats = buffer.stats()
+    assert (stats.pending, stats.lag, stats.flushed) == (0, 0, 2)